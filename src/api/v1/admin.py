@@ -0,0 +1,68 @@
+import secrets
+from http import HTTPStatus
+
+from fastapi import APIRouter
+from fastapi import Depends
+from fastapi import Header
+from fastapi import HTTPException
+from fastapi import Query
+from messages.error import AdminError
+from models.admin import CacheReport
+from models.admin import PurgeRequest
+from models.admin import PurgeResult
+from services.cache_report import CacheReportService
+from services.cache_report import get_cache_report_service
+from services.purge import PurgeService
+from services.purge import get_purge_service
+from services.purge import settings
+
+router = APIRouter()
+
+# SCAN и MEMORY USAGE по всей базе за один запрос недопустимы
+MAX_SAMPLE_SIZE_FACTOR = 10
+
+
+async def verify_admin_token(x_admin_token: str = Header(None)):
+    if not settings.token or not x_admin_token or not secrets.compare_digest(x_admin_token, settings.token):
+        raise HTTPException(status_code=HTTPStatus.FORBIDDEN, detail=AdminError.FORBIDDEN)
+
+
+@router.post(
+    '/purge',
+    response_model=PurgeResult,
+    dependencies=[Depends(verify_admin_token)],
+    summary='Invalidate cached responses containing given objects.',
+)
+async def purge(request: PurgeRequest, purge_service: PurgeService = Depends(get_purge_service)) -> PurgeResult:
+    """
+    Drop cached responses tagged with the surrogate keys and send PURGE to the configured edge caches.
+
+    - **keys**: surrogate keys like 'film:<uuid>', 'genre:<uuid>', 'person:<uuid>'.
+    """
+    return await purge_service.purge(request.keys)
+
+
+@router.get(
+    '/cache',
+    response_model=CacheReport,
+    dependencies=[Depends(verify_admin_token)],
+    summary='Inspect the Redis cache: memory by key family, hit ratios and hot keys.',
+)
+async def cache_report(
+    sample_size: int = Query(
+        settings.cache_sample_size,
+        ge=1,
+        le=settings.cache_sample_size * MAX_SAMPLE_SIZE_FACTOR,
+        description='How many keys to measure',
+    ),
+    top: int = Query(20, ge=1, description='How many hot keys to return'),
+    report_service: CacheReportService = Depends(get_cache_report_service),
+) -> CacheReport:
+    """
+    Report what the cache holds and how it is used.
+
+    Memory per key family is measured on a SCAN sample and scaled to the whole database;
+    evictions and expirations come from Redis INFO. Lookups, hit ratio, average written
+    value size and hot keys are counted by the worker that serves the request.
+    """
+    return await report_service.report(sample_size, top)
@@ -6,58 +6,132 @@ from fastapi import HTTPException
 from fastapi import Query
 from messages.error import FilmError
 from models.film import Film
-from models.response_models import FilmResponseShort
+from models.film import FilmFilter
+from models.response_models import FilmFacets
+from models.response_models import Suggestion
 from services.film import FilmService
 from services.film import get_film_service
+from services.snapshot import snapshot as genre_snapshot
+from services.suggest import SuggestService
+from services.suggest import get_suggest_service
+from services.suggest import settings as suggest_settings
+
+from .params import FILM_RELATIONS
+from .params import FILM_SHORT_FIELDS
+from .params import sparse_fields
+from .params import split_values
 
 router = APIRouter()
 
+film_fields = sparse_fields(Film, 'film', FILM_RELATIONS)
+film_list_fields = sparse_fields(Film, 'film', FILM_RELATIONS, default=FILM_SHORT_FIELDS)
+
+
+async def film_filter(
+    genres: list[str] | None = Query(None, alias='filter[genre]'),
+    rating_gte: float | None = Query(None, alias='filter[rating_gte]', ge=0, le=10),
+    rating_lte: float | None = Query(None, alias='filter[rating_lte]', ge=0, le=10),
+    persons: list[str] | None = Query(None, alias='filter[person]'),
+) -> FilmFilter:
+    return FilmFilter(
+        genres=genre_snapshot.resolve(split_values(genres)),
+        rating_gte=rating_gte,
+        rating_lte=rating_lte,
+        persons=split_values(persons),
+    )
+
 
 @router.get('/search', summary='Search filmwork with words in detailed information')
 async def film_search(
     q: str = Query(None, alias='query'),
     page: int = Query(1, alias='page[number]'),
     size: int = Query(50, alias='page[size]'),
+    fields: tuple[str, ...] | None = Depends(film_list_fields),
     film_service: FilmService = Depends(get_film_service),
-) -> list[FilmResponseShort]:
+) -> list[dict]:
     """
     Return a list of filmworks with words in detailed information.
 
     Query parameters:
     - **query** - search phrase or word.
+    - **fields[film]**, **include**: Fields of filmworks to return (uuid, title and imdb_rating by default).
 
     Parameters of pagination:
     - **page[size]**: the number of elements per page.
     - **page[number]**: the number of the current page.
     """
-    films = await film_service.search_objects(q, 'Film', page, size)
+    films = await film_service.search_objects(q, 'Film', page, size, fields)
     if not films:
         raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail=FilmError.NO_ITEM_FOR_REQUEST)
-    return [FilmResponseShort.parse_obj(film) for film in films]
+    return [film.dict(exclude_unset=True) for film in films]
+
+
+@router.get('/suggest', summary='Complete filmwork titles by prefix')
+async def film_suggest(
+    q: str = Query(..., alias='query', min_length=1),
+    limit: int = Query(10, ge=1, le=suggest_settings.node_size),
+    suggest_service: SuggestService = Depends(get_suggest_service),
+) -> list[Suggestion]:
+    """
+    Return filmwork titles starting with the typed prefix (search-as-you-type).
+
+    Query parameters:
+    - **query** - typed prefix.
+    - **limit** - the number of suggestions.
+    """
+    return await suggest_service.suggest(q, 'Film', limit)
 
 
-@router.get('/{film_id}', response_model=Film, summary='Get detailed information about one filmwork.')
-async def film_details(film_id: str, film_service: FilmService = Depends(get_film_service)) -> Film:
+@router.get('/facets', response_model=FilmFacets, summary='Get facet counts for a filtered list of filmworks.')
+async def films_facets(
+    filter_by: FilmFilter = Depends(film_filter),
+    film_service: FilmService = Depends(get_film_service),
+) -> FilmFacets:
+    """
+    Return genre counts and imdb_rating histogram of filmworks matching the filter.
+
+    Parameters:
+    - **filter[genre]**: Count only filmworks of these genres (uuids or names).
+    - **filter[rating_gte]**, **filter[rating_lte]**: Count only filmworks with imdb_rating in range.
+    - **filter[person]**: Count only filmworks with these persons (uuids) in any role.
+    """
+    return await film_service.get_facets(filter_by)
+
+
+@router.get(
+    '/{film_id}',
+    # выбранные поля отдаются как есть, модель остаётся только в схеме
+    responses={HTTPStatus.OK.value: {'model': Film}},
+    summary='Get detailed information about one filmwork.',
+)
+async def film_details(
+    film_id: str,
+    fields: tuple[str, ...] | None = Depends(film_fields),
+    film_service: FilmService = Depends(get_film_service),
+) -> dict:
     """
     Return detailed information about one filmwork.
 
     - **film_id**: uuid of filmwork.
+    - **fields[film]**: Return only these fields (all by default), e.g. title,imdb_rating.
+    - **include**: Add related objects to the fields: genre, directors, actors, writers.
     """
-    film = await film_service.get_by_id(film_id, 'Film')
+    film = await film_service.get_by_id(film_id, 'Film', fields)
     if not film:
         raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail=FilmError.ITEM_NOT_FOUND)
 
-    return film
+    return film.dict(exclude_unset=True)
 
 
 @router.get('/', summary='Get a list of all filmworks.')
 async def films_list(
     sort_by: str = Query(None, alias='sort'),
-    filter_by: str = Query(None, alias='filter[genre]'),
+    filter_by: FilmFilter = Depends(film_filter),
     page: int = Query(1, alias='page[number]'),
     size: int = Query(50, alias='page[size]'),
+    fields: tuple[str, ...] | None = Depends(film_list_fields),
     film_service: FilmService = Depends(get_film_service),
-) -> list[FilmResponseShort]:
+) -> list[dict]:
     """
     Return a list of filmworks with pagination.
 
@@ -67,15 +141,18 @@ async def films_list(
 
     Other parameters:
     - **sort**: Sort items by parameter. If start with '-' is descending order.
-    - **filter[genre]**: Return filmworks only these genres.
+    - **filter[genre]**: Return filmworks only these genres (uuids or names, repeated or comma separated).
+    - **filter[rating_gte]**, **filter[rating_lte]**: Return filmworks with imdb_rating in range.
+    - **filter[person]**: Return filmworks only with these persons (uuids) in any role.
+    - **fields[film]**, **include**: Fields of filmworks to return (uuid, title and imdb_rating by default).
     """
     # check sort params
     if sort_by and sort_by.replace('-', '') not in ['imdb_rating']:
         raise HTTPException(status_code=HTTPStatus.BAD_REQUEST, detail=FilmError.WRONG_SORT_PARAMETER)
-    films = await film_service.get_all_films(sort_by, filter_by, page, size)
+    films = await film_service.get_all_films(sort_by, filter_by, page, size, fields)
     if not films:
         raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail=FilmError.NO_ITEM_FOR_REQUEST)
-    return [FilmResponseShort.parse_obj(film) for film in films]
+    return [film.dict(exclude_unset=True) for film in films]
 
 
 # TODO pagination
@@ -84,19 +161,21 @@ async def similar_films_search(
     film_id: str,
     page: int = Query(1, alias='page[number]'),
     size: int = Query(50, alias='page[size]'),
+    fields: tuple[str, ...] | None = Depends(film_list_fields),
     film_service: FilmService = Depends(get_film_service),
-) -> list[FilmResponseShort]:
+) -> list[dict]:
     """
     Return a list of similar filmworks of specified filmwork.
 
     Parameters:
     - **film_id**: uuid of filmwork.
+    - **fields[film]**, **include**: Fields of filmworks to return (uuid, title and imdb_rating by default).
 
     Parameters of pagination:
     - **page[size]**: the number of elements per page.
     - **page[number]**: the number of the current page.
     """
-    films = await film_service.get_similar_films(film_id, page, size)
+    films = await film_service.get_similar_films(film_id, page, size, fields)
     if not films:
         raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail=FilmError.NO_SIMILAR_FILM)
-    return [FilmResponseShort.parse_obj(film) for film in films]
+    return [film.dict(exclude_unset=True) for film in films]
@@ -5,16 +5,25 @@ from fastapi import Depends
 from fastapi import HTTPException
 from fastapi import Query
 from messages.error import GenreError
+from models.film import Film
 from models.genre import Genre
-from models.response_models import FilmResponseShort
 from services.genre import GenreService
 from services.genre import get_genre_service
 
+from .params import FILM_RELATIONS
+from .params import FILM_SHORT_FIELDS
+from .params import sparse_fields
+
 router = APIRouter()
 
+film_list_fields = sparse_fields(Film, 'film', FILM_RELATIONS, default=FILM_SHORT_FIELDS)
+
+GENRE_SORTS = ('popularity', '-popularity')
+
 
 @router.get('/', summary='Get a list of all genres.')
 async def get_genres(
+    sort_by: str = Query(None, alias='sort'),
     page: int = Query(1, alias='page[number]'),
     size: int = Query(50, alias='page[size]'),
     genre_service: GenreService = Depends(get_genre_service),
@@ -25,8 +34,14 @@ async def get_genres(
     Parameters of pagination:
     - **page[size]**: the number of elements per page.
     - **page[number]**: the number of the current page.
+
+    Other parameters:
+    - **sort**: Sort items by parameter (popularity). If start with '-' is descending order.
     """
-    genres = await genre_service.get_genres(page, size)
+    # check sort params
+    if sort_by and sort_by not in GENRE_SORTS:
+        raise HTTPException(status_code=HTTPStatus.BAD_REQUEST, detail=GenreError.WRONG_SORT_PARAMETER)
+    genres = await genre_service.get_genres(page, size, sort_by)
     if not genres:
         raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail=GenreError.NO_ITEM)
     return genres
@@ -39,7 +54,7 @@ async def genre_details(genre_id: str, genre_service: GenreService = Depends(get
 
     - **genre_id**: uuid of genre.
     """
-    genre = await genre_service.get_by_id(genre_id, 'Genre')
+    genre = await genre_service.get_genre(genre_id)
     if not genre:
         raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail=GenreError.ITEM_NOT_FOUND)
 
@@ -51,17 +66,20 @@ async def genre_details_popular(
     genre_id: str,
     page: int = Query(1, alias='page[number]'),
     size: int = Query(50, alias='page[size]'),
+    fields: tuple[str, ...] | None = Depends(film_list_fields),
     genre_service: GenreService = Depends(get_genre_service),
-) -> list[FilmResponseShort]:
+) -> list[dict]:
     """
     Return a list of most popular filmworks of specified genre.
 
+    - **fields[film]**, **include**: Fields of filmworks to return (uuid, title and imdb_rating by default).
+
     Parameters of pagination:
     - **page[size]**: the number of elements per page.
     - **page[number]**: the number of the current page.
     """
-    films = await genre_service.get_films_by_id(genre_id, page, size)
+    films = await genre_service.get_films_by_id(genre_id, page, size, fields)
     if not films:
         raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail=GenreError.NO_POPULAR_FILMS)
 
-    return [FilmResponseShort.parse_obj(film) for film in films]
+    return [film.dict(exclude_unset=True) for film in films]
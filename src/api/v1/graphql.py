@@ -0,0 +1,31 @@
+from http import HTTPStatus
+
+from core.tracing import TimedORJSONResponse as ORJSONResponse
+from fastapi import APIRouter
+from fastapi import Depends
+from models.graphql import GraphQLRequest
+from services.graphql import GraphQLService
+from services.graphql import get_graphql_service
+
+router = APIRouter()
+
+
+@router.post('', summary='Run a GraphQL query over films, genres and persons.')
+async def graphql(
+    request: GraphQLRequest, graphql_service: GraphQLService = Depends(get_graphql_service)
+) -> ORJSONResponse:
+    """
+    Fetch a whole page in one round trip: films, their genres, their persons and the persons' films.
+
+    Objects referenced in the query are loaded in batches (one Redis MGET and one Elastic mget
+    per type and nesting level) and only once per request. Queries nested deeper than
+    GRAPHQL_MAX_DEPTH or estimated to return more than GRAPHQL_MAX_COST objects are rejected.
+
+    - **query**: GraphQL document, e.g. `{ film(id: "...") { title actors { full_name films { title } } } }`.
+    - **variables**: values of the query variables.
+    - **operationName**: operation to run when the document has several.
+    """
+    result = await graphql_service.execute(request.query, request.variables, request.operation_name)
+    # запрос, который не удалось разобрать или который превышает ограничения, не выполняется
+    status = HTTPStatus.OK if 'data' in result else HTTPStatus.BAD_REQUEST
+    return ORJSONResponse(status_code=status, content=result)
@@ -0,0 +1,33 @@
+from http import HTTPStatus
+
+from core.tracing import TimedORJSONResponse as ORJSONResponse
+from fastapi import APIRouter
+from fastapi import Depends
+from models.health import Health
+from services.health import HealthService
+from services.health import get_health_service
+
+router = APIRouter()
+
+
+@router.get('/live', response_model=Health, summary='Check that the worker is running.')
+async def live(health_service: HealthService = Depends(get_health_service)) -> Health:
+    """Answer without touching the storages: a failing dependency is not a reason to restart the worker."""
+    return health_service.live()
+
+
+@router.get(
+    '/ready',
+    response_model=Health,
+    responses={HTTPStatus.SERVICE_UNAVAILABLE.value: {'model': Health}},
+    summary='Check that the worker can take traffic.',
+)
+async def ready(health_service: HealthService = Depends(get_health_service)) -> ORJSONResponse:
+    """
+    Return 200 once connections to Redis and Elastic are warmed up and both answer, 503 otherwise.
+
+    Latency of every dependency is reported.
+    """
+    health = await health_service.ready()
+    status = HTTPStatus.OK if health.status == 'ok' else HTTPStatus.SERVICE_UNAVAILABLE
+    return ORJSONResponse(status_code=status, content=health.dict())
@@ -0,0 +1,53 @@
+from http import HTTPStatus
+from typing import Awaitable
+from typing import Callable
+
+from fastapi import HTTPException
+from fastapi import Query
+from messages.error import CommonError
+from pydantic import BaseModel
+
+# Поля, которые возвращаются по умолчанию в списках фильмов
+FILM_SHORT_FIELDS = ('uuid', 'title', 'imdb_rating')
+FILM_RELATIONS = ('genre', 'directors', 'actors', 'writers')
+PERSON_SHORT_FIELDS = ('uuid', 'full_name', 'role', 'film_ids')
+PERSON_RELATIONS = ('films',)
+
+
+def split_values(values: list[str] | None) -> list[str]:
+    """Accept both repeated parameters and comma separated values"""
+    return [value.strip() for item in values or [] for value in item.split(',') if value.strip()]
+
+
+def sparse_fields(
+    model: type[BaseModel], resource: str, relations: tuple[str, ...], default: tuple[str, ...] | None = None
+) -> Callable[..., Awaitable[tuple[str, ...] | None]]:
+    """
+    Dependency reading `fields[<resource>]` and `include` (JSON:API sparse fieldsets).
+
+    `fields[...]` replaces the default fields, `include` adds relations to them; `uuid`
+    is always returned. Gives a sorted tuple of fields, or None for the whole model.
+    """
+
+    async def dependency(
+        fields: list[str] | None = Query(
+            None, alias=f'fields[{resource}]', description=f'Return only these fields of {resource}'
+        ),
+        include: list[str] | None = Query(None, description=f'Add related objects: {", ".join(relations)}'),
+    ) -> tuple[str, ...] | None:
+        fields, include = split_values(fields), split_values(include)
+        if set(fields) - set(model.__fields__) or set(include) - set(relations):
+            raise HTTPException(status_code=HTTPStatus.BAD_REQUEST, detail=CommonError.UNKNOWN_FIELD)
+        if fields:
+            selected = set(fields)
+        elif default is not None:
+            selected = set(default)
+        else:
+            # по умолчанию и так возвращается вся модель
+            return None
+        selected.update(include, ('uuid',))
+        if selected >= set(model.__fields__):
+            return None
+        return tuple(sorted(selected))
+
+    return dependency
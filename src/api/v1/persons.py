@@ -5,50 +5,89 @@ from fastapi import Depends, Query
 from fastapi import HTTPException
 from messages.error import PersonError
 from models.person import Person
-from models.response_models import FilmResponseShort
+from models.person import PersonFilm
+from models.response_models import Suggestion
 from services.person import PersonService
 from services.person import get_person_service
+from services.suggest import SuggestService
+from services.suggest import get_suggest_service
+from services.suggest import settings as suggest_settings
+
+from .params import PERSON_RELATIONS
+from .params import PERSON_SHORT_FIELDS
+from .params import sparse_fields
 
 router = APIRouter()
 
+person_fields = sparse_fields(Person, 'person', PERSON_RELATIONS)
+person_list_fields = sparse_fields(Person, 'person', PERSON_RELATIONS, default=PERSON_SHORT_FIELDS)
+
 
 @router.get('/search')
 async def search_persons(
     q: str = Query(None, alias='query'),
     page: int = Query(1, alias='page[number]'),
     size: int = Query(50, alias='page[size]'),
+    fields: tuple[str, ...] | None = Depends(person_list_fields),
     person_service: PersonService = Depends(get_person_service),
-) -> list[Person]:
-    persons = await person_service.search_objects(q, 'Person', page, size)
+) -> list[dict]:
+    persons = await person_service.search_objects(q, 'Person', page, size, fields)
     if not persons:
         raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail=PersonError.NO_ITEM)
-    return persons
+    return [person.dict(exclude_unset=True) for person in persons]
+
+
+@router.get('/suggest', summary='Complete person names by prefix')
+async def person_suggest(
+    q: str = Query(..., alias='query', min_length=1),
+    limit: int = Query(10, ge=1, le=suggest_settings.node_size),
+    suggest_service: SuggestService = Depends(get_suggest_service),
+) -> list[Suggestion]:
+    """
+    Return person names starting with the typed prefix (search-as-you-type).
+
+    Query parameters:
+    - **query** - typed prefix.
+    - **limit** - the number of suggestions.
+    """
+    return await suggest_service.suggest(q, 'Person', limit)
 
 
-@router.get('/{person_id}', response_model=Person, summary='Get detailed information about one person.')
-async def person_details(person_id: str, person_service: PersonService = Depends(get_person_service)) -> Person:
+@router.get(
+    '/{person_id}',
+    # выбранные поля отдаются как есть, модель остаётся только в схеме
+    responses={HTTPStatus.OK.value: {'model': Person}},
+    summary='Get detailed information about one person.',
+)
+async def person_details(
+    person_id: str,
+    fields: tuple[str, ...] | None = Depends(person_fields),
+    person_service: PersonService = Depends(get_person_service),
+) -> dict:
     """
     Return detailed information about one person.
 
     - **person_id**: uuid of person.
+    - **fields[person]**: Return only these fields (all by default), e.g. full_name,role.
+    - **include**: Add related objects to the fields: films.
     """
-    person = await person_service.get_by_id(person_id, 'Person')
+    person = await person_service.get_by_id(person_id, 'Person', fields)
     if not person:
         raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail=PersonError.ITEM_NOT_FOUND)
 
-    return person
+    return person.dict(exclude_unset=True)
 
 
 @router.get('/{person_id}/film', summary='Get list of filmworks with specified person')
 async def get_person_films(
     person_id: str, person_service: PersonService = Depends(get_person_service)
-) -> list[FilmResponseShort]:
+) -> list[PersonFilm]:
     """
-    Return list of filmworks with specified person.
+    Return list of filmworks with specified person, one item per role the person had in a filmwork.
 
     - **person_id**: uuid of person.
     """
     films = await person_service.get_films_by_id(person_id)
     if not films:
         raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail=PersonError.FILMS_NOT_FOUND)
-    return [FilmResponseShort.parse_obj(film) for film in films]
+    return films
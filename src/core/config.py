@@ -1,20 +1,46 @@
 import os
-from logging import config as logging_config
 
-from core.logger import LOGGING
+from core.logger import setup_logging
 from pydantic import BaseSettings
 from pydantic import Field
 
-# Применяем настройки логирования
-logging_config.dictConfig(LOGGING)
-
 # Корень проекта
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
 
+class LoggingSettings(BaseSettings):
+    level: str = Field(env='LOG_LEVEL', default='INFO')
+    json_format: bool = Field(env='LOG_JSON', default=False)
+    # Записи сверх очереди отбрасываются, а не тормозят event loop
+    queue_size: int = Field(env='LOG_QUEUE_SIZE', default=10000)
+    # Записей в секунду на логгер, 0 - без ограничения
+    rate_limit: float = Field(env='LOG_RATE_LIMIT', default=50)
+    rate_burst: int = Field(env='LOG_RATE_BURST', default=200)
+    # Доля логируемых успешных запросов в access log; ошибки пишутся всегда
+    access_sample_rate: float = Field(env='LOG_ACCESS_SAMPLE_RATE', default=1.0)
+
+    class Config:
+        env_file = '../../../config/.env.app'
+
+
+# Применяем настройки логирования
+_logging = LoggingSettings()
+setup_logging(
+    _logging.level,
+    _logging.json_format,
+    _logging.queue_size,
+    _logging.rate_limit,
+    _logging.rate_burst,
+    _logging.access_sample_rate,
+)
+
+
 class RedisSettings(BaseSettings):
     host: str = Field(env='REDIS_HOST', default='127.0.0.1')
     port: int = Field(env='REDIS_PORT', default='6379')
+    # Пул сразу открывает pool_minsize соединений, под нагрузкой растёт до pool_maxsize
+    pool_minsize: int = Field(env='REDIS_POOL_MINSIZE', default=10)
+    pool_maxsize: int = Field(env='REDIS_POOL_MAXSIZE', default=20)
 
     class Config:
         env_file = '../../../config/.env.app'
@@ -23,6 +49,12 @@ class RedisSettings(BaseSettings):
 class ESSettings(BaseSettings):
     es_host: str = Field(env='ELASTIC_HOST', default='127.0.0.1')
     es_port: int = Field(env='ELASTIC_PORT', default='9200')
+    # Поиски, пришедшие в пределах окна, уходят в Elastic одним _msearch
+    msearch_enabled: bool = Field(env='ELASTIC_MSEARCH_ENABLED', default=True)
+    msearch_window_ms: float = Field(env='ELASTIC_MSEARCH_WINDOW_MS', default=1.5)
+    msearch_max_batch: int = Field(env='ELASTIC_MSEARCH_MAX_BATCH', default=32)
+    # Keep-alive соединений с одним узлом Elastic у каждого воркера
+    connections: int = Field(env='ELASTIC_CONNECTIONS', default=10)
 
     class Config:
         env_file = '../../../config/.env.app'
@@ -34,3 +66,197 @@ class StateSettings(BaseSettings):
 
     class Config:
         env_file = '../../../config/.env.app'
+
+
+class SuggestSettings(BaseSettings):
+    # Сколько самых популярных названий/имён держать в префиксном дереве каждого воркера
+    trie_size: int = Field(env='SUGGEST_TRIE_SIZE', default=5000)
+    # Сколько подсказок хранить в каждом узле дерева
+    node_size: int = Field(env='SUGGEST_NODE_SIZE', default=10)
+    refresh_interval: int = Field(env='SUGGEST_REFRESH_INTERVAL', default=600)
+
+    class Config:
+        env_file = '../../../config/.env.app'
+
+
+class HealthSettings(BaseSettings):
+    # Сколько ждать прогрева соединений при старте воркера; не успел - прогрев продолжается в фоне
+    warmup_timeout: float = Field(env='WARMUP_TIMEOUT', default=10)
+    warmup_retry_interval: float = Field(env='WARMUP_RETRY_INTERVAL', default=5)
+    # Сколько /health/ready ждёт ответа каждой зависимости
+    probe_timeout: float = Field(env='HEALTH_PROBE_TIMEOUT', default=1)
+
+    class Config:
+        env_file = '../../../config/.env.app'
+
+
+class GenreSnapshotSettings(BaseSettings):
+    # Все жанры в памяти каждого воркера: список и карточки жанров отдаются без Redis и Elastic
+    enabled: bool = Field(env='GENRE_SNAPSHOT_ENABLED', default=True)
+    # Если жанров больше, снимок не строится и запросы идут через кеш, как раньше
+    max_size: int = Field(env='GENRE_SNAPSHOT_MAX_SIZE', default=1000)
+    # Как часто сверять поколение жанров в Redis и как часто перечитывать индекс в любом случае
+    check_interval: int = Field(env='GENRE_SNAPSHOT_CHECK_INTERVAL', default=10)
+    refresh_interval: int = Field(env='GENRE_SNAPSHOT_REFRESH_INTERVAL', default=600)
+
+    class Config:
+        env_file = '../../../config/.env.app'
+
+
+class ResponseCacheSettings(BaseSettings):
+    enabled: bool = Field(env='RESPONSE_CACHE_ENABLED', default=True)
+    path_prefix: str = Field(env='RESPONSE_CACHE_PATH_PREFIX', default='/api/v1/')
+    expire: int = Field(env='RESPONSE_CACHE_EXPIRE_IN_SECONDS', default=60 * 5)
+    # Тела меньше этого размера не сжимаются
+    min_compress_size: int = Field(env='RESPONSE_CACHE_MIN_COMPRESS_SIZE', default=1000)
+    gzip_level: int = Field(env='RESPONSE_CACHE_GZIP_LEVEL', default=6)
+    brotli_quality: int = Field(env='RESPONSE_CACHE_BROTLI_QUALITY', default=6)
+
+    class Config:
+        env_file = '../../../config/.env.app'
+
+
+class AdminSettings(BaseSettings):
+    # Пустой токен отключает административные ручки
+    token: str = Field(env='ADMIN_TOKEN', default='')
+    # Кеши на краю (CDN, Varnish), которым рассылается PURGE с заголовком Surrogate-Key
+    edge_purge_urls: list[str] = Field(env='EDGE_PURGE_URLS', default=[])
+    edge_purge_timeout: float = Field(env='EDGE_PURGE_TIMEOUT', default=2.0)
+    # Отчёт о кеше: сколько ключей просмотреть SCAN и сколько за один шаг
+    cache_sample_size: int = Field(env='ADMIN_CACHE_SAMPLE_SIZE', default=10000)
+    cache_scan_count: int = Field(env='ADMIN_CACHE_SCAN_COUNT', default=200)
+
+    class Config:
+        env_file = '../../../config/.env.app'
+
+
+class SharedMemorySettings(BaseSettings):
+    # Общий для воркеров кеш в памяти хоста перед Redis
+    enabled: bool = Field(env='SHM_CACHE_ENABLED', default=True)
+    # Префикс файла арены, к нему добавляются версия и геометрия
+    path: str = Field(env='SHM_CACHE_PATH', default='/dev/shm/async_api_cache')
+    buckets: int = Field(env='SHM_CACHE_BUCKETS', default=512)
+    ways: int = Field(env='SHM_CACHE_WAYS', default=4)
+    slot_size: int = Field(env='SHM_CACHE_SLOT_SIZE', default=16 * 1024)
+    # Короткий срок жизни: записи не вычищаются через purge
+    expire: int = Field(env='SHM_CACHE_EXPIRE_IN_SECONDS', default=10)
+
+    class Config:
+        env_file = '../../../config/.env.app'
+
+
+class AdmissionSettings(BaseSettings):
+    # AIMD-ограничение числа одновременных запросов на каждый маршрут
+    enabled: bool = Field(env='ADMISSION_ENABLED', default=True)
+    initial_limit: int = Field(env='ADMISSION_INITIAL_LIMIT', default=20)
+    min_limit: int = Field(env='ADMISSION_MIN_LIMIT', default=2)
+    max_limit: int = Field(env='ADMISSION_MAX_LIMIT', default=200)
+    # Ответ медленнее цели считается признаком перегрузки
+    target_latency_ms: float = Field(env='ADMISSION_TARGET_LATENCY_MS', default=300)
+    backoff: float = Field(env='ADMISSION_BACKOFF', default=0.9)
+    max_queue: int = Field(env='ADMISSION_MAX_QUEUE', default=50)
+    queue_timeout_ms: float = Field(env='ADMISSION_QUEUE_TIMEOUT_MS', default=500)
+    retry_after: int = Field(env='ADMISSION_RETRY_AFTER', default=1)
+
+    class Config:
+        env_file = '../../../config/.env.app'
+
+
+class DeadlineSettings(BaseSettings):
+    enabled: bool = Field(env='DEADLINE_ENABLED', default=True)
+    # Срок ответа маршрутов без своего значения в DEADLINE_POLICIES, в секундах
+    default_timeout: float = Field(env='DEADLINE_DEFAULT_TIMEOUT', default=10)
+    # Больше этого клиент не может попросить заголовком X-Request-Timeout
+    max_timeout: float = Field(env='DEADLINE_MAX_TIMEOUT', default=60)
+    # Доля оставшегося времени, которую получает поиск в Elastic (timeout в теле запроса),
+    # остальное уходит на передачу и разбор ответа
+    search_share: float = Field(env='DEADLINE_SEARCH_SHARE', default=0.8)
+    # Отменять обработку, когда клиент закрыл соединение
+    cancel_on_disconnect: bool = Field(env='DEADLINE_CANCEL_ON_DISCONNECT', default=True)
+
+    class Config:
+        env_file = '../../../config/.env.app'
+
+
+class BreakerSettings(BaseSettings):
+    # Circuit breaker вокруг Elastic: размыкается по доле ошибок или медленных вызовов
+    window_size: int = Field(env='BREAKER_WINDOW_SIZE', default=50)
+    min_calls: int = Field(env='BREAKER_MIN_CALLS', default=10)
+    failure_rate: float = Field(env='BREAKER_FAILURE_RATE', default=0.5)
+    slow_call_ms: float = Field(env='BREAKER_SLOW_CALL_MS', default=2000)
+    slow_call_rate: float = Field(env='BREAKER_SLOW_CALL_RATE', default=0.8)
+    open_seconds: float = Field(env='BREAKER_OPEN_SECONDS', default=10)
+    # Сколько хранить последнее удачное значение для ответа при недоступном Elastic
+    stale_expire: int = Field(env='STALE_CACHE_EXPIRE_IN_SECONDS', default=60 * 60 * 24)
+    # ...но не дольше, чем в столько раз больше срока жизни самой записи
+    stale_ttl_multiplier: int = Field(env='STALE_CACHE_TTL_MULTIPLIER', default=12)
+
+    class Config:
+        env_file = '../../../config/.env.app'
+
+
+class CacheTTLSettings(BaseSettings):
+    # Срок жизни записей в Redis по семейству ключа: объекты меняются редко, страницы поиска - разовые
+    object_ttl: int = Field(env='CACHE_TTL_OBJECT', default=60 * 10)
+    list_ttl: int = Field(env='CACHE_TTL_LIST', default=60 * 5)
+    search_ttl: int = Field(env='CACHE_TTL_SEARCH', default=60 * 2)
+    # Срок по семейству или модели, например {"Film": 3600, "Film__search": 60}; 0 - не кешировать
+    overrides: dict[str, int] = Field(env='CACHE_TTL_OVERRIDES', default={})
+    # Частые ключи живут дольше: срок растёт кратно числу обращений сверх hot_hits, но не выше max_ttl
+    adaptive: bool = Field(env='CACHE_TTL_ADAPTIVE', default=True)
+    hot_hits: int = Field(env='CACHE_TTL_HOT_HITS', default=8)
+    max_ttl: int = Field(env='CACHE_TTL_MAX', default=60 * 60)
+    # Страницы поиска и отфильтрованных списков кешируются только начиная с N-го обращения
+    admission_kinds: list[str] = Field(env='CACHE_ADMISSION_KINDS', default=['search', 'get_all'])
+    admission_hits: int = Field(env='CACHE_ADMISSION_HITS', default=2)
+    # Размер count-min sketch частот обращений в каждом воркере
+    sketch_width: int = Field(env='CACHE_SKETCH_WIDTH', default=16384)
+    sketch_depth: int = Field(env='CACHE_SKETCH_DEPTH', default=4)
+    # Сколько самых частых ключей помнить для отчёта /api/v1/admin/cache
+    hot_keys: int = Field(env='CACHE_HOT_KEYS', default=100)
+
+    class Config:
+        env_file = '../../../config/.env.app'
+
+
+class TracingSettings(BaseSettings):
+    # Заголовок Server-Timing с разбивкой времени запроса по Redis, Elastic, разбору и сериализации
+    server_timing: bool = Field(env='TRACING_SERVER_TIMING', default=True)
+    # Запросы медленнее порога пишутся в лог с разбивкой и всегда экспортируются
+    slow_request_ms: float = Field(env='TRACING_SLOW_REQUEST_MS', default=500)
+    # OTLP/HTTP коллектор, например http://otel-collector:4318/v1/traces; без него спаны не экспортируются
+    otlp_endpoint: str | None = Field(env='TRACING_OTLP_ENDPOINT', default=None)
+    export_sample_rate: float = Field(env='TRACING_EXPORT_SAMPLE_RATE', default=0.1)
+    export_interval: float = Field(env='TRACING_EXPORT_INTERVAL', default=5)
+    export_batch_size: int = Field(env='TRACING_EXPORT_BATCH_SIZE', default=512)
+    export_buffer_size: int = Field(env='TRACING_EXPORT_BUFFER_SIZE', default=10000)
+
+    class Config:
+        env_file = '../../../config/.env.app'
+
+
+class GraphQLSettings(BaseSettings):
+    # Ограничения запросов к /api/v1/graphql: вложенность и оценка числа объектов в ответе
+    max_depth: int = Field(env='GRAPHQL_MAX_DEPTH', default=6)
+    max_cost: int = Field(env='GRAPHQL_MAX_COST', default=5000)
+    # Оценка длины списков без аргумента size: жанры и персоны фильма, фильмография
+    default_list_size: int = Field(env='GRAPHQL_DEFAULT_LIST_SIZE', default=10)
+    # Наибольший size у списков с пагинацией
+    max_page_size: int = Field(env='GRAPHQL_MAX_PAGE_SIZE', default=100)
+
+    class Config:
+        env_file = '../../../config/.env.app'
+
+
+class LoadTestSettings(BaseSettings):
+    # Размер сгенерированного каталога и задержки заглушек Elastic и Redis (python -m loadtest)
+    films: int = Field(env='LOADTEST_FILMS', default=5000)
+    persons: int = Field(env='LOADTEST_PERSONS', default=2000)
+    es_latency_ms: float = Field(env='LOADTEST_ES_LATENCY_MS', default=15)
+    es_jitter_ms: float = Field(env='LOADTEST_ES_JITTER_MS', default=5)
+    redis_latency_ms: float = Field(env='LOADTEST_REDIS_LATENCY_MS', default=0.5)
+    redis_jitter_ms: float = Field(env='LOADTEST_REDIS_JITTER_MS', default=0.1)
+    seed: int = Field(env='LOADTEST_SEED', default=42)
+
+    class Config:
+        env_file = '../../../config/.env.app'
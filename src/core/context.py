@@ -0,0 +1,34 @@
+from contextvars import ContextVar
+from dataclasses import dataclass
+from dataclasses import field
+
+
+@dataclass
+class RequestState:
+    """Per-request flags set deep in services and turned into response headers"""
+    # ответ собран из устаревшего кеша, пока Elastic недоступен
+    stale: bool = False
+    # time.monotonic(), к которому нужен ответ; None - без срока
+    deadline: float | None = None
+    # поиску можно вернуть то, что шарды успели найти к сроку
+    partial_allowed: bool = False
+    # Elastic вернул неполный результат (timed_out), такой ответ не кешируется
+    timed_out: bool = False
+    # трассировка: id трассы, корневого спана запроса и родителя из traceparent
+    trace_id: str = ''
+    span_id: str = ''
+    parent_span_id: str | None = None
+    spans: list = field(default_factory=list)
+
+
+_request_state: ContextVar[RequestState | None] = ContextVar('request_state', default=None)
+
+
+def start_request(**kwargs) -> RequestState:
+    state = RequestState(**kwargs)
+    _request_state.set(state)
+    return state
+
+
+def current_request() -> RequestState | None:
+    return _request_state.get()
@@ -0,0 +1,60 @@
+"""Remaining time of the current request, spent on calls to Redis and Elastic"""
+import asyncio
+import time
+from typing import Awaitable
+
+from core.config import DeadlineSettings
+from core.context import current_request
+
+settings = DeadlineSettings()
+
+
+class DeadlineExceededError(Exception):
+    """The request ran out of time; nobody is waiting for the answer anymore"""
+
+
+def remaining() -> float | None:
+    """Seconds left until the deadline of the current request, None when it has none"""
+    state = current_request()
+    if state is None or state.deadline is None:
+        return None
+    return state.deadline - time.monotonic()
+
+
+async def within_deadline(awaitable: Awaitable):
+    """
+    Await a storage call, giving up when the request deadline passes.
+
+    The call is cancelled rather than failed. The circuit breaker around it counts
+    the cancelled call as a failure only if it already ran longer than a slow call,
+    so a short deadline alone is not taken for trouble with Elastic.
+    """
+    timeout = remaining()
+    if timeout is None:
+        return await awaitable
+    if timeout <= 0:
+        if asyncio.iscoroutine(awaitable):
+            awaitable.close()
+        raise DeadlineExceededError
+    try:
+        return await asyncio.wait_for(awaitable, timeout)
+    except asyncio.TimeoutError:
+        if remaining() > 0:
+            raise
+        raise DeadlineExceededError from None
+
+
+def search_timeout() -> str | None:
+    """`timeout` for a search body when the request accepts partial results"""
+    state = current_request()
+    timeout = remaining()
+    if timeout is None or not state.partial_allowed:
+        return None
+    return f'{max(int(timeout * settings.search_share * 1000), 1)}ms'
+
+
+def mark_timed_out(response: dict):
+    """Remember that Elastic returned only what it found before the search timeout"""
+    state = current_request()
+    if state and response.get('timed_out'):
+        state.timed_out = True
@@ -1,3 +1,15 @@
+import atexit
+import logging
+import queue
+import random
+import threading
+import time
+from logging import config as logging_config
+from logging.handlers import QueueHandler
+from logging.handlers import QueueListener
+
+import orjson
+
 LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 LOG_DEFAULT_HANDLERS = [
     'console',
@@ -35,3 +47,135 @@ LOGGING = {
     },
     'root': {'level': 'INFO', 'formatter': 'verbose', 'handlers': LOG_DEFAULT_HANDLERS,},
 }
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line; access log records get their request fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+        }
+        if record.name == 'uvicorn.access' and isinstance(record.args, tuple) and len(record.args) == 5:
+            client_addr, method, path, http_version, status_code = record.args
+            data.update(
+                client_addr=client_addr, method=method, path=path, http_version=http_version, status_code=status_code
+            )
+        else:
+            data['message'] = record.getMessage()
+        if record.exc_info:
+            data['exc_info'] = self.formatException(record.exc_info)
+        return orjson.dumps(data, default=str).decode()
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Token bucket per logger name: `rate` records per second with bursts of `burst`.
+
+    Suppressed records are counted and the count is added to the next record
+    that gets through.
+    """
+
+    def __init__(self, rate: float, burst: int):
+        super().__init__()
+        self.rate = rate
+        self.burst = burst
+        # logger name -> (tokens, updated at, suppressed)
+        self.buckets: dict[str, tuple[float, float, int]] = {}
+        self.lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        now = time.monotonic()
+        with self.lock:
+            tokens, updated_at, suppressed = self.buckets.get(record.name, (self.burst, now, 0))
+            tokens = min(self.burst, tokens + (now - updated_at) * self.rate)
+            if tokens < 1:
+                self.buckets[record.name] = (tokens, now, suppressed + 1)
+                return False
+            self.buckets[record.name] = (tokens - 1, now, 0)
+        if suppressed:
+            record.msg = f'{record.msg} [{suppressed} records suppressed]'
+        return True
+
+
+class AccessSamplingFilter(logging.Filter):
+    """Keep a `rate` share of successful access log records and every error"""
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if isinstance(record.args, tuple) and len(record.args) == 5 and record.args[4] >= 400:
+            return True
+        return random.random() < self.rate
+
+
+class DroppingQueueHandler(QueueHandler):
+    """
+    Hand records to a listener thread through a bounded queue.
+
+    When the queue is full the record is dropped instead of blocking the event loop;
+    the number of dropped records is reported once the queue has room again.
+    """
+
+    def __init__(self, maxsize: int):
+        super().__init__(queue.Queue(maxsize))
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Очередь внутри процесса: форматирование целиком уходит в поток слушателя
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            if self.dropped:
+                self.queue.put_nowait(
+                    logging.makeLogRecord(
+                        {
+                            'name': __name__,
+                            'levelno': logging.WARNING,
+                            'levelname': 'WARNING',
+                            'msg': f'Logging queue overflowed, {self.dropped} records dropped',
+                        }
+                    )
+                )
+                self.dropped = 0
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def setup_logging(
+    level: str, json: bool, queue_size: int, rate_limit: float, rate_burst: int, access_sample_rate: float
+):
+    """
+    Apply LOGGING and move the handlers of every configured logger behind a queue.
+
+    dictConfig of Python 3.10 cannot build queue handlers itself, so the configured
+    handlers are taken off their loggers and given to a QueueListener afterwards.
+    """
+    logging_config.dictConfig(LOGGING)
+    json_formatter = JsonFormatter()
+    listeners = []
+    for name in ('', *LOGGING['loggers']):
+        logger = logging.getLogger(name or None)
+        if not logger.handlers:
+            continue
+        if json:
+            for handler in logger.handlers:
+                handler.setFormatter(json_formatter)
+        queue_handler = DroppingQueueHandler(queue_size)
+        if name == 'uvicorn.access':
+            if access_sample_rate < 1:
+                queue_handler.addFilter(AccessSamplingFilter(access_sample_rate))
+        elif rate_limit > 0:
+            queue_handler.addFilter(RateLimitFilter(rate_limit, rate_burst))
+        listeners.append(QueueListener(queue_handler.queue, *logger.handlers, respect_handler_level=True))
+        logger.handlers = [queue_handler]
+    logging.getLogger().setLevel(level.upper())
+    for listener in listeners:
+        listener.start()
+        atexit.register(listener.stop)
@@ -0,0 +1,89 @@
+import hashlib
+from array import array
+
+
+class CountMinSketch:
+    """
+    Approximate access counts of an unbounded set of keys in fixed memory.
+
+    Every key increments one counter in each of `depth` rows; its estimate is the
+    smallest of them, so it can only be overestimated, by collisions. Increments are
+    conservative (only the counters at the minimum grow), which keeps the error down.
+    After `width * 10` increments all counters are halved, so the counts describe
+    recent traffic and a key that was hot yesterday cools down (TinyLFU aging).
+    """
+
+    def __init__(self, width: int, depth: int = 4):
+        self.width = width
+        self.depth = depth
+        self.rows = [array('I', bytes(4 * width)) for _ in range(depth)]
+        self.sample_size = width * 10
+        self.additions = 0
+        # сколько раз счётчики уже делились пополам
+        self.generation = 0
+
+    def _indexes(self, key: str) -> list[int]:
+        # две независимые половины хеша дают depth позиций (double hashing)
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1, h2 = int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + row * h2) % self.width for row in range(self.depth)]
+
+    def add(self, key: str) -> int:
+        """Count an access and return the new estimate"""
+        indexes = self._indexes(key)
+        estimate = min(row[index] for row, index in zip(self.rows, indexes)) + 1
+        for row, index in zip(self.rows, indexes):
+            if row[index] < estimate:
+                row[index] = estimate
+        self.additions += 1
+        if self.additions >= self.sample_size:
+            self._age()
+        return estimate
+
+    def estimate(self, key: str) -> int:
+        return min(row[index] for row, index in zip(self.rows, self._indexes(key)))
+
+    def _age(self):
+        self.additions //= 2
+        self.generation += 1
+        for row in self.rows:
+            for index, value in enumerate(row):
+                if value:
+                    row[index] = value >> 1
+
+
+class HeavyHitters:
+    """
+    The `k` keys with the largest counts in a sketch (space saving).
+
+    A key enters when its estimate exceeds the smallest count kept, pushing that key
+    out; most keys are colder than that, so a lookup costs one comparison. When the
+    sketch ages the kept counts are re-read from it.
+    """
+
+    def __init__(self, sketch: CountMinSketch, k: int):
+        self.sketch = sketch
+        self.k = k
+        self.counts: dict[str, int] = {}
+        self.floor = 0
+        self.generation = sketch.generation
+
+    def add(self, key: str, count: int):
+        if self.generation != self.sketch.generation:
+            self.generation = self.sketch.generation
+            self.counts = {key_: self.sketch.estimate(key_) for key_ in self.counts}
+            self.floor = min(self.counts.values(), default=0)
+        if key in self.counts or len(self.counts) < self.k:
+            # счётчики только растут, так что floor может лишь отставать снизу
+            self.counts[key] = count
+            return
+        if count <= self.floor:
+            return
+        victim = min(self.counts, key=self.counts.__getitem__)
+        if self.counts[victim] < count:
+            del self.counts[victim]
+            self.counts[key] = count
+        self.floor = min(self.counts.values())
+
+    def top(self, n: int | None = None) -> list[tuple[str, int]]:
+        return sorted(self.counts.items(), key=lambda item: -item[1])[:n]
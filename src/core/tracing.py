@@ -0,0 +1,143 @@
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass
+from dataclasses import field
+
+import aiohttp
+from core.context import current_request
+from fastapi.responses import ORJSONResponse
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Span:
+    name: str
+    # время начала по часам эпохи (для экспорта) и длительность в секундах
+    start_ns: int
+    duration: float = 0.0
+    span_id: str = field(default_factory=lambda: os.urandom(8).hex())
+
+
+@contextmanager
+def span(name: str):
+    """Time a block of the current request; does nothing outside a request"""
+    state = current_request()
+    if state is None:
+        yield
+        return
+    span_ = Span(name, time.time_ns())
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        span_.duration = time.perf_counter() - started
+        state.spans.append(span_)
+
+
+def parse_traceparent(value: str | None) -> tuple[str, str | None]:
+    """Trace id and parent span id from a W3C traceparent header, or a new trace id"""
+    if value:
+        parts = value.strip().split('-')
+        if len(parts) == 4 and len(parts[1]) == 32 and len(parts[2]) == 16:
+            return parts[1], parts[2]
+    return os.urandom(16).hex(), None
+
+
+def server_timing(spans: list[Span], total: float) -> str:
+    """Server-Timing header value: time summed per span name, in milliseconds"""
+    durations, counts = {}, {}
+    for span_ in spans:
+        durations[span_.name] = durations.get(span_.name, 0.0) + span_.duration
+        counts[span_.name] = counts.get(span_.name, 0) + 1
+    metrics = [
+        f'{name};dur={duration * 1000:.2f};desc="{counts[name]}x"' for name, duration in durations.items()
+    ]
+    metrics.append(f'total;dur={total * 1000:.2f}')
+    return ', '.join(metrics)
+
+
+class TimedORJSONResponse(ORJSONResponse):
+    """ORJSONResponse that records the time spent rendering the body"""
+
+    def render(self, content) -> bytes:
+        with span('serialize'):
+            return super().render(content)
+
+
+class SpanExporter:
+    """
+    Send finished requests to an OpenTelemetry collector as OTLP/HTTP JSON.
+
+    Requests are buffered and posted in batches by a background task, so export
+    never runs on the request path; when the collector falls behind the oldest
+    traces are dropped.
+    """
+
+    def __init__(self, endpoint: str, service_name: str, batch_size: int, interval: float, max_buffer: int):
+        self.endpoint = endpoint
+        self.service_name = service_name
+        self.batch_size = batch_size
+        self.interval = interval
+        self.buffer: deque[dict] = deque(maxlen=max_buffer)
+
+    def add(self, name: str, state, start_ns: int, total: float, status: int):
+        end_ns = start_ns + int(total * 1e9)
+        root = {
+            'traceId': state.trace_id,
+            'spanId': state.span_id,
+            'name': name,
+            'kind': 2,
+            'startTimeUnixNano': str(start_ns),
+            'endTimeUnixNano': str(end_ns),
+            'attributes': [{'key': 'http.status_code', 'value': {'intValue': str(status)}}],
+            'status': {'code': 2 if status >= 500 else 0},
+        }
+        if state.parent_span_id:
+            root['parentSpanId'] = state.parent_span_id
+        self.buffer.append(root)
+        for span_ in state.spans:
+            self.buffer.append(
+                {
+                    'traceId': state.trace_id,
+                    'spanId': span_.span_id,
+                    'parentSpanId': state.span_id,
+                    'name': span_.name,
+                    'kind': 1,
+                    'startTimeUnixNano': str(span_.start_ns),
+                    'endTimeUnixNano': str(span_.start_ns + int(span_.duration * 1e9)),
+                }
+            )
+
+    async def run(self):
+        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=self.interval * 2)) as session:
+            while True:
+                await asyncio.sleep(self.interval)
+                while self.buffer:
+                    batch = [self.buffer.popleft() for _ in range(min(self.batch_size, len(self.buffer)))]
+                    await self._post(session, batch)
+
+    async def _post(self, session: aiohttp.ClientSession, spans: list[dict]):
+        payload = {
+            'resourceSpans': [
+                {
+                    'resource': {
+                        'attributes': [{'key': 'service.name', 'value': {'stringValue': self.service_name}}]
+                    },
+                    'scopeSpans': [{'scope': {'name': __name__}, 'spans': spans}],
+                }
+            ]
+        }
+        try:
+            async with session.post(self.endpoint, json=payload) as response:
+                if response.status >= 400:
+                    logger.warning('Span export failed: %s', response.status)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as exc:
+            logger.warning('Span export failed: %r', exc)
+
+
+exporter: SpanExporter | None = None
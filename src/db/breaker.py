@@ -0,0 +1,116 @@
+import asyncio
+import time
+from collections import deque
+from typing import Awaitable
+from typing import Callable
+
+from elasticsearch import ConnectionError as ElasticConnectionError
+from elasticsearch import TransportError
+
+
+class ElasticUnavailableError(Exception):
+    """Elastic failed or the circuit breaker does not let calls through"""
+
+
+class CircuitOpenError(ElasticUnavailableError):
+    pass
+
+
+def is_failure(exc: Exception) -> bool:
+    """Errors that say Elastic is in trouble, unlike 404 or a bad query"""
+    if isinstance(exc, (ElasticConnectionError, asyncio.TimeoutError)):
+        return True
+    if isinstance(exc, TransportError):
+        return not isinstance(exc.status_code, int) or exc.status_code >= 500 or exc.status_code == 429
+    return False
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker over the last `window_size` Elastic calls.
+
+    Trips when the share of failed or slow calls crosses its threshold; calls cancelled
+    by the request deadline after `slow_call_ms` count as failed. While open,
+    calls fail immediately with CircuitOpenError. After `open_seconds` one probe call
+    is let through (half-open) and its outcome closes or reopens the circuit.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+    def __init__(
+        self,
+        window_size: int,
+        min_calls: int,
+        failure_rate: float,
+        slow_call_ms: float,
+        slow_call_rate: float,
+        open_seconds: float,
+    ):
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.slow_call = slow_call_ms / 1000
+        self.slow_call_rate = slow_call_rate
+        self.open_seconds = open_seconds
+        # (failed, slow) последних вызовов
+        self.outcomes: deque[tuple[bool, bool]] = deque(maxlen=window_size)
+        self.state = CircuitBreaker.CLOSED
+        self.opened_at = 0.0
+        self.probing = False
+
+    async def call(self, func: Callable[..., Awaitable], *args, **kwargs):
+        probe = self._acquire()
+        started = time.monotonic()
+        try:
+            result = await func(*args, **kwargs)
+        except Exception as exc:
+            if is_failure(exc):
+                self._record(True, time.monotonic() - started, probe)
+                raise ElasticUnavailableError(repr(exc)) from exc
+            self._record(False, time.monotonic() - started, probe)
+            raise
+        except asyncio.CancelledError:
+            latency = time.monotonic() - started
+            if latency >= self.slow_call:
+                # вызов, отменённый по сроку запроса после долгого ожидания, - признак зависшего Elastic:
+                # иначе при зависании breaker не видит ни одного исхода и не размыкается
+                self._record(True, latency, probe)
+            elif probe:
+                self.probing = False
+            raise
+        self._record(False, time.monotonic() - started, probe)
+        return result
+
+    def _acquire(self) -> bool:
+        """Let a call through or raise; True when the call is the half-open probe"""
+        if self.state == CircuitBreaker.CLOSED:
+            return False
+        if self.state == CircuitBreaker.OPEN and time.monotonic() - self.opened_at >= self.open_seconds:
+            self.state = CircuitBreaker.HALF_OPEN
+        if self.state == CircuitBreaker.HALF_OPEN and not self.probing:
+            self.probing = True
+            return True
+        raise CircuitOpenError('Elastic circuit breaker is open')
+
+    def _record(self, failed: bool, latency: float, probe: bool):
+        slow = latency >= self.slow_call
+        if probe:
+            self.probing = False
+            if failed or slow:
+                self._open()
+            else:
+                self.state = CircuitBreaker.CLOSED
+                self.outcomes.clear()
+            return
+        self.outcomes.append((failed, slow))
+        if self.state != CircuitBreaker.CLOSED or len(self.outcomes) < self.min_calls:
+            return
+        calls = len(self.outcomes)
+        failures = sum(failed for failed, _ in self.outcomes)
+        slow_calls = sum(slow for _, slow in self.outcomes)
+        if failures / calls >= self.failure_rate or slow_calls / calls >= self.slow_call_rate:
+            self._open()
+
+    def _open(self):
+        self.state = CircuitBreaker.OPEN
+        self.opened_at = time.monotonic()
+        self.outcomes.clear()
@@ -1,8 +1,21 @@
 from elasticsearch import AsyncElasticsearch
 
+from db.breaker import CircuitBreaker
+from db.msearch import MSearchBatcher
+
 es: AsyncElasticsearch | None = None
+batcher: MSearchBatcher | None = None
+breaker: CircuitBreaker | None = None
 
 
 # Функция понадобится при внедрении зависимостей
 async def get_elastic() -> AsyncElasticsearch:
     return es
+
+
+async def get_batcher() -> MSearchBatcher | None:
+    return batcher
+
+
+async def get_breaker() -> CircuitBreaker | None:
+    return breaker
@@ -0,0 +1,251 @@
+"""
+Versioned settings and mappings of Elastic indexes and commands to manage them.
+
+The API reads through aliases (`movies`, `genres`, `persons`); every alias points at
+one concrete index `<alias>_v<version>_<timestamp>`. Changing a mapping means bumping
+its version and running `reindex`, which builds a new index next to the live one,
+fills it and swaps the alias atomically.
+
+    python -m db.indexes create
+    python -m db.indexes reindex movies [--delete-old]
+"""
+import argparse
+import asyncio
+import copy
+import logging
+import time
+
+from core.config import ESSettings
+from elasticsearch import AsyncElasticsearch
+
+logger = logging.getLogger(__name__)
+
+MOVIES = 'movies'
+GENRES = 'genres'
+PERSONS = 'persons'
+
+ANALYSIS = {
+    'filter': {
+        'english_stop': {'type': 'stop', 'stopwords': '_english_'},
+        'english_stemmer': {'type': 'stemmer', 'language': 'english'},
+        'english_possessive_stemmer': {'type': 'stemmer', 'language': 'possessive_english'},
+        'russian_stop': {'type': 'stop', 'stopwords': '_russian_'},
+        'russian_stemmer': {'type': 'stemmer', 'language': 'russian'},
+    },
+    'analyzer': {
+        'ru_en': {
+            'tokenizer': 'standard',
+            'filter': [
+                'lowercase',
+                'english_stop',
+                'english_stemmer',
+                'english_possessive_stemmer',
+                'russian_stop',
+                'russian_stemmer',
+            ],
+        }
+    },
+    'normalizer': {
+        'lowercase': {'type': 'custom', 'filter': ['lowercase']},
+    },
+}
+
+# Настройки живого индекса; на время загрузки refresh и реплики выключаются
+LIVE_SETTINGS = {'refresh_interval': '1s', 'number_of_replicas': 1}
+BULK_SETTINGS = {'refresh_interval': '-1', 'number_of_replicas': 0}
+
+
+def _person_in_film() -> dict:
+    return {
+        'type': 'nested',
+        'dynamic': 'strict',
+        'properties': {
+            'uuid': {'type': 'keyword'},
+            'full_name': {'type': 'text', 'analyzer': 'ru_en', 'fields': {'raw': {'type': 'keyword'}}},
+        },
+    }
+
+
+INDEXES = {
+    MOVIES: {
+        'version': 3,
+        # index.sort не используется: Elastic 7 не позволяет сортировать индекс с nested полями
+        'settings': {'number_of_shards': 1, 'analysis': ANALYSIS},
+        'mappings': {
+            'dynamic': 'strict',
+            'properties': {
+                'uuid': {'type': 'keyword'},
+                'imdb_rating': {'type': 'scaled_float', 'scaling_factor': 10},
+                'title': {
+                    'type': 'text',
+                    'analyzer': 'ru_en',
+                    'fields': {'raw': {'type': 'keyword'}, 'suggest': {'type': 'search_as_you_type'}},
+                },
+                'description': {'type': 'text', 'analyzer': 'ru_en'},
+                'genre': {
+                    'type': 'nested',
+                    'dynamic': 'strict',
+                    'properties': {
+                        'uuid': {'type': 'keyword'},
+                        # фильтр по названию жанра не зависит от регистра: 'drama' находит 'Drama'
+                        'name': {
+                            'type': 'text',
+                            'analyzer': 'ru_en',
+                            'fields': {'raw': {'type': 'keyword', 'normalizer': 'lowercase'}},
+                        },
+                    },
+                },
+                'directors': _person_in_film(),
+                'actors': _person_in_film(),
+                'writers': _person_in_film(),
+                'actors_names': {'type': 'text', 'analyzer': 'ru_en'},
+                'writers_names': {'type': 'text', 'analyzer': 'ru_en'},
+                'creation_date': {'type': 'date'},
+                'age_rating': {'type': 'keyword'},
+                'url': {'type': 'keyword'},
+                'type': {'type': 'keyword'},
+            },
+        },
+    },
+    GENRES: {
+        'version': 2,
+        'settings': {
+            'number_of_shards': 1,
+            'analysis': ANALYSIS,
+            'sort.field': 'popularity',
+            'sort.order': 'desc',
+            'sort.missing': '_last',
+        },
+        'mappings': {
+            'dynamic': 'strict',
+            'properties': {
+                'uuid': {'type': 'keyword'},
+                'name': {'type': 'keyword'},
+                'description': {'type': 'text'},
+                'popularity': {'type': 'long'},
+            },
+        },
+    },
+    PERSONS: {
+        'version': 3,
+        'settings': {'number_of_shards': 1, 'analysis': ANALYSIS},
+        'mappings': {
+            'dynamic': 'strict',
+            'properties': {
+                'uuid': {'type': 'keyword'},
+                'full_name': {'type': 'keyword', 'fields': {'suggest': {'type': 'search_as_you_type'}}},
+                'role': {'type': 'keyword'},
+                'film_ids': {'type': 'keyword'},
+                # фильмография для выдачи без обращения к индексу фильмов, по записи на роль
+                'films': {
+                    'type': 'object',
+                    'dynamic': 'strict',
+                    'properties': {
+                        'uuid': {'type': 'keyword'},
+                        'title': {'type': 'text', 'index': False},
+                        'imdb_rating': {'type': 'scaled_float', 'scaling_factor': 10, 'index': False},
+                        'role': {'type': 'keyword'},
+                    },
+                },
+            },
+        },
+    },
+}
+
+
+def index_body(alias: str, bulk: bool = False) -> dict:
+    spec = INDEXES[alias]
+    settings = copy.deepcopy(spec['settings'])
+    settings.update(BULK_SETTINGS if bulk else LIVE_SETTINGS)
+    return {'settings': settings, 'mappings': spec['mappings']}
+
+
+def new_index_name(alias: str) -> str:
+    return f'{alias}_v{INDEXES[alias]["version"]}_{int(time.time())}'
+
+
+async def alias_targets(elastic: AsyncElasticsearch, alias: str) -> list[str]:
+    """Concrete indexes behind an alias; a legacy index named like the alias is returned as is"""
+    if await elastic.indices.exists_alias(name=alias):
+        return list(await elastic.indices.get_alias(name=alias))
+    if await elastic.indices.exists(index=alias):
+        return [alias]
+    return []
+
+
+async def create(elastic: AsyncElasticsearch):
+    """Create missing indexes with their aliases"""
+    for alias in INDEXES:
+        if await alias_targets(elastic, alias):
+            logger.info('%s already exists', alias)
+            continue
+        index = new_index_name(alias)
+        await elastic.indices.create(index=index, body={**index_body(alias), 'aliases': {alias: {}}})
+        logger.info('Created %s -> %s', alias, index)
+
+
+async def reindex(elastic: AsyncElasticsearch, alias: str, delete_old: bool):
+    """Build a new index from the live one and switch the alias to it atomically"""
+    old_indexes = await alias_targets(elastic, alias)
+    index = new_index_name(alias)
+    await elastic.indices.create(index=index, body=index_body(alias, bulk=True))
+    if old_indexes:
+        task = await elastic.reindex(
+            body={'source': {'index': alias}, 'dest': {'index': index}},
+            params={'wait_for_completion': 'false', 'slices': 'auto'},
+        )
+        await _wait_for_task(elastic, task['task'])
+    await elastic.indices.put_settings(index=index, body={'index': LIVE_SETTINGS})
+    await elastic.indices.refresh(index=index)
+
+    actions = [{'add': {'index': index, 'alias': alias}}]
+    for old_index in old_indexes:
+        if old_index == alias:
+            # старый индекс без алиаса: удаляется в той же атомарной операции
+            actions.append({'remove_index': {'index': old_index}})
+        else:
+            actions.append({'remove': {'index': old_index, 'alias': alias}})
+    await elastic.indices.update_aliases(body={'actions': actions})
+    logger.info('Switched %s: %s -> %s', alias, old_indexes, index)
+
+    if delete_old:
+        for old_index in old_indexes:
+            if old_index != alias:
+                await elastic.indices.delete(index=old_index)
+
+
+async def _wait_for_task(elastic: AsyncElasticsearch, task_id: str):
+    while True:
+        task = await elastic.tasks.get(task_id=task_id)
+        if task['completed']:
+            failures = task.get('response', {}).get('failures')
+            if task.get('error') or failures:
+                raise RuntimeError(f'Reindex failed: {task.get("error") or failures}')
+            return
+        status = task['task']['status']
+        logger.info('Reindexing: %s/%s', status.get('created', 0) + status.get('updated', 0), status.get('total'))
+        await asyncio.sleep(2)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description='Manage Elastic indexes of the API')
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('create', help='create missing indexes and aliases')
+    reindex_parser = commands.add_parser('reindex', help='rebuild an index with the current mapping')
+    reindex_parser.add_argument('alias', choices=list(INDEXES))
+    reindex_parser.add_argument('--delete-old', action='store_true')
+    args = parser.parse_args()
+
+    settings = ESSettings()
+    elastic = AsyncElasticsearch(hosts=[f'{settings.es_host}:{settings.es_port}'])
+    try:
+        if args.command == 'create':
+            await create(elastic)
+        else:
+            await reindex(elastic, args.alias, args.delete_old)
+    finally:
+        await elastic.close()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
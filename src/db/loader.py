@@ -0,0 +1,68 @@
+import asyncio
+from typing import Any
+from typing import Awaitable
+from typing import Callable
+from typing import Hashable
+
+
+class DataLoader:
+    """
+    Collect keys requested while resolving one level of a query into a single batch call.
+
+    A batch is sent on the next pass of the event loop after the first `load`: resolvers
+    of sibling fields and list items are started together, so they get into one batch.
+    Results are remembered per key, so the loader is meant to live for one request: an
+    object referenced many times in a response is fetched once. `batch_load` gets unique
+    keys and returns values in their order. Batches still running when the request ends,
+    e.g. because the client went away, are cancelled by `close`.
+    """
+
+    def __init__(self, batch_load: Callable[[list], Awaitable[list]]):
+        self.batch_load = batch_load
+        self._futures: dict[Hashable, asyncio.Future] = {}
+        self._queue: list[Hashable] = []
+        self._dispatch_handle: asyncio.Handle | None = None
+        # ссылки на задачи пакетов: иначе сборщик мусора может удалить незавершённую задачу
+        self._tasks: set[asyncio.Task] = set()
+
+    def load(self, key: Hashable) -> asyncio.Future:
+        future = self._futures.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = self._futures[key] = loop.create_future()
+            self._queue.append(key)
+            if len(self._queue) == 1:
+                self._dispatch_handle = loop.call_soon(self._dispatch)
+        return future
+
+    async def load_many(self, keys: list[Hashable]) -> list[Any]:
+        return list(await asyncio.gather(*(self.load(key) for key in keys)))
+
+    def close(self):
+        """Cancel batches that are queued or running and loads waiting for them"""
+        if self._dispatch_handle:
+            self._dispatch_handle.cancel()
+        self._queue = []
+        for task in self._tasks:
+            task.cancel()
+        for future in self._futures.values():
+            future.cancel()
+
+    def _dispatch(self):
+        self._dispatch_handle = None
+        keys, self._queue = self._queue, []
+        task = asyncio.create_task(self._send(keys))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _send(self, keys: list[Hashable]):
+        try:
+            values = await self.batch_load(keys)
+        except Exception as exc:
+            for key in keys:
+                if not self._futures[key].done():
+                    self._futures[key].set_exception(exc)
+            return
+        for key, value in zip(keys, values):
+            if not self._futures[key].done():
+                self._futures[key].set_result(value)
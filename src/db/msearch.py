@@ -0,0 +1,94 @@
+import asyncio
+
+from elasticsearch import AsyncElasticsearch
+from elasticsearch import TransportError
+from elasticsearch.exceptions import HTTP_EXCEPTIONS
+
+
+class MSearchBatcher:
+    """
+    Collect searches issued within a short window into one `_msearch` request.
+
+    A batch is sent when the window elapses or `max_batch` searches are waiting,
+    whichever comes first. Every caller gets its own response or exception,
+    exactly as if it had called `AsyncElasticsearch.search` itself. A cancelled
+    search is dropped from its batch, and a batch nobody waits for is cancelled.
+    """
+
+    def __init__(self, elastic: AsyncElasticsearch, window: float, max_batch: int):
+        self.elastic = elastic
+        self.window = window
+        self.max_batch = max_batch
+        self._pending: list[tuple[dict, dict, asyncio.Future]] = []
+        self._flush_handle: asyncio.TimerHandle | None = None
+        # future поиска -> задача, отправившая его пакет, и futures всего пакета
+        self._in_flight: dict[asyncio.Future, tuple[asyncio.Task, list[asyncio.Future]]] = {}
+
+    async def search(self, index: str, body: dict, size: int | None = None, from_: int | None = None) -> dict:
+        body = dict(body)
+        if size is not None:
+            body['size'] = size
+        if from_ is not None:
+            body['from'] = from_
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append(({'index': index}, body, future))
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.window, self._flush)
+        try:
+            return await future
+        except asyncio.CancelledError:
+            self._abandon(future)
+            raise
+
+    def _abandon(self, future: asyncio.Future):
+        if future not in self._in_flight:
+            self._pending = [item for item in self._pending if item[2] is not future]
+            return
+        task, futures = self._in_flight[future]
+        if all(future_.done() for future_ in futures):
+            task.cancel()
+
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self._pending = self._pending, []
+        if batch:
+            futures = [future for _, _, future in batch]
+            task = asyncio.create_task(self._send(batch))
+            for future in futures:
+                self._in_flight[future] = (task, futures)
+            task.add_done_callback(lambda _: [self._in_flight.pop(future, None) for future in futures])
+
+    async def _send(self, batch: list[tuple[dict, dict, asyncio.Future]]):
+        try:
+            if len(batch) == 1:
+                header, body, _ = batch[0]
+                responses = [await self.elastic.search(index=header['index'], body=body)]
+            else:
+                lines = [line for header, body, _ in batch for line in (header, body)]
+                responses = (await self.elastic.msearch(body=lines))['responses']
+        except Exception as exc:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+
+        for (_, _, future), response in zip(batch, responses):
+            if future.done():
+                # вызывающий уже отменил запрос
+                continue
+            if 'error' in response:
+                future.set_exception(self._error(response))
+            else:
+                future.set_result(response)
+
+    @staticmethod
+    def _error(response: dict) -> TransportError:
+        status = response.get('status', 500)
+        error = response['error']
+        error_type = error.get('type', 'unknown') if isinstance(error, dict) else str(error)
+        return HTTP_EXCEPTIONS.get(status, TransportError)(status, error_type, response)
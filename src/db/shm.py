@@ -0,0 +1,120 @@
+import fcntl
+import hashlib
+import mmap
+import os
+import struct
+import time
+
+MAGIC = b'ASYNCAPI'
+# magic, version, buckets, ways, slot size
+HEADER = struct.Struct('<8sIIII')
+HEADER_SIZE = 64
+# seq, key hash, expires at, last access, length
+SLOT_HEADER = struct.Struct('<Q16sddI')
+SLOT_HEADER_SIZE = 48
+VERSION = 1
+
+
+class SharedMemoryCache:
+    """
+    Fixed-size cache in a memory mapped file shared by all workers on the host.
+
+    The arena is split into buckets of `ways` slots; a key lives in one bucket and
+    evicts the least recently used slot of it. Readers never lock: every slot has a
+    sequence counter that writers make odd while writing (seqlock), and a read that
+    saw it change is treated as a miss. Writers serialize on `flock` and skip the
+    write instead of waiting when another worker holds the lock. The file name carries
+    the geometry, so a live arena is never resized under the workers mapping it.
+    """
+
+    def __init__(self, path: str, buckets: int, ways: int, slot_size: int):
+        self.buckets = buckets
+        self.ways = ways
+        self.slot_size = slot_size
+        self.capacity = slot_size - SLOT_HEADER_SIZE
+        size = HEADER_SIZE + buckets * ways * slot_size
+
+        # у каждой геометрии свой файл: старые воркеры (reload gunicorn) продолжают работать со своим,
+        # а уменьшение файла, отображённого в память другого процесса, убило бы его по SIGBUS
+        self.path = f'{path}.v{VERSION}.{buckets}x{ways}x{slot_size}'
+        self.fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        fcntl.flock(self.fd, fcntl.LOCK_EX)
+        try:
+            header = HEADER.pack(MAGIC, VERSION, buckets, ways, slot_size)
+            if os.fstat(self.fd).st_size < size:
+                # первый воркер создаёт арену; файл только растёт, новые байты - нули
+                os.ftruncate(self.fd, size)
+            if os.pread(self.fd, HEADER.size, 0) != header:
+                os.pwrite(self.fd, header, 0)
+            self.mm = mmap.mmap(self.fd, size)
+        finally:
+            fcntl.flock(self.fd, fcntl.LOCK_UN)
+
+    def close(self):
+        self.mm.close()
+        os.close(self.fd)
+
+    def _slots(self, key_hash: bytes) -> range:
+        bucket = int.from_bytes(key_hash[:8], 'little') % self.buckets
+        first = HEADER_SIZE + bucket * self.ways * self.slot_size
+        return range(first, first + self.ways * self.slot_size, self.slot_size)
+
+    @staticmethod
+    def _hash(key: str) -> bytes:
+        return hashlib.blake2b(key.encode(), digest_size=16).digest()
+
+    def get(self, key: str) -> bytes | None:
+        key_hash = self._hash(key)
+        now = time.time()
+        for offset in self._slots(key_hash):
+            seq, slot_hash, expires_at, _, length = SLOT_HEADER.unpack_from(self.mm, offset)
+            if seq & 1 or slot_hash != key_hash:
+                continue
+            if expires_at < now:
+                return None
+            start = offset + SLOT_HEADER_SIZE
+            value = self.mm[start:start + length]
+            if SLOT_HEADER.unpack_from(self.mm, offset)[0] != seq:
+                # слот переписали во время чтения
+                return None
+            struct.pack_into('<d', self.mm, offset + 32, now)
+            return value
+        return None
+
+    def set(self, key: str, value: bytes, expire: float):
+        if len(value) > self.capacity:
+            return
+        try:
+            fcntl.flock(self.fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return
+        try:
+            key_hash = self._hash(key)
+            now = time.time()
+            victim, victim_access = None, None
+            for offset in self._slots(key_hash):
+                _, slot_hash, expires_at, last_access, _ = SLOT_HEADER.unpack_from(self.mm, offset)
+                if slot_hash == key_hash:
+                    victim = offset
+                    break
+                if expires_at < now:
+                    last_access = 0.0
+                if victim is None or last_access < victim_access:
+                    victim, victim_access = offset, last_access
+
+            seq = SLOT_HEADER.unpack_from(self.mm, victim)[0]
+            struct.pack_into('<Q', self.mm, victim, seq + 1)
+            start = victim + SLOT_HEADER_SIZE
+            self.mm[start:start + len(value)] = value
+            SLOT_HEADER.pack_into(self.mm, victim, seq + 1, key_hash, now + expire, now, len(value))
+            struct.pack_into('<Q', self.mm, victim, seq + 2)
+        finally:
+            fcntl.flock(self.fd, fcntl.LOCK_UN)
+
+
+cache: SharedMemoryCache | None = None
+
+
+# Функция понадобится при внедрении зависимостей
+async def get_shm() -> SharedMemoryCache | None:
+    return cache
@@ -0,0 +1,34 @@
+"""Open storage connections before a worker takes traffic"""
+import asyncio
+
+from aioredis import Redis
+from db.indexes import INDEXES
+from elasticsearch import AsyncElasticsearch
+from elasticsearch import NotFoundError
+
+# Соединения открыты и индексы прочитаны; до этого /health/ready отвечает 503
+warm = False
+
+
+async def warm_up(redis: Redis, es: AsyncElasticsearch, redis_connections: int, es_connections: int):
+    """
+    Use every pooled Redis connection and open `es_connections` keep-alive connections to Elastic.
+
+    The Redis pool hands commands to its connections in turn, so one PING per connection
+    checks them all. Concurrent Elastic requests make the HTTP pool open as many connections;
+    they are cheap searches spread over the indexes, so the first real requests find the
+    index files in the page cache.
+    """
+    global warm
+    await asyncio.gather(*(redis.ping() for _ in range(redis_connections)))
+    indexes = list(INDEXES)
+    await asyncio.gather(*(_touch(es, indexes[i % len(indexes)]) for i in range(max(es_connections, len(indexes)))))
+    warm = True
+
+
+async def _touch(es: AsyncElasticsearch, index: str):
+    try:
+        await es.search(index=index, body={'size': 1, 'track_total_hits': False})
+    except NotFoundError:
+        # индекса ещё нет: соединение всё равно открыто
+        pass
@@ -0,0 +1,109 @@
+"""
+Compute genre popularity from the movies index.
+
+Every film of a genre counts as 1 + imdb_rating / 10, so a genre with many well rated
+films goes first; unrated films count as 1. Film counts and rating sums of all genres
+come from one aggregation over movies, the result is written to `popularity` of the
+genre documents. The genres index is sorted by popularity, so the genre list sorted by
+it is read in index order and not sorted per request. At the end the genre generation
+in Redis is bumped, so API workers reload their genre snapshots.
+
+    python -m etl.genres
+"""
+import asyncio
+import logging
+
+import aioredis
+from core.config import ESSettings
+from core.config import RedisSettings
+from db.indexes import GENRES
+from db.indexes import MOVIES
+from elasticsearch import AsyncElasticsearch
+from elasticsearch.helpers import async_bulk
+from elasticsearch.helpers import async_scan
+from services.snapshot import GENERATION_KEY
+
+logger = logging.getLogger(__name__)
+
+# популярность хранится целым числом (long), множитель сохраняет два знака
+POPULARITY_SCALE = 100
+MAX_GENRES = 10000
+SCAN_SIZE = 1000
+BULK_CHUNK_SIZE = 500
+
+
+async def collect_popularity(elastic: AsyncElasticsearch) -> dict[str, int]:
+    """Popularity of every genre that has films, keyed by genre uuid"""
+    body = {
+        'size': 0,
+        'aggs': {
+            'genres': {
+                'nested': {'path': 'genre'},
+                'aggs': {
+                    'ids': {
+                        'terms': {'field': 'genre.uuid', 'size': MAX_GENRES},
+                        'aggs': {
+                            'films': {
+                                'reverse_nested': {},
+                                'aggs': {'rating': {'sum': {'field': 'imdb_rating', 'missing': 0}}},
+                            }
+                        },
+                    }
+                },
+            }
+        },
+    }
+    response = await elastic.search(index=MOVIES, body=body)
+    popularity = {}
+    for bucket in response['aggregations']['genres']['ids']['buckets']:
+        films = bucket['films']
+        weighted = films['doc_count'] + films['rating']['value'] / 10
+        popularity[bucket['key']] = round(weighted * POPULARITY_SCALE)
+    return popularity
+
+
+async def genre_ids(elastic: AsyncElasticsearch) -> list[str]:
+    return [
+        hit['_id'] async for hit in async_scan(elastic, index=GENRES, query={'_source': False}, size=SCAN_SIZE)
+    ]
+
+
+def bulk_actions(ids: list[str], popularity: dict[str, int]):
+    # только существующие жанры: upsert создал бы документ без названия
+    for genre_id in ids:
+        yield {
+            '_op_type': 'update',
+            '_index': GENRES,
+            '_id': genre_id,
+            'doc': {'popularity': popularity.get(genre_id, 0)},
+        }
+
+
+async def main():
+    settings = ESSettings()
+    elastic = AsyncElasticsearch(hosts=[f'{settings.es_host}:{settings.es_port}'])
+    try:
+        popularity = await collect_popularity(elastic)
+        ids = await genre_ids(elastic)
+        logger.info('Computed popularity of %s genres, %s genres in the index', len(popularity), len(ids))
+        success, errors = await async_bulk(
+            elastic, bulk_actions(ids, popularity), chunk_size=BULK_CHUNK_SIZE, raise_on_error=False
+        )
+        logger.info('Updated %s genres, %s errors', success, len(errors))
+        for error in errors[:10]:
+            logger.error('Failed to update a genre: %s', error)
+        # воркеры перечитают жанры сразу после смены поколения, к этому времени обновления должны быть видны
+        await elastic.indices.refresh(index=GENRES)
+    finally:
+        await elastic.close()
+    redis_settings = RedisSettings()
+    redis = await aioredis.create_redis((redis_settings.host, redis_settings.port))
+    try:
+        await redis.incr(GENERATION_KEY)
+    finally:
+        redis.close()
+        await redis.wait_closed()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,138 @@
+"""
+Build person documents with their filmography from the movies index.
+
+Every person gets `films`: one short record (uuid, title, imdb_rating, role) per role
+they had in a film, so the person films endpoint is served from the person document
+alone. `film_ids` and the most frequent `role` are kept for older readers.
+
+Only persons whose filmography changed are written; persons left without films get it
+cleared. Cache entries of the written persons are purged at the end, locally and at the
+edges, so new filmographies are served right away.
+
+    python -m etl.persons
+"""
+import asyncio
+import logging
+from collections import Counter
+
+import aioredis
+from core.config import ESSettings
+from core.config import RedisSettings
+from db.indexes import MOVIES
+from db.indexes import PERSONS
+from elasticsearch import AsyncElasticsearch
+from elasticsearch.helpers import async_bulk
+from elasticsearch.helpers import async_scan
+from services.cache_keys import person_films_key
+from services.cache_keys import stale_key
+from services.purge import PurgeService
+
+logger = logging.getLogger(__name__)
+
+# поле фильма -> роль персоны
+ROLES = {
+    'actors': 'actor',
+    'directors': 'director',
+    'writers': 'writer',
+}
+# поля, которые строит ETL
+FILMOGRAPHY_FIELDS = ['full_name', 'films', 'film_ids', 'role']
+EMPTY_FILMOGRAPHY = {'films': [], 'film_ids': [], 'role': None}
+SCAN_SIZE = 1000
+BULK_CHUNK_SIZE = 500
+# столько ключей уходит в одном purge, заголовок Surrogate-Key для edge-кешей не должен расти без предела
+PURGE_CHUNK_SIZE = 100
+
+
+async def collect_filmographies(elastic: AsyncElasticsearch) -> dict[str, dict]:
+    """Person documents keyed by uuid, gathered from one scan over all films"""
+    persons = {}
+    source = ['uuid', 'title', 'imdb_rating', *ROLES]
+    async for hit in async_scan(elastic, index=MOVIES, query={'_source': source}, size=SCAN_SIZE):
+        film = hit['_source']
+        for field, role in ROLES.items():
+            for person in film.get(field) or []:
+                doc = persons.get(person['uuid'])
+                if doc is None:
+                    doc = {'uuid': person['uuid'], 'full_name': person['full_name'], 'films': []}
+                    persons[person['uuid']] = doc
+                doc['films'].append(
+                    {'uuid': film['uuid'], 'title': film['title'], 'imdb_rating': film.get('imdb_rating'), 'role': role}
+                )
+    for doc in persons.values():
+        doc['films'].sort(key=lambda film: (-(film['imdb_rating'] or 0), film['uuid'], film['role']))
+        doc['film_ids'] = list(dict.fromkeys(film['uuid'] for film in doc['films']))
+        doc['role'] = Counter(film['role'] for film in doc['films']).most_common(1)[0][0]
+    return persons
+
+
+async def indexed_filmographies(elastic: AsyncElasticsearch) -> dict[str, dict]:
+    """Filmography fields of the person documents as they are in the index"""
+    query = {'_source': FILMOGRAPHY_FIELDS}
+    return {hit['_id']: hit['_source'] async for hit in async_scan(elastic, index=PERSONS, query=query, size=SCAN_SIZE)}
+
+
+def changed_persons(persons: dict[str, dict], indexed: dict[str, dict]) -> dict[str, dict]:
+    """Documents to write: new and changed filmographies, and cleared ones of persons without films"""
+    changed = {}
+    for person_id, doc in persons.items():
+        current = indexed.get(person_id)
+        if current is None or any(current.get(field) != doc[field] for field in FILMOGRAPHY_FIELDS):
+            changed[person_id] = doc
+    for person_id, current in indexed.items():
+        if person_id not in persons and (current.get('films') or current.get('film_ids')):
+            changed[person_id] = EMPTY_FILMOGRAPHY
+    return changed
+
+
+def bulk_actions(persons: dict[str, dict]):
+    for person_id, doc in persons.items():
+        yield {
+            '_op_type': 'update',
+            '_index': PERSONS,
+            '_id': person_id,
+            'doc': doc,
+            'doc_as_upsert': True,
+        }
+
+
+async def purge_persons(person_ids: list[str]):
+    """Drop cached persons and person films, with their stale copies"""
+    settings = RedisSettings()
+    redis = await aioredis.create_redis((settings.host, settings.port))
+    try:
+        purge_service = PurgeService(redis)
+        for start in range(0, len(person_ids), PURGE_CHUNK_SIZE):
+            chunk = person_ids[start:start + PURGE_CHUNK_SIZE]
+            await purge_service.purge([f'person:{person_id}' for person_id in chunk])
+            # списки фильмов персоны помечены ключами фильмов, а не персоны
+            keys = [person_films_key(person_id) for person_id in chunk]
+            await redis.delete(*keys, *(stale_key(key) for key in keys))
+    finally:
+        redis.close()
+        await redis.wait_closed()
+
+
+async def main():
+    settings = ESSettings()
+    elastic = AsyncElasticsearch(hosts=[f'{settings.es_host}:{settings.es_port}'])
+    try:
+        persons = await collect_filmographies(elastic)
+        changed = changed_persons(persons, await indexed_filmographies(elastic))
+        logger.info('Collected filmographies of %s persons, %s changed', len(persons), len(changed))
+        success, errors = await async_bulk(
+            elastic, bulk_actions(changed), chunk_size=BULK_CHUNK_SIZE, raise_on_error=False
+        )
+        logger.info('Updated %s persons, %s errors', success, len(errors))
+        for error in errors[:10]:
+            logger.error('Failed to update a person: %s', error)
+        # кеш сбрасывается, когда новые документы уже видны поиску и get
+        await elastic.indices.refresh(index=PERSONS)
+    finally:
+        await elastic.close()
+    await purge_persons(list(changed))
+    logger.info('Purged cache entries of %s persons', len(changed))
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
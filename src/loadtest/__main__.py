@@ -0,0 +1,92 @@
+"""
+Replay a Zipf-distributed mix of API requests and report latency percentiles,
+throughput and cache hit ratio per route.
+
+    python -m loadtest --concurrency 50 --duration 30
+    python -m loadtest --url http://127.0.0.1:8000 --mix films_detail=5,films_search=1
+    python -m loadtest --es-outage-after 10
+"""
+import argparse
+import asyncio
+import logging
+import random
+
+import aiohttp
+from core.config import LoadTestSettings
+from loadtest.runner import asgi_sender
+from loadtest.runner import build_stubs
+from loadtest.runner import http_sender
+from loadtest.runner import run
+from loadtest.workload import DEFAULT_MIX
+from loadtest.workload import Workload
+from loadtest.workload import generate_catalogue
+from loadtest.workload import parse_mix
+
+
+def parse_args(settings: LoadTestSettings) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog='python -m loadtest', description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--url', help='load a running server instead of the app in-process with stand-ins')
+    parser.add_argument('--concurrency', type=int, default=20)
+    parser.add_argument('--duration', type=float, default=20, help='measured seconds')
+    parser.add_argument('--warmup', type=float, default=5, help='seconds to fill caches before measuring')
+    parser.add_argument('--mix', default=DEFAULT_MIX, help='route=weight,... (default: %(default)s)')
+    parser.add_argument('--zipf', type=float, default=1.1, help='Zipf exponent of ids, pages and queries')
+    parser.add_argument('--films', type=int, default=settings.films)
+    parser.add_argument('--persons', type=int, default=settings.persons)
+    parser.add_argument('--es-latency-ms', type=float, default=settings.es_latency_ms)
+    parser.add_argument('--redis-latency-ms', type=float, default=settings.redis_latency_ms)
+    parser.add_argument('--seed', type=int, default=settings.seed)
+    parser.add_argument(
+        '--es-outage-after',
+        type=float,
+        help='seconds after which the stand-in Elastic stops answering; '
+        'requests should get stale answers or quick 503 once the breaker opens, not wait for 504',
+    )
+    return parser.parse_args()
+
+
+async def main():
+    settings = LoadTestSettings()
+    args = parse_args(settings)
+    settings = settings.copy(
+        update={
+            'films': args.films,
+            'persons': args.persons,
+            'es_latency_ms': args.es_latency_ms,
+            'redis_latency_ms': args.redis_latency_ms,
+            'seed': args.seed,
+        }
+    )
+    rng = random.Random(args.seed)
+
+    if args.url:
+        # каталог с тем же seed, что и у loadtest.app, - id совпадают
+        catalogue = generate_catalogue(settings.films, settings.persons, random.Random(settings.seed))
+        workload = Workload(catalogue, parse_mix(args.mix), args.zipf, rng)
+        connector = aiohttp.TCPConnector(limit=args.concurrency)
+        async with aiohttp.ClientSession(connector=connector) as session:
+            stats, elapsed = await run(
+                workload, http_sender(session, args.url), args.concurrency, args.duration, args.warmup
+            )
+    else:
+        import main as api
+
+        # отчёт о медленных запросах на каждый запрос только мешает итоговой таблице
+        logging.getLogger('middleware.request_state').setLevel(logging.ERROR)
+        catalogue, redis, elastic = build_stubs(settings)
+        await api.setup(redis, elastic)
+        # подсказки строятся в фоне; ждём первую сборку, чтобы не мерить запасной путь
+        await asyncio.sleep(0.5)
+        workload = Workload(catalogue, parse_mix(args.mix), args.zipf, rng)
+        if args.es_outage_after is not None:
+            asyncio.get_running_loop().call_later(args.es_outage_after, elastic.hang)
+        try:
+            stats, elapsed = await run(workload, asgi_sender(api.app), args.concurrency, args.duration, args.warmup)
+        finally:
+            await api.shutdown()
+
+    print(stats.report(elapsed))
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,21 @@
+"""
+The API on top of the stand-ins, for loading a real server:
+
+    gunicorn -w 4 -k uvicorn.workers.UvicornWorker loadtest.app:app
+    python -m loadtest --url http://127.0.0.1:8000
+
+Every worker generates the same catalogue (same seed) but has its own stand-in Redis.
+"""
+from core.config import LoadTestSettings
+from loadtest.runner import build_stubs
+from main import app
+from main import setup
+
+
+async def startup():
+    _, redis, elastic = build_stubs(LoadTestSettings())
+    await setup(redis, elastic)
+
+
+# вместо подключения к настоящим Redis и Elastic
+app.router.on_startup = [startup]
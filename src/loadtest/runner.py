@@ -0,0 +1,147 @@
+"""Drive a workload against the app in-process or over HTTP and summarize the results"""
+import asyncio
+import random
+import time
+from collections import Counter
+from collections import defaultdict
+from typing import Awaitable
+from typing import Callable
+from urllib.parse import urlsplit
+
+import aiohttp
+from core.config import LoadTestSettings
+from loadtest.stubs import Latency
+from loadtest.stubs import StubElastic
+from loadtest.stubs import StubRedis
+from loadtest.workload import Catalogue
+from loadtest.workload import Workload
+from loadtest.workload import generate_catalogue
+from starlette.types import ASGIApp
+
+# (status, value of X-Cache or None)
+Send = Callable[[str], Awaitable[tuple[int, str | None]]]
+
+
+def build_stubs(settings: LoadTestSettings) -> tuple[Catalogue, StubRedis, StubElastic]:
+    catalogue = generate_catalogue(settings.films, settings.persons, random.Random(settings.seed))
+    redis = StubRedis(Latency(settings.redis_latency_ms, settings.redis_jitter_ms))
+    elastic = StubElastic(catalogue.indexes(), Latency(settings.es_latency_ms, settings.es_jitter_ms))
+    return catalogue, redis, elastic
+
+
+def asgi_sender(app: ASGIApp) -> Send:
+    """Call the ASGI app directly, without a server or sockets in between"""
+
+    async def send(url: str) -> tuple[int, str | None]:
+        parts = urlsplit(url)
+        scope = {
+            'type': 'http',
+            'asgi': {'version': '3.0'},
+            'http_version': '1.1',
+            'method': 'GET',
+            'scheme': 'http',
+            'path': parts.path,
+            'raw_path': parts.path.encode(),
+            'query_string': parts.query.encode(),
+            'root_path': '',
+            'headers': [(b'host', b'loadtest'), (b'accept-encoding', b'gzip, br')],
+            'client': ('127.0.0.1', 0),
+            'server': ('loadtest', 80),
+        }
+        response = {}
+
+        async def receive():
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+        async def collect(message):
+            if message['type'] == 'http.response.start':
+                response['status'] = message['status']
+                response['x-cache'] = dict(message.get('headers', [])).get(b'x-cache')
+
+        await app(scope, receive, collect)
+        x_cache = response.get('x-cache')
+        return response['status'], x_cache.decode() if x_cache else None
+
+    return send
+
+
+def http_sender(session: aiohttp.ClientSession, base_url: str) -> Send:
+    async def send(url: str) -> tuple[int, str | None]:
+        async with session.get(base_url.rstrip('/') + url) as response:
+            await response.read()
+            return response.status, response.headers.get('X-Cache')
+
+    return send
+
+
+class Stats:
+    def __init__(self):
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.statuses: dict[str, Counter] = defaultdict(Counter)
+        self.cache: dict[str, Counter] = defaultdict(Counter)
+
+    def record(self, route: str, latency: float, status: int, x_cache: str | None):
+        self.latencies[route].append(latency)
+        self.statuses[route][status] += 1
+        if x_cache:
+            self.cache[route][x_cache] += 1
+
+    def report(self, elapsed: float) -> str:
+        header = (
+            f'{"route":<16}{"requests":>9}{"rps":>9}{"p50 ms":>9}{"p95 ms":>9}{"p99 ms":>9}{"hit %":>8}{"errors":>8}'
+            f'{"504":>6}'
+        )
+        lines = [header, '-' * len(header)]
+        for route in sorted(self.latencies, key=lambda route: -len(self.latencies[route])):
+            lines.append(self._line(route, self.latencies[route], self.statuses[route], self.cache[route], elapsed))
+        lines.append('-' * len(header))
+        lines.append(
+            self._line(
+                'total',
+                [latency for latencies in self.latencies.values() for latency in latencies],
+                sum(self.statuses.values(), Counter()),
+                sum(self.cache.values(), Counter()),
+                elapsed,
+            )
+        )
+        return '\n'.join(lines)
+
+    @staticmethod
+    def _line(route: str, latencies: list[float], statuses: Counter, cache: Counter, elapsed: float) -> str:
+        latencies = sorted(latencies)
+        count = len(latencies)
+
+        def percentile(p: float) -> float:
+            return latencies[min(count - 1, int(p * count))] * 1000 if count else 0.0
+
+        looked_up = cache['HIT'] + cache['MISS']
+        hit_ratio = f'{cache["HIT"] / looked_up * 100:.1f}' if looked_up else '-'
+        errors = sum(number for status, number in statuses.items() if status >= 500)
+        # ответы, прождавшие весь срок запроса
+        timeouts = statuses[504]
+        return (
+            f'{route:<16}{count:>9}{count / elapsed:>9.1f}'
+            f'{percentile(0.5):>9.1f}{percentile(0.95):>9.1f}{percentile(0.99):>9.1f}{hit_ratio:>8}{errors:>8}'
+            f'{timeouts:>6}'
+        )
+
+
+async def run(workload: Workload, send: Send, concurrency: int, duration: float, warmup: float) -> tuple[Stats, float]:
+    """Keep `concurrency` requests in flight for warmup + duration seconds; only the measured part is recorded"""
+    stats = Stats()
+    started = time.monotonic()
+    measure_from = started + warmup
+    deadline = measure_from + duration
+
+    async def worker():
+        while (now := time.monotonic()) < deadline:
+            route, url = workload.next()
+            try:
+                status, x_cache = await send(url)
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                status, x_cache = 599, None
+            if now >= measure_from:
+                stats.record(route, time.monotonic() - now, status, x_cache)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return stats, time.monotonic() - measure_from
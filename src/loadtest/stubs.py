@@ -0,0 +1,351 @@
+"""
+In-process stand-ins for Redis and Elasticsearch.
+
+They implement the part of the aioredis 1.x and AsyncElasticsearch APIs the app uses,
+keep their data in memory and sleep for an injected latency on every round trip, so
+the app can be started and loaded without the real services.
+"""
+import asyncio
+import random
+import time
+
+from elasticsearch import NotFoundError
+
+# дольше любого срока запроса
+HANG_MS = 3600 * 1000
+
+
+class Latency:
+    """Round trip time in milliseconds: a normal distribution cut at zero"""
+
+    def __init__(self, mean_ms: float, jitter_ms: float = 0.0):
+        self.mean = mean_ms / 1000
+        self.jitter = jitter_ms / 1000
+
+    async def wait(self):
+        delay = random.gauss(self.mean, self.jitter) if self.jitter else self.mean
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class StubPipeline:
+    """Commands are queued and executed in one round trip, like a Redis pipeline or MULTI/EXEC"""
+
+    def __init__(self, redis: 'StubRedis'):
+        self.redis = redis
+        self.commands = []
+
+    def __getattr__(self, name: str):
+        def queue(*args, **kwargs):
+            self.commands.append((name, args, kwargs))
+
+        return queue
+
+    async def execute(self) -> list:
+        await self.redis.latency.wait()
+        return [getattr(self.redis, f'_{name}')(*args, **kwargs) for name, args, kwargs in self.commands]
+
+
+class StubRedis:
+    def __init__(self, latency: Latency):
+        self.latency = latency
+        self.data: dict[str, bytes | dict | set] = {}
+        self.expires: dict[str, float] = {}
+
+    def __getattr__(self, name: str):
+        # команда = задержка + синхронная реализация _<name>
+        command = getattr(type(self), f'_{name}', None)
+        if command is None:
+            raise AttributeError(name)
+
+        async def call(*args, **kwargs):
+            await self.latency.wait()
+            return command(self, *args, **kwargs)
+
+        return call
+
+    def pipeline(self) -> StubPipeline:
+        return StubPipeline(self)
+
+    def multi_exec(self) -> StubPipeline:
+        return StubPipeline(self)
+
+    def close(self):
+        pass
+
+    async def wait_closed(self):
+        pass
+
+    def _value(self, key: str):
+        expires_at = self.expires.get(key)
+        if expires_at is not None and expires_at < time.monotonic():
+            self.data.pop(key, None)
+            self.expires.pop(key, None)
+        return self.data.get(key)
+
+    @staticmethod
+    def _encode(value) -> bytes:
+        if isinstance(value, bytes):
+            return value
+        return str(value).encode()
+
+    def _ping(self) -> bytes:
+        return b'PONG'
+
+    def _get(self, key: str, **kwargs) -> bytes | None:
+        value = self._value(key)
+        return value if isinstance(value, bytes) else None
+
+    def _mget(self, key: str, *keys: str, **kwargs) -> list:
+        return [self._get(key_) for key_ in (key, *keys)]
+
+    def _set(self, key: str, value, expire: float = 0, **kwargs) -> bool:
+        self.data[key] = self._encode(value)
+        self._expire(key, expire)
+        return True
+
+    def _expire(self, key: str, timeout: float) -> int:
+        if timeout:
+            self.expires[key] = time.monotonic() + timeout
+        else:
+            self.expires.pop(key, None)
+        return int(key in self.data)
+
+    def _incr(self, key: str) -> int:
+        value = int(self._get(key) or 0) + 1
+        self.data[key] = self._encode(value)
+        return value
+
+    def _delete(self, key: str, *keys: str) -> int:
+        deleted = 0
+        for key_ in (key, *keys):
+            deleted += self.data.pop(key_, None) is not None
+            self.expires.pop(key_, None)
+        return deleted
+
+    def _hget(self, key: str, field: str) -> bytes | None:
+        return (self._value(key) or {}).get(field)
+
+    def _hmget(self, key: str, field: str, *fields: str) -> list:
+        hash_ = self._value(key) or {}
+        return [hash_.get(field_) for field_ in (field, *fields)]
+
+    def _hmset_dict(self, key: str, mapping: dict) -> bool:
+        hash_ = self._value(key)
+        if not isinstance(hash_, dict):
+            hash_ = self.data[key] = {}
+        hash_.update({field: self._encode(value) for field, value in mapping.items()})
+        return True
+
+    def _sadd(self, key: str, member, *members) -> int:
+        set_ = self._value(key)
+        if not isinstance(set_, set):
+            set_ = self.data[key] = set()
+        before = len(set_)
+        set_.update(self._encode(member_) for member_ in (member, *members))
+        return len(set_) - before
+
+    def _smembers(self, key: str, encoding: str | None = None) -> list:
+        members = list(self._value(key) or ())
+        return [member.decode(encoding) for member in members] if encoding else members
+
+    def _dbsize(self) -> int:
+        return len(self.data)
+
+    def _scan(self, cursor: int = 0, match: str | None = None, count: int | None = None) -> tuple[int, list]:
+        keys = list(self.data)
+        end = cursor + (count or 10)
+        return (end if end < len(keys) else 0), [key.encode() for key in keys[cursor:end]]
+
+    def _execute(self, command: bytes, *args):
+        if command.upper() == b'MEMORY' and args[0].upper() == b'USAGE':
+            key = args[1].decode() if isinstance(args[1], bytes) else args[1]
+            return self._memory_usage(key)
+        raise NotImplementedError(command)
+
+    def _memory_usage(self, key: str) -> int | None:
+        # размер данных и условные накладные расходы на ключ и элемент
+        value = self._value(key)
+        if value is None:
+            return None
+        if isinstance(value, bytes):
+            return len(key) + len(value) + 50
+        if isinstance(value, dict):
+            return len(key) + sum(len(field) + len(item) + 16 for field, item in value.items()) + 50
+        return len(key) + sum(len(item) + 16 for item in value) + 50
+
+    def _info(self, section: str = 'default') -> dict:
+        used_memory = sum(self._memory_usage(key) or 0 for key in list(self.data))
+        return {
+            'memory': {'used_memory': str(used_memory), 'maxmemory': '0', 'maxmemory_policy': 'noeviction'},
+            'stats': {'evicted_keys': '0', 'expired_keys': '0', 'keyspace_hits': '0', 'keyspace_misses': '0'},
+        }
+
+
+class StubElastic:
+    """
+    Search over generated documents with a small subset of the query DSL.
+
+    Full text queries match any of their words in the document name; term(s) clauses
+    anywhere in a query keep documents referring to any of the given ids; `range` on
+    imdb_rating, `ids` in must_not, sorting by imdb_rating and the facet aggregations
+    are supported. Good enough for realistic result sizes, not for relevance.
+    """
+
+    name_fields = {'movies': 'title', 'genres': 'name', 'persons': 'full_name'}
+
+    def __init__(self, indexes: dict[str, dict[str, dict]], latency: Latency):
+        self.indexes = indexes
+        self.latency = latency
+        # id и имена, на которые ссылается документ, для term-фильтров
+        self.refs = {
+            index: {doc_id: self._refs(doc) for doc_id, doc in docs.items()} for index, docs in indexes.items()
+        }
+
+    async def close(self):
+        pass
+
+    def hang(self):
+        """Stop answering, like a node stuck in GC: calls wait until the caller gives up"""
+        self.latency = Latency(HANG_MS)
+
+    async def ping(self) -> bool:
+        await self.latency.wait()
+        return True
+
+    async def get(self, index: str, id: str, _source_includes: list[str] | None = None, **kwargs) -> dict:
+        await self.latency.wait()
+        doc = self.indexes.get(index, {}).get(id)
+        if doc is None:
+            raise NotFoundError(404, 'not_found', {'_id': id})
+        return {'_index': index, '_id': id, 'found': True, '_source': self._project(doc, _source_includes)}
+
+    async def mget(self, body: dict, index: str, _source_includes: list[str] | None = None, **kwargs) -> dict:
+        await self.latency.wait()
+        docs = self.indexes.get(index, {})
+        return {
+            'docs': [
+                {
+                    '_index': index,
+                    '_id': id_,
+                    'found': id_ in docs,
+                    **({'_source': self._project(docs[id_], _source_includes)} if id_ in docs else {}),
+                }
+                for id_ in body['ids']
+            ]
+        }
+
+    async def search(self, index: str, body: dict, size: int | None = None, from_: int | None = None, **kwargs):
+        await self.latency.wait()
+        if index not in self.indexes:
+            raise NotFoundError(404, 'index_not_found_exception', {'index': index})
+        return self._search(index, body, size, from_)
+
+    async def msearch(self, body: list[dict], **kwargs) -> dict:
+        await self.latency.wait()
+        responses = []
+        for header, search_body in zip(body[::2], body[1::2]):
+            index = header['index']
+            if index not in self.indexes:
+                responses.append({'status': 404, 'error': {'type': 'index_not_found_exception'}})
+            else:
+                responses.append({'status': 200, **self._search(index, search_body, None, None)})
+        return {'responses': responses}
+
+    def _search(self, index: str, body: dict, size: int | None, from_: int | None) -> dict:
+        size = body.get('size', 10) if size is None else size
+        from_ = body.get('from', 0) if from_ is None else from_
+        docs = list(self.indexes[index].values())
+        if body.get('query'):
+            words, ids, excluded, rating = set(), set(), set(), {}
+            self._collect(body['query'], words, ids, excluded, rating)
+            docs = [doc for doc in docs if self._matches(index, doc, words, ids, excluded, rating)]
+        if body.get('sort'):
+            (field, order), = body['sort'][0].items()
+            docs.sort(key=lambda doc: doc.get(field) or 0, reverse=order['order'] == 'desc')
+        result = {
+            'hits': {
+                'total': {'value': len(docs), 'relation': 'eq'},
+                'hits': [
+                    {'_index': index, '_id': doc['uuid'], '_source': self._project(doc, body.get('_source'))}
+                    for doc in docs[from_:from_ + size]
+                ],
+            }
+        }
+        if 'aggs' in body:
+            result['aggregations'] = self._facets(docs)
+        return result
+
+    @staticmethod
+    def _project(doc: dict, includes: list[str] | None) -> dict:
+        # только поля верхнего уровня, вложенные пути приложение не запрашивает
+        if not includes:
+            return doc
+        return {field: doc[field] for field in includes if field in doc}
+
+    def _matches(self, index: str, doc: dict, words: set, ids: set, excluded: set, rating: dict) -> bool:
+        if doc['uuid'] in excluded:
+            return False
+        if words:
+            name = str(doc.get(self.name_fields[index], '')).lower()
+            if not any(word in name for word in words):
+                return False
+        if ids and ids.isdisjoint(self.refs[index][doc['uuid']]):
+            return False
+        rating_ = doc.get('imdb_rating') or 0
+        return rating_ >= rating.get('gte', rating_) and rating_ <= rating.get('lte', rating_)
+
+    def _collect(self, node, words: set, ids: set, excluded: set, rating: dict):
+        if isinstance(node, list):
+            for item in node:
+                self._collect(item, words, ids, excluded, rating)
+        elif isinstance(node, dict):
+            for key, value in node.items():
+                if key in ('query_string', 'multi_match', 'match'):
+                    text = value.get('query', '') if isinstance(value, dict) else ''
+                    words.update(word.strip('*').lower() for word in str(text).split() if word.isalnum())
+                elif key == 'term':
+                    ids.update(str(v.get('value', v) if isinstance(v, dict) else v) for v in value.values())
+                elif key == 'terms':
+                    ids.update(v for values in value.values() if isinstance(values, list) for v in values)
+                elif key == 'range' and 'imdb_rating' in value:
+                    rating.update(value['imdb_rating'])
+                elif key == 'must_not':
+                    for clause in value if isinstance(value, list) else [value]:
+                        excluded.update(clause.get('ids', {}).get('values', []))
+                else:
+                    self._collect(value, words, ids, excluded, rating)
+
+    @staticmethod
+    def _refs(doc: dict) -> set:
+        refs = set()
+        for field in ('genre', 'directors', 'actors', 'writers'):
+            for item in doc.get(field) or []:
+                refs.add(item['uuid'])
+                refs.add(item.get('name') or item.get('full_name'))
+        return refs
+
+    @staticmethod
+    def _facets(docs: list[dict]) -> dict:
+        genres, ratings = {}, [0] * 10
+        for doc in docs:
+            for genre in doc.get('genre') or []:
+                count, _ = genres.get(genre['uuid'], (0, genre))
+                genres[genre['uuid']] = (count + 1, genre)
+            ratings[min(int(doc.get('imdb_rating') or 0), 9)] += 1
+        return {
+            'genres': {
+                'ids': {
+                    'buckets': [
+                        {
+                            'key': uuid,
+                            'doc_count': count,
+                            'films': {'doc_count': count},
+                            'name': {'hits': {'hits': [{'_source': genre}]}},
+                        }
+                        for uuid, (count, genre) in sorted(genres.items(), key=lambda item: -item[1][0])
+                    ]
+                }
+            },
+            'imdb_rating': {'buckets': [{'key': float(key), 'doc_count': count} for key, count in enumerate(ratings)]},
+        }
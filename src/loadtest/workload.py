@@ -0,0 +1,169 @@
+"""Generated catalogue and the request mix replayed against it"""
+import bisect
+import itertools
+import random
+import uuid
+from typing import Callable
+from typing import NamedTuple
+from urllib.parse import urlencode
+
+WORDS = (
+    'star dark night love war city last lost king black blue dead man woman house road river world secret '
+    'story day summer winter fire ice blood gold iron dream ghost shadow heart moon sun sea island storm'
+).split()
+GENRE_NAMES = (
+    'Action Adventure Animation Biography Comedy Crime Documentary Drama Family Fantasy History Horror Music '
+    'Musical Mystery Romance Sci-Fi Sport Thriller War Western'
+).split()
+FIRST_NAMES = 'Anna Boris Clara David Elena Frank Grace Henry Irina John Kate Leo Maria Nick Olga Peter'.split()
+LAST_NAMES = 'Adams Brown Clark Davis Evans Fisher Green Hill Ivanov King Lee Miller Novak Orlov Smith'.split()
+
+
+class ZipfSampler:
+    """Rank in [0, n) with probability proportional to 1 / (rank + 1) ** s"""
+
+    def __init__(self, n: int, s: float, rng: random.Random):
+        self.rng = rng
+        self.cumulative = list(itertools.accumulate(1 / (rank + 1) ** s for rank in range(n)))
+
+    def __call__(self) -> int:
+        return bisect.bisect(self.cumulative, self.rng.random() * self.cumulative[-1])
+
+
+class Catalogue(NamedTuple):
+    films: list[dict]
+    genres: list[dict]
+    persons: list[dict]
+
+    def indexes(self) -> dict[str, dict[str, dict]]:
+        return {
+            'movies': {film['uuid']: film for film in self.films},
+            'genres': {genre['uuid']: genre for genre in self.genres},
+            'persons': {person['uuid']: person for person in self.persons},
+        }
+
+
+def generate_catalogue(films: int, persons: int, rng: random.Random) -> Catalogue:
+    """Films, genres and persons in popularity order: the first ones are the most requested"""
+
+    def new_id() -> str:
+        return str(uuid.UUID(int=rng.getrandbits(128)))
+
+    genres = [
+        {'uuid': new_id(), 'name': name, 'description': f'{name} films', 'popularity': len(GENRE_NAMES) - rank}
+        for rank, name in enumerate(GENRE_NAMES)
+    ]
+    roles = ('actor', 'actor', 'actor', 'director', 'writer')
+    people = [
+        {
+            'uuid': new_id(),
+            'full_name': f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}',
+            'role': rng.choice(roles),
+            'film_ids': [],
+            'films': [],
+        }
+        for _ in range(persons)
+    ]
+    genre_rank = ZipfSampler(len(genres), 1.0, rng)
+    catalogue = []
+    for _ in range(films):
+        film = {
+            'uuid': new_id(),
+            'title': ' '.join(rng.sample(WORDS, rng.randint(1, 4))).title(),
+            'imdb_rating': round(rng.uniform(1, 10), 1),
+            'description': ' '.join(rng.choices(WORDS, k=30)),
+            'genre': [
+                {'uuid': genres[i]['uuid'], 'name': genres[i]['name']} for i in {genre_rank() for _ in range(3)}
+            ],
+        }
+        for field, role, count in (('directors', 'director', 1), ('actors', 'actor', 6), ('writers', 'writer', 2)):
+            film[field] = []
+            # участие распределено равномерно: у популярной персоны иначе оказались бы почти все фильмы
+            for i in {rng.randrange(len(people)) for _ in range(count)}:
+                person = people[i]
+                person['film_ids'].append(film['uuid'])
+                person['films'].append(
+                    {'uuid': film['uuid'], 'title': film['title'], 'imdb_rating': film['imdb_rating'], 'role': role}
+                )
+                film[field].append({'uuid': person['uuid'], 'full_name': person['full_name']})
+        film['actors_names'] = ' '.join(actor['full_name'] for actor in film['actors'])
+        film['writers_names'] = ' '.join(writer['full_name'] for writer in film['writers'])
+        catalogue.append(film)
+    return Catalogue(catalogue, genres, people)
+
+
+class Workload:
+    """
+    Weighted mix of routes; ids, pages and query words are drawn from Zipf distributions,
+    so a few objects get most of the traffic, like on a real catalogue.
+    """
+
+    def __init__(self, catalogue: Catalogue, mix: dict[str, float], zipf_s: float, rng: random.Random):
+        self.catalogue = catalogue
+        self.rng = rng
+        self.film = ZipfSampler(len(catalogue.films), zipf_s, rng)
+        self.person = ZipfSampler(len(catalogue.persons), zipf_s, rng)
+        self.genre = ZipfSampler(len(catalogue.genres), zipf_s, rng)
+        self.word = ZipfSampler(len(WORDS), zipf_s, rng)
+        self.page = ZipfSampler(20, zipf_s, rng)
+        self.routes = self._routes()
+        unknown = set(mix) - set(self.routes)
+        if unknown:
+            raise ValueError(f'Unknown routes in the mix: {", ".join(sorted(unknown))}')
+        self.names = [name for name in mix if mix[name] > 0]
+        self.weights = list(itertools.accumulate(mix[name] for name in self.names))
+
+    def _routes(self) -> dict[str, Callable[[], str]]:
+        return {
+            'films_detail': lambda: f'/api/v1/films/{self._film_id()}',
+            'films_similar': lambda: f'/api/v1/films/{self._film_id()}/similar?page[size]=10',
+            'films_search': lambda: '/api/v1/films/search?' + urlencode({'query': self._query()}),
+            'films_list': lambda: '/api/v1/films/?' + urlencode(
+                {'sort': '-imdb_rating', 'page[number]': self.page() + 1, 'page[size]': 20}
+            ),
+            'films_filter': lambda: '/api/v1/films/?' + urlencode(
+                {'filter[genre]': self._genre_id(), 'page[number]': self.page() + 1, 'page[size]': 20}
+            ),
+            'films_facets': lambda: '/api/v1/films/facets?' + urlencode({'filter[genre]': self._genre_id()}),
+            'films_suggest': lambda: '/api/v1/films/suggest?' + urlencode({'query': WORDS[self.word()][:3]}),
+            'genres_list': lambda: '/api/v1/genres/',
+            'genres_detail': lambda: f'/api/v1/genres/{self._genre_id()}',
+            'genres_popular': lambda: f'/api/v1/genres/{self._genre_id()}/popular?page[size]=10',
+            'persons_detail': lambda: f'/api/v1/persons/{self._person_id()}',
+            'persons_films': lambda: f'/api/v1/persons/{self._person_id()}/film',
+            'persons_search': lambda: '/api/v1/persons/search?' + urlencode(
+                {'query': self.catalogue.persons[self.person()]['full_name']}
+            ),
+        }
+
+    def next(self) -> tuple[str, str]:
+        """Name of the next route and the URL to request"""
+        name = self.names[bisect.bisect(self.weights, self.rng.random() * self.weights[-1])]
+        return name, self.routes[name]()
+
+    def _film_id(self) -> str:
+        return self.catalogue.films[self.film()]['uuid']
+
+    def _person_id(self) -> str:
+        return self.catalogue.persons[self.person()]['uuid']
+
+    def _genre_id(self) -> str:
+        return self.catalogue.genres[self.genre()]['uuid']
+
+    def _query(self) -> str:
+        return ' '.join(WORDS[self.word()] for _ in range(self.rng.randint(1, 2)))
+
+
+def parse_mix(value: str) -> dict[str, float]:
+    """'films_detail=5,films_search=2' -> {'films_detail': 5.0, 'films_search': 2.0}"""
+    mix = {}
+    for item in value.split(','):
+        name, _, weight = item.partition('=')
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+DEFAULT_MIX = (
+    'films_detail=30,films_search=10,films_list=10,films_filter=5,films_facets=3,films_suggest=5,films_similar=5,'
+    'genres_list=5,genres_detail=5,genres_popular=5,persons_detail=7,persons_films=5,persons_search=5'
+)
@@ -1,15 +1,41 @@
+import asyncio
+import logging
+from http import HTTPStatus
+
 import aioredis
 import uvicorn
 from elasticsearch import AsyncElasticsearch
 from fastapi import FastAPI
-from fastapi.responses import ORJSONResponse
+from fastapi import Request
 
-from api.v1 import films, genres, persons
+from api.v1 import admin, films, genres, graphql, health, persons
 from core import config
-from db import elastic, redis
-from core.config import RedisSettings, ESSettings, StateSettings
+from core import tracing
+from core.deadline import DeadlineExceededError
+from db import elastic, redis, shm, warmup
+from db.breaker import CircuitBreaker
+from db.breaker import ElasticUnavailableError
+from db.msearch import MSearchBatcher
+from db.shm import SharedMemoryCache
+from middleware.admission import AdmissionMiddleware
+from middleware.admission import settings as admission_settings
+from middleware.deadline import DeadlineMiddleware
+from middleware.deadline import settings as deadline_settings
+from middleware.request_state import RequestStateMiddleware
+from middleware.response_cache import ResponseCacheMiddleware
+from middleware.response_cache import settings as response_cache_settings
+from core.config import RedisSettings, ESSettings, StateSettings, SharedMemorySettings, BreakerSettings
+from core.config import HealthSettings, TracingSettings
+from core.tracing import TimedORJSONResponse as ORJSONResponse
+from messages.error import CommonError
+from services.snapshot import settings as genre_snapshot_settings
+from services.snapshot import snapshot as genre_snapshot
+from services.suggest import get_suggest_service
+
+rs, els, ss, shms, bs = RedisSettings(), ESSettings(), StateSettings(), SharedMemorySettings(), BreakerSettings()
+ts, hs = TracingSettings(), HealthSettings()
 
-rs, els, ss = RedisSettings(), ESSettings(), StateSettings()
+logger = logging.getLogger(__name__)
 
 app = FastAPI(
     title=ss.project_name,
@@ -18,23 +44,112 @@ app = FastAPI(
     default_response_class=ORJSONResponse,
 )
 
+# Middleware, добавленный последним, выполняется первым: кеш отвечает до admission control,
+# а состояние запроса со спанами охватывает и кеш; срок запроса ставится сразу после состояния
+if admission_settings.enabled:
+    app.add_middleware(AdmissionMiddleware)
+if response_cache_settings.enabled:
+    app.add_middleware(ResponseCacheMiddleware)
+if deadline_settings.enabled:
+    app.add_middleware(DeadlineMiddleware)
+app.add_middleware(RequestStateMiddleware)
+
+
+@app.exception_handler(ElasticUnavailableError)
+async def elastic_unavailable_handler(request: Request, exc: ElasticUnavailableError) -> ORJSONResponse:
+    return ORJSONResponse(
+        status_code=HTTPStatus.SERVICE_UNAVAILABLE,
+        content={'detail': CommonError.ELASTIC_UNAVAILABLE},
+        headers={'Retry-After': str(int(bs.open_seconds))},
+    )
+
+
+@app.exception_handler(DeadlineExceededError)
+async def deadline_exceeded_handler(request: Request, exc: DeadlineExceededError) -> ORJSONResponse:
+    return ORJSONResponse(status_code=HTTPStatus.GATEWAY_TIMEOUT, content={'detail': CommonError.DEADLINE_EXCEEDED})
+
 
 @app.on_event('startup')
 async def startup():
-    redis.redis = await aioredis.create_redis_pool((rs.host, rs.port), minsize=10, maxsize=20)
-    elastic.es = AsyncElasticsearch(hosts=[f'{els.es_host}:{els.es_port}'])
+    redis_client = await aioredis.create_redis_pool(
+        (rs.host, rs.port), minsize=rs.pool_minsize, maxsize=rs.pool_maxsize
+    )
+    es_client = AsyncElasticsearch(hosts=[f'{els.es_host}:{els.es_port}'], maxsize=els.connections)
+    await setup(redis_client, es_client)
+
+
+async def setup(redis_client: aioredis.Redis, es_client: AsyncElasticsearch):
+    """Build everything on top of the storage clients; the load test passes its stand-ins here"""
+    redis.redis = redis_client
+    elastic.es = es_client
+    elastic.breaker = CircuitBreaker(
+        bs.window_size, bs.min_calls, bs.failure_rate, bs.slow_call_ms, bs.slow_call_rate, bs.open_seconds
+    )
+    if els.msearch_enabled:
+        elastic.batcher = MSearchBatcher(elastic.es, els.msearch_window_ms / 1000, els.msearch_max_batch)
+    if shms.enabled:
+        try:
+            shm.cache = SharedMemoryCache(shms.path, shms.buckets, shms.ways, shms.slot_size)
+        except OSError:
+            logger.exception('Shared memory cache is disabled: cannot map %s', shms.path)
+    # воркер начинает принимать запросы только после startup: первые запросы не открывают соединения сами
+    app.state.warmup_task = None
+    try:
+        await asyncio.wait_for(warm_up(), hs.warmup_timeout)
+    except Exception:
+        logger.exception('Connections are not warmed up, retrying in the background')
+        app.state.warmup_task = asyncio.create_task(warm_up_until_done())
+    app.state.suggest_task = asyncio.create_task(get_suggest_service(elastic=elastic.es).refresh_periodically())
+    app.state.genre_snapshot_task = None
+    if genre_snapshot_settings.enabled:
+        # жанры загружаются до первого запроса; если Elastic недоступен, их отдаёт кеш, пока снимок не появится
+        await genre_snapshot.refresh(elastic.es, redis.redis, force=True)
+        app.state.genre_snapshot_task = asyncio.create_task(
+            genre_snapshot.refresh_periodically(elastic.es, redis.redis)
+        )
+    app.state.export_task = None
+    if ts.otlp_endpoint:
+        tracing.exporter = tracing.SpanExporter(
+            ts.otlp_endpoint, ss.project_name, ts.export_batch_size, ts.export_interval, ts.export_buffer_size
+        )
+        app.state.export_task = asyncio.create_task(tracing.exporter.run())
+
+
+async def warm_up():
+    await warmup.warm_up(redis.redis, elastic.es, rs.pool_minsize, els.connections)
+
+
+async def warm_up_until_done():
+    while not warmup.warm:
+        await asyncio.sleep(hs.warmup_retry_interval)
+        try:
+            await asyncio.wait_for(warm_up(), hs.warmup_timeout)
+        except Exception:
+            logger.exception('Connections are not warmed up')
 
 
 @app.on_event('shutdown')
 async def shutdown():
+    app.state.suggest_task.cancel()
+    if app.state.warmup_task:
+        app.state.warmup_task.cancel()
+    if app.state.genre_snapshot_task:
+        app.state.genre_snapshot_task.cancel()
+    if app.state.export_task:
+        app.state.export_task.cancel()
     redis.redis.close()
     await redis.redis.wait_closed()
     await elastic.es.close()
+    if shm.cache:
+        shm.cache.close()
 
 
 app.include_router(films.router, prefix='/api/v1/films', tags=['films'])
 app.include_router(genres.router, prefix='/api/v1/genres', tags=['genres'])
 app.include_router(persons.router, prefix='/api/v1/persons', tags=['persons'])
+app.include_router(graphql.router, prefix='/api/v1/graphql', tags=['graphql'])
+app.include_router(admin.router, prefix='/api/v1/admin', tags=['admin'])
+app.include_router(health.router, prefix='/health', tags=['health'])
 
 
 if __name__ == '__main__':
@@ -12,9 +12,27 @@ class GenreError(str, Enum):
     NO_ITEM = 'No genres found'
     ITEM_NOT_FOUND = 'The genre is not found'
     NO_POPULAR_FILMS = 'No popular films for the genre'
+    WRONG_SORT_PARAMETER = 'Wrong sort parameter'
 
 
 class PersonError(str, Enum):
     NO_ITEM = 'No persons found'
     ITEM_NOT_FOUND = 'The person is not found'
     FILMS_NOT_FOUND = 'No films found for this person'
+
+
+class AdminError(str, Enum):
+    FORBIDDEN = 'Wrong or missing admin token'
+
+
+class QueryError(str, Enum):
+    TOO_DEEP = 'The query is nested too deep'
+    TOO_EXPENSIVE = 'The query would return too many objects'
+    WRONG_PAGE = 'Wrong page or size argument'
+
+
+class CommonError(str, Enum):
+    OVERLOADED = 'The service is overloaded, try again later'
+    ELASTIC_UNAVAILABLE = 'The search backend is unavailable, try again later'
+    UNKNOWN_FIELD = 'Unknown field in the fields or include parameter'
+    DEADLINE_EXCEEDED = 'The request did not finish in time'
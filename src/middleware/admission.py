@@ -0,0 +1,132 @@
+import asyncio
+import time
+from collections import deque
+from http import HTTPStatus
+
+import orjson
+from core.config import AdmissionSettings
+from messages.error import CommonError
+from middleware.routes import match_route
+from starlette.types import ASGIApp
+from starlette.types import Message
+from starlette.types import Receive
+from starlette.types import Scope
+from starlette.types import Send
+
+settings = AdmissionSettings()
+
+
+class AdaptiveLimiter:
+    """
+    Concurrency limit of one route adjusted by AIMD.
+
+    A request that finished faster than the target latency raises the limit by 1/limit
+    (about +1 per limit's worth of requests); a slow or failed one multiplies it by
+    `backoff`. Requests over the limit wait in a bounded FIFO queue for a while.
+    """
+
+    def __init__(self):
+        self.limit = float(settings.initial_limit)
+        self.in_flight = 0
+        self.waiters: deque[asyncio.Future] = deque()
+
+    async def acquire(self) -> bool:
+        if self.in_flight < int(self.limit) and not self.waiters:
+            self.in_flight += 1
+            return True
+        if len(self.waiters) >= settings.max_queue:
+            return False
+        waiter = asyncio.get_running_loop().create_future()
+        self.waiters.append(waiter)
+        try:
+            # слот передаёт release(), он же увеличивает in_flight
+            await asyncio.wait_for(waiter, settings.queue_timeout_ms / 1000)
+        except asyncio.TimeoutError:
+            self._discard(waiter)
+            return False
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # слот уже выдан, а клиент ушёл
+                self.in_flight -= 1
+                self._wake()
+            else:
+                self._discard(waiter)
+            raise
+        return True
+
+    def release(self, latency: float, failed: bool):
+        self.in_flight -= 1
+        if failed or latency * 1000 > settings.target_latency_ms:
+            self.limit = max(settings.min_limit, self.limit * settings.backoff)
+        else:
+            self.limit = min(settings.max_limit, self.limit + 1 / self.limit)
+        self._wake()
+
+    def _wake(self):
+        while self.waiters and self.in_flight < int(self.limit):
+            waiter = self.waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+
+    def _discard(self, waiter: asyncio.Future):
+        try:
+            self.waiters.remove(waiter)
+        except ValueError:
+            pass
+
+
+class AdmissionMiddleware:
+    """
+    Shed load per route before requests pile up behind a slow Elasticsearch.
+
+    Installed inside the response cache, so cache hits are answered without taking
+    a slot; only requests that do real work compete for their route's limit.
+    Rejected requests get an immediate 503 with Retry-After.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self.limiters: dict[str, AdaptiveLimiter] = {}
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        route, _ = match_route(scope)
+        # пробы балансировщика не должны ни отбрасываться, ни сбивать лимиты
+        if route is None or route.startswith('/health/'):
+            await self.app(scope, receive, send)
+            return
+        limiter = self.limiters.get(route)
+        if limiter is None:
+            limiter = self.limiters[route] = AdaptiveLimiter()
+
+        if not await limiter.acquire():
+            await self.reject(send)
+            return
+
+        status = HTTPStatus.INTERNAL_SERVER_ERROR
+
+        async def send_with_status(message: Message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+            await send(message)
+
+        started = time.monotonic()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            limiter.release(time.monotonic() - started, status >= HTTPStatus.INTERNAL_SERVER_ERROR)
+
+    @staticmethod
+    async def reject(send: Send):
+        body = orjson.dumps({'detail': CommonError.OVERLOADED})
+        headers = [
+            (b'content-type', b'application/json'),
+            (b'content-length', str(len(body)).encode()),
+            (b'retry-after', str(settings.retry_after).encode()),
+        ]
+        await send({'type': 'http.response.start', 'status': HTTPStatus.SERVICE_UNAVAILABLE, 'headers': headers})
+        await send({'type': 'http.response.body', 'body': body})
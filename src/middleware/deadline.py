@@ -0,0 +1,115 @@
+import asyncio
+import logging
+import time
+from typing import NamedTuple
+
+from core.config import DeadlineSettings
+from core.context import current_request
+from middleware.routes import match_route
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp
+from starlette.types import Message
+from starlette.types import Receive
+from starlette.types import Scope
+from starlette.types import Send
+
+settings = DeadlineSettings()
+logger = logging.getLogger(__name__)
+
+
+class DeadlinePolicy(NamedTuple):
+    # срок ответа по умолчанию, в секундах
+    timeout: float
+    # поиск может вернуть то, что шарды Elastic успели найти к сроку
+    partial: bool
+
+
+# Остальные маршруты получают DEADLINE_DEFAULT_TIMEOUT и только полные результаты
+DEADLINE_POLICIES = {
+    '/api/v1/films/search': DeadlinePolicy(3, True),
+    '/api/v1/films/suggest': DeadlinePolicy(1, True),
+    '/api/v1/films/facets': DeadlinePolicy(5, False),
+    '/api/v1/films/': DeadlinePolicy(3, True),
+    '/api/v1/films/{film_id}/similar': DeadlinePolicy(3, True),
+    '/api/v1/genres/{genre_id}/popular': DeadlinePolicy(3, True),
+    '/api/v1/persons/search': DeadlinePolicy(3, True),
+    '/api/v1/persons/suggest': DeadlinePolicy(1, True),
+}
+
+
+def parse_timeout(value: str | None) -> float | None:
+    """X-Request-Timeout: seconds the client is going to wait, like '2.5'"""
+    if not value:
+        return None
+    try:
+        timeout = float(value)
+    except ValueError:
+        return None
+    return timeout if timeout > 0 else None
+
+
+class DeadlineMiddleware:
+    """
+    Give every request a deadline and stop working on it when nobody waits for the answer.
+
+    The deadline comes from the X-Request-Timeout header, capped by DEADLINE_MAX_TIMEOUT,
+    or from DEADLINE_POLICIES of the route. Services spend what is left of it on Redis and
+    Elastic calls and answer 504 when it runs out. The request body is read ahead, and the
+    request is cancelled as soon as the server reports that the client went away.
+
+    Installed right inside RequestStateMiddleware, whose state it fills.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        state = current_request()
+        if scope['type'] != 'http' or state is None:
+            await self.app(scope, receive, send)
+            return
+        route, _ = match_route(scope)
+        policy = DEADLINE_POLICIES.get(route, DeadlinePolicy(settings.default_timeout, False))
+        timeout = parse_timeout(Headers(scope=scope).get('x-request-timeout'))
+        timeout = min(timeout, settings.max_timeout) if timeout else policy.timeout
+        state.deadline = time.monotonic() + timeout
+        state.partial_allowed = policy.partial
+        if not settings.cancel_on_disconnect:
+            await self.app(scope, receive, send)
+            return
+
+        messages: asyncio.Queue[Message] = asyncio.Queue()
+        finished = disconnected = False
+
+        async def send_and_track(message: Message):
+            nonlocal finished
+            if message['type'] == 'http.response.body' and not message.get('more_body', False):
+                # после ответа сервер тоже сообщает http.disconnect, это не уход клиента
+                finished = True
+            await send(message)
+
+        async def watch_disconnect():
+            nonlocal disconnected
+            # тело запроса передаётся обработчику, после него сервер присылает только http.disconnect
+            message = await receive()
+            messages.put_nowait(message)
+            while message['type'] == 'http.request' and message.get('more_body', False):
+                message = await receive()
+                messages.put_nowait(message)
+            if message['type'] == 'http.request':
+                message = await receive()
+            if message['type'] == 'http.disconnect' and not finished:
+                disconnected = True
+                handler.cancel()
+
+        handler = asyncio.create_task(self.app(scope, messages.get, send_and_track))
+        watcher = asyncio.create_task(watch_disconnect())
+        try:
+            await handler
+        except asyncio.CancelledError:
+            if not disconnected:
+                raise
+            logger.info('Client disconnected, %s %s is cancelled', scope['method'], scope['path'])
+        finally:
+            watcher.cancel()
+            handler.cancel()
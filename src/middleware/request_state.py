@@ -0,0 +1,79 @@
+import logging
+import os
+import random
+import time
+
+from core import tracing
+from core.config import TracingSettings
+from core.context import start_request
+from middleware.routes import match_route
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp
+from starlette.types import Message
+from starlette.types import Receive
+from starlette.types import Scope
+from starlette.types import Send
+
+STALE_WARNING = (b'warning', b'110 - "Response is Stale"')
+PARTIAL_WARNING = (b'warning', b'199 - "Partial results: the search timed out"')
+
+settings = TracingSettings()
+logger = logging.getLogger(__name__)
+
+
+class RequestStateMiddleware:
+    """
+    Create the per-request state and turn it into response headers.
+
+    Installed outermost, so the spans cover the response cache as well; on the response
+    start the spans are summed into Server-Timing. Slow requests are logged with their
+    breakdown, and finished requests are handed to the span exporter when it is set up.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        trace_id, parent_span_id = tracing.parse_traceparent(Headers(scope=scope).get('traceparent'))
+        state = start_request(trace_id=trace_id, span_id=os.urandom(8).hex(), parent_span_id=parent_span_id)
+        start_ns = time.time_ns()
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_headers(message: Message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+                headers = list(message['headers'])
+                if state.stale:
+                    headers.append(STALE_WARNING)
+                if state.timed_out:
+                    headers.append(PARTIAL_WARNING)
+                if settings.server_timing:
+                    timing = tracing.server_timing(state.spans, time.perf_counter() - started)
+                    headers.append((b'server-timing', timing.encode('latin-1')))
+                message['headers'] = headers
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_headers)
+        finally:
+            self.finish(scope, state, start_ns, time.perf_counter() - started, status)
+
+    @staticmethod
+    def finish(scope: Scope, state, start_ns: int, total: float, status: int):
+        slow = total * 1000 >= settings.slow_request_ms
+        if slow:
+            logger.warning(
+                'Slow request %s %s: %s (trace %s)',
+                scope['method'],
+                scope['path'],
+                tracing.server_timing(state.spans, total),
+                state.trace_id,
+            )
+        if tracing.exporter and (slow or random.random() < settings.export_sample_rate):
+            route, _ = match_route(scope)
+            tracing.exporter.add(f'{scope["method"]} {route or scope["path"]}', state, start_ns, total, status)
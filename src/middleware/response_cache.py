@@ -0,0 +1,351 @@
+import gzip
+import hashlib
+from typing import NamedTuple
+from urllib.parse import parse_qsl
+
+import brotli
+import orjson
+from core.config import ResponseCacheSettings
+from core.config import SharedMemorySettings
+from core.context import current_request
+from core.tracing import span
+from db import redis as redis_db
+from db import shm as shm_db
+from middleware.routes import match_route
+from services.cache_keys import hash_key
+from services.surrogate import surrogate_keys
+from services.surrogate import tag
+from services.cache_stats import stats as cache_stats
+from services.snapshot import snapshot as genre_snapshot
+from services.ttl import policy as ttl_policy
+from starlette.types import ASGIApp
+from starlette.types import Message
+from starlette.types import Receive
+from starlette.types import Scope
+from starlette.types import Send
+
+settings = ResponseCacheSettings()
+shm_settings = SharedMemorySettings()
+
+# Сжатые варианты в порядке предпочтения при равном q
+ENCODINGS = ('br', 'gzip')
+
+
+class CachePolicy(NamedTuple):
+    max_age: int
+    stale_while_revalidate: int
+    # тип объектов в теле ответа, для Surrogate-Key
+    kind: str | None
+
+    @property
+    def cache_control(self) -> str:
+        return f'public, max-age={self.max_age}, stale-while-revalidate={self.stale_while_revalidate}'
+
+
+# Кешируются только перечисленные здесь маршруты
+CACHE_POLICIES = {
+    '/api/v1/films/search': CachePolicy(60, 300, 'film'),
+    '/api/v1/films/suggest': CachePolicy(300, 600, 'film'),
+    '/api/v1/films/facets': CachePolicy(300, 600, 'facets'),
+    '/api/v1/films/{film_id}': CachePolicy(300, 3600, 'film'),
+    '/api/v1/films/': CachePolicy(60, 300, 'film'),
+    '/api/v1/films/{film_id}/similar': CachePolicy(300, 3600, 'film'),
+    '/api/v1/genres/': CachePolicy(3600, 86400, 'genre'),
+    '/api/v1/genres/{genre_id}': CachePolicy(3600, 86400, 'genre'),
+    '/api/v1/genres/{genre_id}/popular': CachePolicy(300, 3600, 'film'),
+    '/api/v1/persons/search': CachePolicy(60, 300, 'person'),
+    '/api/v1/persons/suggest': CachePolicy(300, 600, 'person'),
+    '/api/v1/persons/{person_id}': CachePolicy(300, 3600, 'person'),
+    '/api/v1/persons/{person_id}/film': CachePolicy(300, 3600, 'film'),
+}
+# Префиксы ключей ответов, по ним же считаются сроки жизни: поиск и списки с фильтрами проходят admission
+ROUTE_FAMILIES = {
+    '/api/v1/films/search': 'resp__search',
+    '/api/v1/persons/search': 'resp__search',
+    '/api/v1/films/': 'resp__get_all',
+}
+# Маршруты, которые отвечают из снимка в памяти воркера: их ответы быстрее собрать заново, чем читать из Redis
+SNAPSHOT_ROUTES = {'/api/v1/genres/', '/api/v1/genres/{genre_id}'}
+# path parameter <-> surrogate key kind
+PATH_PARAM_KINDS = {
+    'film_id': 'film',
+    'genre_id': 'genre',
+    'person_id': 'person',
+}
+
+
+def choose_encoding(accept_encoding: str) -> str:
+    """Pick the best stored encoding the client accepts"""
+    weights = {}
+    for item in accept_encoding.split(','):
+        name, _, params = item.strip().partition(';')
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[name.strip().lower()] = q
+    best, best_q = 'identity', 0.0
+    for encoding in ENCODINGS:
+        q = weights.get(encoding, weights.get('*', 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def compress(body: bytes) -> dict[str, bytes]:
+    """
+    Build all body variants for a cache entry.
+
+    Bodies too small to benefit from compression are stored as is under every encoding
+    field, so a lookup is always one HMGET; `meta['encoded']` tells which are compressed.
+    """
+    if len(body) < settings.min_compress_size:
+        return {'identity': body, 'gzip': body, 'br': body}
+    return {
+        'identity': body,
+        'gzip': gzip.compress(body, compresslevel=settings.gzip_level),
+        'br': brotli.compress(body, quality=settings.brotli_quality),
+    }
+
+
+def make_etag(body: bytes) -> str:
+    return f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+
+def encoded_etag(etag: str, encoding: str, encoded: list[str]) -> str:
+    """Strong ETag of a body variant: compressed variants are different bytes, '"<hash>-gzip"'"""
+    if encoding not in encoded:
+        return etag
+    return f'{etag[:-1]}-{encoding}"'
+
+
+def etag_base(etag: str) -> str:
+    """Entity tag without the weak prefix and the coding suffix"""
+    etag = etag.strip().removeprefix('W/')
+    for encoding in ENCODINGS:
+        if etag.endswith(f'-{encoding}"'):
+            return f'{etag[:-len(encoding) - 2]}"'
+    return etag
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """
+    Weak comparison of If-None-Match against an entity tag, as RFC 7232 prescribes.
+
+    Variants of one body differ only in the coding suffix, so a tag received with any
+    of them validates every other one.
+    """
+    if if_none_match.strip() == '*':
+        return True
+    etag = etag_base(etag)
+    return any(etag_base(tag) == etag for tag in if_none_match.split(','))
+
+
+class ResponseCacheMiddleware:
+    """
+    Cache whole GET responses in Redis together with their gzip and brotli variants.
+
+    Every entry is a Redis hash: `meta` (status, media type, ETag, compressed variants)
+    and one field per encoding. A hit is one HMGET of the meta and the variant
+    matching Accept-Encoding, sent with Content-Encoding so nginx passes it through.
+    Conditional requests read the meta alone and get 304 when the ETag matches.
+
+    Hot entries are also copied to the host shared memory cache for a few seconds,
+    so workers on one host serve them without Redis round trips. How long an entry
+    stays in Redis is up to the TTL policy: one-off searches are not stored at all.
+
+    Responses carry Cache-Control from CACHE_POLICIES and a Surrogate-Key listing the
+    films, genres and persons in the body; entries are tagged with the same keys so
+    the purge API can drop them. Routes served from the genre snapshot get the same
+    headers but are neither looked up nor stored.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if (
+            scope['type'] != 'http'
+            or scope['method'] != 'GET'
+            or not scope['path'].startswith(settings.path_prefix)
+            or redis_db.redis is None
+        ):
+            await self.app(scope, receive, send)
+            return
+        route, path_params = match_route(scope)
+        policy = CACHE_POLICIES.get(route)
+        if policy is None:
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope['headers'])
+        encoding = choose_encoding(headers.get(b'accept-encoding', b'').decode('latin-1'))
+        if_none_match = headers.get(b'if-none-match', b'').decode('latin-1')
+        if route in SNAPSHOT_ROUTES and genre_snapshot.ready:
+            await self.serve_uncached(scope, receive, send, policy, path_params, if_none_match)
+            return
+        family = ROUTE_FAMILIES.get(route, 'resp')
+        key = self.cache_key(scope, family)
+
+        shm = shm_db.cache
+        if shm:
+            with span('shm'):
+                meta = shm.get(key)
+            if meta is not None:
+                meta = orjson.loads(meta)
+                if if_none_match and etag_matches(if_none_match, meta['etag']):
+                    cache_stats.record(key, True, family)
+                    await self.send_not_modified(send, meta, encoding, 'HIT')
+                    return
+                with span('shm'):
+                    body = shm.get(f'{key}__{encoding}')
+                if body is not None:
+                    cache_stats.record(key, True, family)
+                    await self.send_cached(send, meta, body, encoding, 'HIT')
+                    return
+
+        if if_none_match:
+            with span('redis'):
+                meta = await redis_db.redis.hget(key, 'meta')
+            if meta is not None:
+                meta = orjson.loads(meta)
+                if etag_matches(if_none_match, meta['etag']):
+                    cache_stats.record(key, True, family)
+                    await self.send_not_modified(send, meta, encoding, 'HIT')
+                    return
+
+        with span('redis'):
+            raw_meta, body = await redis_db.redis.hmget(key, 'meta', encoding)
+        hit = raw_meta is not None and body is not None
+        cache_stats.record(key, hit, family)
+        if hit:
+            self.remember(key, raw_meta, encoding, body)
+            await self.send_cached(send, orjson.loads(raw_meta), body, encoding, 'HIT')
+            return
+
+        start, body = await self.render(scope, receive)
+        # ответы из устаревшего кеша (Warning: 110) и неполные результаты поиска (Warning: 199) не кешируются
+        state = current_request()
+        if not self.cacheable(start) or (state and (state.stale or state.timed_out)):
+            await send(start)
+            await send({'type': 'http.response.body', 'body': body})
+            return
+
+        with span('compress'):
+            variants = compress(body)
+        keys = self.response_keys(policy, path_params, body)
+        meta = self.build_meta(start, body, policy, keys, [name for name in ENCODINGS if variants[name] is not body])
+        raw_meta = orjson.dumps(meta)
+        ttl = ttl_policy.ttl(key, family, settings.expire)
+        if ttl:
+            cache_stats.record_write(key, len(raw_meta) + sum(map(len, variants.values())), family)
+            with span('redis'):
+                transaction = redis_db.redis.multi_exec()
+                transaction.hmset_dict(key, {'meta': raw_meta, **variants})
+                transaction.expire(key, ttl)
+                await transaction.execute()
+                await tag(redis_db.redis, key, keys, max(settings.expire, ttl_policy.tag_ttl))
+            self.remember(key, raw_meta, encoding, variants[encoding])
+        if if_none_match and etag_matches(if_none_match, meta['etag']):
+            await self.send_not_modified(send, meta, encoding, 'MISS')
+            return
+        await self.send_cached(send, meta, variants[encoding], encoding, 'MISS')
+
+    async def serve_uncached(
+        self, scope: Scope, receive: Receive, send: Send, policy: CachePolicy, path_params: dict, if_none_match: str
+    ):
+        """Render the response with the cache headers, without a lookup or a store"""
+        start, body = await self.render(scope, receive)
+        if not self.cacheable(start):
+            await send(start)
+            await send({'type': 'http.response.body', 'body': body})
+            return
+        meta = self.build_meta(start, body, policy, self.response_keys(policy, path_params, body), [])
+        if if_none_match and etag_matches(if_none_match, meta['etag']):
+            await self.send_not_modified(send, meta, 'identity', 'SNAPSHOT')
+            return
+        await self.send_cached(send, meta, body, 'identity', 'SNAPSHOT')
+
+    async def render(self, scope: Scope, receive: Receive) -> tuple[Message, bytes]:
+        """Run the app and collect the response start message and the whole body"""
+        start, chunks = None, []
+
+        async def capture(message: Message):
+            nonlocal start
+            if message['type'] == 'http.response.start':
+                start = message
+            else:
+                chunks.append(message.get('body', b''))
+
+        await self.app(scope, receive, capture)
+        return start, b''.join(chunks)
+
+    @staticmethod
+    def cacheable(start: Message) -> bool:
+        content_type = dict(start['headers']).get(b'content-type', b'').decode('latin-1')
+        return start['status'] == 200 and content_type.startswith('application/json')
+
+    @staticmethod
+    def response_keys(policy: CachePolicy, path_params: dict, body: bytes) -> set[str]:
+        keys = surrogate_keys(policy.kind, orjson.loads(body))
+        for name, value in path_params.items():
+            if name in PATH_PARAM_KINDS:
+                keys.add(f'{PATH_PARAM_KINDS[name]}:{value}')
+        return keys
+
+    @staticmethod
+    def build_meta(start: Message, body: bytes, policy: CachePolicy, keys: set[str], encoded: list[str]) -> dict:
+        return {
+            'status': start['status'],
+            'media_type': dict(start['headers'])[b'content-type'].decode('latin-1'),
+            'etag': make_etag(body),
+            'encoded': encoded,
+            'cache_control': policy.cache_control,
+            'surrogate_keys': ' '.join(sorted(keys)),
+        }
+
+    @staticmethod
+    def cache_key(scope: Scope, family: str = 'resp') -> str:
+        params = sorted(parse_qsl(scope['query_string'].decode('latin-1'), keep_blank_values=True))
+        return f'{family}__{hash_key(scope["path"], params)}'
+
+    @staticmethod
+    def remember(key: str, raw_meta: bytes, encoding: str, body: bytes):
+        """Copy an entry variant to the host shared memory cache"""
+        if shm_db.cache:
+            shm_db.cache.set(key, raw_meta, shm_settings.expire)
+            shm_db.cache.set(f'{key}__{encoding}', body, shm_settings.expire)
+
+    @staticmethod
+    def validators(meta: dict, encoding: str) -> list[tuple[bytes, bytes]]:
+        """Headers shared by full and 304 responses"""
+        headers = [
+            (b'etag', encoded_etag(meta['etag'], encoding, meta['encoded']).encode('latin-1')),
+            (b'vary', b'Accept-Encoding'),
+            (b'cache-control', meta['cache_control'].encode('latin-1')),
+        ]
+        if meta['surrogate_keys']:
+            headers.append((b'surrogate-key', meta['surrogate_keys'].encode('latin-1')))
+        return headers
+
+    @staticmethod
+    async def send_cached(send: Send, meta: dict, body: bytes, encoding: str, status: str):
+        headers = [
+            (b'content-type', meta['media_type'].encode('latin-1')),
+            (b'content-length', str(len(body)).encode()),
+            (b'x-cache', status.encode()),
+            *ResponseCacheMiddleware.validators(meta, encoding),
+        ]
+        if encoding in meta['encoded']:
+            headers.append((b'content-encoding', encoding.encode()))
+        await send({'type': 'http.response.start', 'status': meta['status'], 'headers': headers})
+        await send({'type': 'http.response.body', 'body': body})
+
+    @staticmethod
+    async def send_not_modified(send: Send, meta: dict, encoding: str, status: str):
+        headers = [(b'x-cache', status.encode()), *ResponseCacheMiddleware.validators(meta, encoding)]
+        await send({'type': 'http.response.start', 'status': 304, 'headers': headers})
+        await send({'type': 'http.response.body', 'body': b''})
@@ -0,0 +1,11 @@
+from starlette.routing import Match
+from starlette.types import Scope
+
+
+def match_route(scope: Scope) -> tuple[str | None, dict]:
+    """Find the route template and path parameters a request will be dispatched to"""
+    for route in scope['app'].router.routes:
+        match, child_scope = route.matches(scope)
+        if match == Match.FULL:
+            return route.path, child_scope.get('path_params', {})
+    return None, {}
@@ -0,0 +1,55 @@
+from pydantic import Field
+
+from .base import BaseOrjsonModel
+
+
+class PurgeRequest(BaseOrjsonModel):
+    # 'film:<uuid>', 'genre:<uuid>', 'person:<uuid>'; 'films' drops entries built from all films
+    keys: list[str] = Field(..., min_items=1)
+
+
+class EdgePurgeResult(BaseOrjsonModel):
+    url: str
+    status: int | None
+    error: str | None
+
+
+class PurgeResult(BaseOrjsonModel):
+    purged_entries: int
+    edges: list[EdgePurgeResult]
+
+
+class CacheFamily(BaseOrjsonModel):
+    # 'Film', 'Film__search', 'Genre__get_films_by_genre_id', 'resp', 'stale__Film', ...
+    family: str
+    sampled_keys: int
+    sampled_memory_bytes: int
+    avg_memory_bytes: float | None
+    # выборка SCAN, пересчитанная на все ключи базы
+    estimated_memory_bytes: int
+    lookups: int
+    hits: int
+    hit_ratio: float | None
+    writes: int
+    avg_value_bytes: float | None
+
+
+class HotKey(BaseOrjsonModel):
+    key: str
+    family: str
+    # оценка числа обращений за недавнее время
+    count: int
+
+
+class CacheReport(BaseOrjsonModel):
+    total_keys: int
+    sampled_keys: int
+    scan_complete: bool
+    used_memory_bytes: int | None
+    max_memory_bytes: int | None
+    maxmemory_policy: str | None
+    evicted_keys: int | None
+    expired_keys: int | None
+    keyspace_hit_ratio: float | None
+    families: list[CacheFamily]
+    hot_keys: list[HotKey]
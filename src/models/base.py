@@ -1,5 +1,7 @@
 import orjson
 from pydantic import BaseModel
+from pydantic.fields import SHAPE_LIST
+from pydantic.fields import SHAPE_SINGLETON
 
 
 def orjson_dumps(v, *, default):
@@ -7,10 +9,63 @@ def orjson_dumps(v, *, default):
     return orjson.dumps(v, default=default).decode()
 
 
-class BaseOrjsonModelWithUUID(BaseModel):
-    uuid: str
-
+class BaseOrjsonModel(BaseModel):
     class Config:
         # Заменяем стандартную работу с json на более быструю
         json_loads = orjson.loads
         json_dumps = orjson_dumps
+
+    @classmethod
+    def construct_trusted(cls, data):
+        """
+        Build a model from data of our own indexes or cache without validation.
+
+        Unlike `construct()`, nested models are built too. `data` may be a dict
+        (ES `_source`, decoded cache entry) or another model with the same fields.
+        Fields missing from `data` get their defaults but are not marked as set, so
+        `dict(exclude_unset=True)` keeps a sparse fieldset sparse.
+        Only use it for data that was validated when it was written.
+        """
+        if isinstance(data, BaseModel):
+            fields_set = data.__fields_set__
+            data = data.__dict__
+        else:
+            fields_set = data.keys()
+        values, set_ = {}, set()
+        for name, field, nested, is_list in cls._trusted_converters():
+            if name in fields_set:
+                set_.add(name)
+            if name in data:
+                value = data[name]
+            else:
+                # копия значения по умолчанию: список [] не должен быть общим у всех объектов
+                value = field.get_default()
+            if nested is not None and value is not None:
+                if is_list:
+                    value = [item if type(item) is nested else nested.construct_trusted(item) for item in value]
+                elif type(value) is not nested:
+                    value = nested.construct_trusted(value)
+            values[name] = value
+        model = cls.__new__(cls)
+        object.__setattr__(model, '__dict__', values)
+        object.__setattr__(model, '__fields_set__', set_)
+        model._init_private_attributes()
+        return model
+
+    @classmethod
+    def _trusted_converters(cls) -> list[tuple]:
+        # Разбираем поля модели один раз на класс
+        converters = cls.__dict__.get('_converters')
+        if converters is None:
+            converters = []
+            for name, field in cls.__fields__.items():
+                nested = field.type_ if isinstance(field.type_, type) and issubclass(field.type_, BaseModel) else None
+                if field.shape not in (SHAPE_SINGLETON, SHAPE_LIST):
+                    nested = None
+                converters.append((name, field, nested, field.shape == SHAPE_LIST))
+            setattr(cls, '_converters', converters)
+        return converters
+
+
+class BaseOrjsonModelWithUUID(BaseOrjsonModel):
+    uuid: str
@@ -1,3 +1,4 @@
+from .base import BaseOrjsonModel
 from .base import BaseOrjsonModelWithUUID
 
 
@@ -17,3 +18,18 @@ class Film(BaseOrjsonModelWithUUID):
     directors: list[PersonInFilm]
     actors: list[PersonInFilm]
     writers: list[PersonInFilm]
+
+
+class FilmFilter(BaseOrjsonModel):
+    """Filters of film lists; any of several genres or persons matches"""
+    genres: list[str] = []
+    rating_gte: float | None
+    rating_lte: float | None
+    persons: list[str] = []
+
+    def signature(self) -> str:
+        """Canonical form for cache keys: the order of values does not matter"""
+        return f'{sorted(set(self.genres))}|{self.rating_gte}|{self.rating_lte}|{sorted(set(self.persons))}'
+
+    def __bool__(self) -> bool:
+        return bool(self.genres or self.persons or self.rating_gte is not None or self.rating_lte is not None)
@@ -0,0 +1,9 @@
+from pydantic import Field
+
+from .base import BaseOrjsonModel
+
+
+class GraphQLRequest(BaseOrjsonModel):
+    query: str
+    variables: dict | None
+    operation_name: str | None = Field(None, alias='operationName')
@@ -0,0 +1,16 @@
+from .base import BaseOrjsonModel
+
+
+class DependencyHealth(BaseOrjsonModel):
+    # 'redis', 'elastic'
+    name: str
+    ok: bool
+    latency_ms: float | None
+    error: str | None
+
+
+class Health(BaseOrjsonModel):
+    # 'ok' или 'unavailable'
+    status: str
+    warm: bool
+    dependencies: list[DependencyHealth] = []
@@ -2,15 +2,30 @@ from enum import Enum
 from .base import BaseOrjsonModelWithUUID
 
 
+class PersonType(str, Enum):
+    actor = 'actor'
+    director = 'director'
+    writer = 'writer'
+
+
+class PersonFilm(BaseOrjsonModelWithUUID):
+    """Short record of a film in the person's document, one per role the person had in it"""
+    title: str
+    imdb_rating: float | None
+    role: PersonType
+
+    class Config:
+        use_enum_values = True
+
+
 class Person(BaseOrjsonModelWithUUID):
-    class PersonType(str, Enum):
-        actor = 'actor'
-        director = 'director'
-        writer = 'writer'
+    PersonType = PersonType
 
     full_name: str
     film_ids: list[str] | None
     role: PersonType | None
+    # заполняется ETL (etl.persons) из индекса фильмов
+    films: list[PersonFilm] = []
 
     class Config:
         use_enum_values = True
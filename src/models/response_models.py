@@ -1,6 +1,28 @@
+from .base import BaseOrjsonModel
 from .base import BaseOrjsonModelWithUUID
 
 
 class FilmResponseShort(BaseOrjsonModelWithUUID):
     title: str
     imdb_rating: float | None
+
+
+class Suggestion(BaseOrjsonModelWithUUID):
+    text: str
+
+
+class GenreFacet(BaseOrjsonModelWithUUID):
+    name: str | None
+    count: int
+
+
+class RatingBucket(BaseOrjsonModel):
+    rating_from: float
+    rating_to: float
+    count: int
+
+
+class FilmFacets(BaseOrjsonModel):
+    total: int
+    genres: list[GenreFacet]
+    imdb_rating: list[RatingBucket]
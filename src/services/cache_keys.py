@@ -0,0 +1,69 @@
+import hashlib
+import re
+
+# Всё, что не просто слово, может менять смысл запроса при перестановке или смене регистра:
+# операторы AND/OR/NOT, поля 'title:...', фразы в кавычках, скобки, wildcard и т.д.
+_PLAIN_TERMS = re.compile(r"\w[\w'-]*( \w[\w'-]*)*")
+_OPERATORS = {'AND', 'OR', 'NOT'}
+# Буст '^1' ничего не меняет в скоринге
+_NOOP_BOOST = re.compile(r'\^1(\.0*)?(?![\d.])')
+# Хеши и id в ключах, в отличие от названий методов
+_DIGEST = re.compile(r'[0-9a-f]{16,}')
+
+
+def normalize_query(query: str | None, case_insensitive: bool = True) -> str:
+    """
+    Bring a query_string query to a canonical form with the same search semantics.
+
+    Whitespace is always collapsed and no-op boosts are dropped. Queries made only of
+    plain terms (default OR operator) also have their terms sorted and, when every searched
+    field is lowercased by its analyzer, lowercased. So 'Star Wars', 'star  wars' and
+    'wars star' share one cache entry.
+    """
+    query = _NOOP_BOOST.sub('', ' '.join((query or '').split()))
+    if not _PLAIN_TERMS.fullmatch(query):
+        return query
+    terms = query.split(' ')
+    if _OPERATORS.intersection(terms):
+        return query
+    if case_insensitive:
+        # lower(), как фильтр lowercase в Elastic: casefold() превратил бы 'Straße' в 'strasse'
+        terms = [term.lower() for term in terms]
+    return ' '.join(sorted(terms))
+
+
+def hash_key(*parts) -> str:
+    """Fixed length digest of arbitrary cache key parts"""
+    return hashlib.blake2b('\x1f'.join(str(part) for part in parts).encode(), digest_size=16).hexdigest()
+
+
+def search_key(model_name: str, query: str, page: int, size: int, fields: tuple[str, ...] | None = None) -> str:
+    return f'{model_name}__search__{hash_key(query, *(fields or ()))}__{page}__{size}'
+
+
+def object_key(model_name: str, object_id: str, fields: tuple[str, ...] | None = None) -> str:
+    """Key of a whole object, or of a sparse fieldset of it"""
+    if fields:
+        return f'{model_name}__{object_id}__fields__{hash_key(*fields)}'
+    return f'{model_name}__{object_id}'
+
+
+def person_films_key(person_id: str) -> str:
+    return f'Person__get_films_by_person__{person_id}'
+
+
+def key_family(cache_key: str) -> str:
+    """
+    Kind of a cache key without its variable parts.
+
+    'Film__<uuid>' and its sparse fieldsets -> 'Film', 'Film__search__<hash>__1__50' -> 'Film__search'.
+    """
+    model, _, rest = cache_key.partition('__')
+    kind = rest.partition('__')[0]
+    if kind.isidentifier() and not _DIGEST.fullmatch(kind):
+        return f'{model}__{kind}'
+    return model
+
+
+def stale_key(cache_key: str) -> str:
+    return f'stale__{cache_key}'
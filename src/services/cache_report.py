@@ -0,0 +1,103 @@
+import asyncio
+from collections import Counter
+from functools import lru_cache
+
+from aioredis import Redis
+from core.config import AdminSettings
+from db.redis import get_redis
+from fastapi import Depends
+from models.admin import CacheFamily
+from models.admin import CacheReport
+from models.admin import HotKey
+from services.cache_keys import key_family
+from services.cache_stats import CacheStats
+from services.cache_stats import stats
+
+settings = AdminSettings()
+
+
+def ratio(part: int, total: int) -> float | None:
+    return part / total if total else None
+
+
+class CacheReportService:
+    """
+    What the Redis cache holds and how it is used.
+
+    Memory is sampled: keys are walked with SCAN in small steps and measured with
+    MEMORY USAGE, so Redis is never blocked by a KEYS or a long command; the order of
+    SCAN follows the hash table, so the first keys are a fair sample. Lookups, hits,
+    written sizes and hot keys are counted by this worker only.
+    """
+
+    def __init__(self, redis: Redis, stats: CacheStats):
+        self.redis = redis
+        self.stats = stats
+
+    async def report(self, sample_size: int, top: int) -> CacheReport:
+        keys, memory, complete = await self._sample(sample_size)
+        total_keys = await self.redis.dbsize()
+        info = await self.redis.info()
+        sampled = sum(keys.values())
+        scale = total_keys / sampled if sampled else 0
+        families = []
+        for family in set(keys) | set(self.stats.lookups) | set(self.stats.writes):
+            families.append(
+                CacheFamily(
+                    family=family,
+                    sampled_keys=keys[family],
+                    sampled_memory_bytes=memory[family],
+                    avg_memory_bytes=ratio(memory[family], keys[family]),
+                    estimated_memory_bytes=int(memory[family] * scale),
+                    lookups=self.stats.lookups[family],
+                    hits=self.stats.hits[family],
+                    hit_ratio=ratio(self.stats.hits[family], self.stats.lookups[family]),
+                    writes=self.stats.writes[family],
+                    avg_value_bytes=ratio(self.stats.written_bytes[family], self.stats.writes[family]),
+                )
+            )
+        families.sort(key=lambda family: (-family.estimated_memory_bytes, -family.lookups))
+        memory_info, server_stats = info.get('memory', {}), info.get('stats', {})
+        hits, misses = self._int(server_stats, 'keyspace_hits'), self._int(server_stats, 'keyspace_misses')
+        return CacheReport(
+            total_keys=total_keys,
+            sampled_keys=sampled,
+            scan_complete=complete,
+            used_memory_bytes=self._int(memory_info, 'used_memory'),
+            max_memory_bytes=self._int(memory_info, 'maxmemory'),
+            maxmemory_policy=memory_info.get('maxmemory_policy'),
+            evicted_keys=self._int(server_stats, 'evicted_keys'),
+            expired_keys=self._int(server_stats, 'expired_keys'),
+            keyspace_hit_ratio=ratio(hits or 0, (hits or 0) + (misses or 0)),
+            families=families,
+            hot_keys=[HotKey(key=key, family=key_family(key), count=count) for key, count in self.stats.hot.top(top)],
+        )
+
+    async def _sample(self, sample_size: int) -> tuple[Counter, Counter, bool]:
+        """Number of keys and bytes per family among the first `sample_size` keys of SCAN"""
+        keys, memory = Counter(), Counter()
+        cursor, sampled = 0, 0
+        while True:
+            cursor, batch = await self.redis.scan(cursor, count=settings.cache_scan_count)
+            batch = batch[:sample_size - sampled]
+            # команды одного шага уходят пачкой по соединениям пула
+            usages = await asyncio.gather(*(self.redis.execute(b'MEMORY', b'USAGE', key) for key in batch))
+            for key, usage in zip(batch, usages):
+                family = key_family(key.decode() if isinstance(key, bytes) else key)
+                keys[family] += 1
+                memory[family] += usage or 0
+            sampled += len(batch)
+            if not cursor:
+                return keys, memory, True
+            if sampled >= sample_size:
+                return keys, memory, False
+
+    @staticmethod
+    def _int(section: dict, name: str) -> int | None:
+        value = section.get(name)
+        return int(value) if value is not None else None
+
+
+@lru_cache()
+def get_cache_report_service(redis: Redis = Depends(get_redis)) -> CacheReportService:
+    return CacheReportService(redis, stats)
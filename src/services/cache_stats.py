@@ -0,0 +1,40 @@
+from collections import Counter
+
+from core.config import CacheTTLSettings
+from core.sketch import CountMinSketch
+from core.sketch import HeavyHitters
+
+from .cache_keys import key_family
+
+settings = CacheTTLSettings()
+
+
+class CacheStats:
+    """
+    Cache traffic of this worker: access counts of keys in a count-min sketch of recent
+    traffic, the hottest keys, and lookups, hits and written bytes per key family.
+    """
+
+    def __init__(self):
+        self.sketch = CountMinSketch(settings.sketch_width, settings.sketch_depth)
+        self.hot = HeavyHitters(self.sketch, settings.hot_keys)
+        self.lookups: Counter[str] = Counter()
+        self.hits: Counter[str] = Counter()
+        self.writes: Counter[str] = Counter()
+        self.written_bytes: Counter[str] = Counter()
+
+    def record(self, cache_key: str, hit: bool, family: str | None = None):
+        """Count a cache lookup"""
+        self.hot.add(cache_key, self.sketch.add(cache_key))
+        family = family or key_family(cache_key)
+        self.lookups[family] += 1
+        if hit:
+            self.hits[family] += 1
+
+    def record_write(self, cache_key: str, size: int, family: str | None = None):
+        family = family or key_family(cache_key)
+        self.writes[family] += 1
+        self.written_bytes[family] += size
+
+
+stats = CacheStats()
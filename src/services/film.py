@@ -1,152 +1,537 @@
-import json
 from functools import lru_cache
 from typing import Any
+from typing import Awaitable
+from typing import Callable
 from typing import Optional
 import sys
+
+import orjson
 from aioredis import Redis
+from core.config import SharedMemorySettings
+from core.context import current_request
+from core.deadline import mark_timed_out
+from core.deadline import search_timeout
+from core.deadline import within_deadline
+from core.tracing import span
+from db.breaker import CircuitBreaker
+from db.breaker import ElasticUnavailableError
+from db.elastic import get_batcher
+from db.elastic import get_breaker
 from db.elastic import get_elastic
+from db.indexes import GENRES
+from db.indexes import MOVIES
+from db.indexes import PERSONS
+from db.msearch import MSearchBatcher
 from db.redis import get_redis
+from db.shm import SharedMemoryCache
+from db.shm import get_shm
 from elasticsearch import AsyncElasticsearch
 from elasticsearch import NotFoundError
 from fastapi import Depends
 from models.film import Film
+from models.film import FilmFilter
 from models.genre import Genre
 from models.person import Person
-from pydantic.json import pydantic_encoder
-from pydantic import parse_raw_as
+from models.person import PersonFilm
+from models.response_models import FilmFacets
+from models.response_models import GenreFacet
+from models.response_models import RatingBucket
+from services.cache_keys import hash_key
+from services.cache_keys import normalize_query
+from services.cache_keys import object_key
+from services.cache_keys import search_key
+from services.cache_keys import stale_key
+from services.surrogate import MODEL_KINDS
+from services.surrogate import surrogate_keys
+from services.surrogate import tag
+from services.surrogate import tag_key
+from services.cache_stats import stats as cache_stats
+from services.snapshot import snapshot as genre_snapshot
+from services.ttl import policy as ttl_policy
+
+FACET_GENRES_SIZE = 100
+FACET_RATING_INTERVAL = 1
 
-FILM_CACHE_EXPIRE_IN_SECONDS = 60 * 5  # 5 минут
+shm_settings = SharedMemorySettings()
 
 
 class BaseService:
 
     # model name <-> Elastic index name
     mapping = {
-        'Film': 'movies',
-        'Genre': 'genres',
-        'Person': 'persons',
+        'Film': MOVIES,
+        'Genre': GENRES,
+        'Person': PERSONS,
     }
+    # models whose searched fields are all lowercased by the analyzer (persons have keyword full_name)
+    case_insensitive_search = {'Film'}
 
-    def __init__(self, redis: Redis, elastic: AsyncElasticsearch):
+    def __init__(
+        self,
+        redis: Redis,
+        elastic: AsyncElasticsearch,
+        batcher: MSearchBatcher | None = None,
+        shm: SharedMemoryCache | None = None,
+        breaker: CircuitBreaker | None = None,
+    ):
         self.redis = redis
         self.elastic = elastic
+        self.batcher = batcher
+        self.shm = shm
+        self.breaker = breaker
 
-    async def get_by_id(self, object_id: str, model_name: str) -> Optional:
-        object_ = await self._object_from_cache(object_id, model_name)
-        if not object_:
-            object_ = await self._get_object_from_elastic(object_id, model_name)
+    async def _elastic_call(self, func: Callable[..., Awaitable], *args, **kwargs):
+        """Call Elastic through the circuit breaker when it is enabled, within the request deadline"""
+        with span('es'):
+            if self.breaker:
+                return await within_deadline(self.breaker.call(func, *args, **kwargs))
+            return await within_deadline(func(*args, **kwargs))
+
+    async def _search(self, index: str, body: dict, size: int, from_: int) -> dict:
+        """
+        Search through the _msearch batcher when it is enabled.
+
+        When the request accepts partial results, Elastic gets the remaining time as the
+        search timeout and returns what the shards found by then instead of working on.
+        """
+        timeout = search_timeout()
+        if timeout:
+            body = {**body, 'timeout': timeout}
+        search = self.batcher.search if self.batcher else self.elastic.search
+        response = await self._elastic_call(search, index=index, body=body, size=size, from_=from_)
+        mark_timed_out(response)
+        return response
+
+    async def _get(self, index: str, object_id: str, **kwargs) -> dict:
+        return await self._elastic_call(self.elastic.get, index, object_id, **kwargs)
+
+    async def _mget(self, index: str, ids: list[str], **kwargs) -> dict:
+        return await self._elastic_call(self.elastic.mget, index=index, body={'ids': ids}, **kwargs)
+
+    async def get_by_id(self, object_id: str, model_name: str, fields: tuple[str, ...] | None = None) -> Optional:
+        """Get an object, or only the given fields of it"""
+        cache_key = object_key(model_name, object_id, fields)
+        return await self._get_object(
+            cache_key, model_name, lambda: self._get_object_from_elastic(object_id, model_name, fields)
+        )
+
+    async def _get_object(self, cache_key: str, model_name: str, load: Callable[[], Awaitable]) -> Optional:
+        """Read an object through the cache, like _get_list; objects loaded as None are not cached"""
+        object_ = await self._object_from_cache(cache_key, model_name)
+        if object_:
+            return object_
+        try:
+            object_ = await load()
+        except ElasticUnavailableError:
+            object_ = await self._from_stale_cache(cache_key, model_name, is_list=False)
+            if object_ is None:
+                raise
+            return object_
         if not object_:
             return None
-        await self._put_object_to_cache(object_, object_.uuid)
+        if self._complete():
+            await self._put_object_to_cache(object_, cache_key)
         return object_
 
-    async def _get_object_from_elastic(self, object_id: str, model_name: str) -> Optional:
+    async def _get_object_from_elastic(
+        self, object_id: str, model_name: str, fields: tuple[str, ...] | None = None
+    ) -> Optional:
         try:
             index = BaseService.mapping[model_name]
-            doc = await self.elastic.get(index, object_id)
+            if fields:
+                doc = await self._get(index, object_id, _source_includes=list(fields))
+            else:
+                doc = await self._get(index, object_id)
         except NotFoundError:
             return None
-        return getattr(sys.modules[__name__], model_name)(**doc['_source'])
+        with span('parse'):
+            return getattr(sys.modules[__name__], model_name).construct_trusted(doc['_source'])
 
-    async def search_objects(self, query: str, model_name: str, page: int, size: int) -> list:
-        """Get objects by search query"""
-        cache_key = f'{model_name}__search__{query}__{page}__{size}'
+    async def get_many(self, object_ids: list[str], model_name: str) -> list:
+        """
+        Get whole objects by ids, None for unknown ones, in as few round trips as possible.
+
+        Entries found in the host shared memory are taken from there, the rest are read
+        with one Redis MGET, and what is still missing is loaded with one Elastic mget.
+        The objects share cache entries with get_by_id.
+        """
+        keys = {object_id: object_key(model_name, object_id) for object_id in object_ids}
+        payloads = {}
+        if self.shm:
+            with span('shm'):
+                for object_id, key in keys.items():
+                    data = self.shm.get(key)
+                    if data is not None:
+                        payloads[object_id] = data
+                        cache_stats.record(key, True)
+        missing = [object_id for object_id in keys if object_id not in payloads]
+        if missing:
+            with span('redis'):
+                values = await within_deadline(self.redis.mget(*(keys[object_id] for object_id in missing)))
+            for object_id, data in zip(missing, values):
+                cache_stats.record(keys[object_id], bool(data))
+                if data:
+                    payloads[object_id] = data
+                    if self.shm:
+                        self.shm.set(keys[object_id], data, shm_settings.expire)
+        model = getattr(sys.modules[__name__], model_name)
+        with span('parse'):
+            objects = {object_id: model.construct_trusted(orjson.loads(data)) for object_id, data in payloads.items()}
+        missing = [object_id for object_id in keys if object_id not in objects]
+        if missing:
+            objects.update(await self._get_many_from_elastic(missing, model_name))
+        return [objects.get(object_id) for object_id in object_ids]
+
+    async def _get_many_from_elastic(self, object_ids: list[str], model_name: str) -> dict:
+        model = getattr(sys.modules[__name__], model_name)
+        try:
+            docs = await self._mget(BaseService.mapping[model_name], object_ids)
+        except NotFoundError:
+            return {}
+        except ElasticUnavailableError:
+            keys = [stale_key(object_key(model_name, object_id)) for object_id in object_ids]
+            with span('redis'):
+                values = await within_deadline(self.redis.mget(*keys))
+            if not any(values):
+                raise
+            state = current_request()
+            if state:
+                state.stale = True
+            with span('parse'):
+                return {
+                    object_id: model.construct_trusted(orjson.loads(data))
+                    for object_id, data in zip(object_ids, values)
+                    if data
+                }
+        with span('parse'):
+            objects = {doc['_id']: model.construct_trusted(doc['_source']) for doc in docs['docs'] if doc.get('found')}
+        if objects:
+            await self._put_many_to_cache(objects, model_name)
+        return objects
+
+    async def _get_list(self, cache_key: str, model_name: str, load: Callable[[], Awaitable[list]]) -> list:
+        """
+        Read a list through the cache.
+
+        On a miss the list is loaded from Elastic and cached; if Elastic is unavailable
+        the last known good value is served from the stale cache and the response is marked.
+        """
         objects = await self._list_from_cache(cache_key, model_name)
-        if not objects:
-            objects = await self._search_objects_in_elastic(query, model_name, page, size)
+        if objects:
+            return objects
+        try:
+            objects = await load()
+        except ElasticUnavailableError:
+            objects = await self._from_stale_cache(cache_key, model_name, is_list=True)
+            if objects is None:
+                raise
+            return objects
+        if self._complete():
             await self._put_list_to_cache(objects, cache_key)
         return objects
 
-    async def _search_objects_in_elastic(self, query: str, model_name: str, page: int, page_size: int) -> list:
+    async def search_objects(
+        self, query: str, model_name: str, page: int, size: int, fields: tuple[str, ...] | None = None
+    ) -> list:
+        """Get objects by search query"""
+        query = normalize_query(query, model_name in BaseService.case_insensitive_search)
+        cache_key = search_key(model_name, query, page, size, fields)
+        return await self._get_list(
+            cache_key, model_name, lambda: self._search_objects_in_elastic(query, model_name, page, size, fields)
+        )
+
+    async def _search_objects_in_elastic(
+        self, query: str, model_name: str, page: int, page_size: int, fields: tuple[str, ...] | None
+    ) -> list:
         docs = []
-        query_body = {'query': {'query_string': {'query': query}}}
+        query_body = self._with_source({'query': {'query_string': {'query': query}}}, fields)
         page = page if page else 1
         page_size = page_size if page_size else 50
         index = BaseService.mapping[model_name]
         try:
-            hits = await self.elastic.search(index=index, body=query_body, size=page_size, from_=(page - 1) * page_size)
-            for hit in hits['hits']['hits']:
-                docs.append(getattr(sys.modules[__name__], model_name)(**hit['_source']))
+            hits = await self._search(index=index, body=query_body, size=page_size, from_=(page - 1) * page_size)
+            with span('parse'):
+                for hit in hits['hits']['hits']:
+                    docs.append(getattr(sys.modules[__name__], model_name).construct_trusted(hit['_source']))
         except NotFoundError:
             return []
         return docs
 
+    @staticmethod
+    def _complete() -> bool:
+        """False when a search of the request was cut short by the deadline: its partial result is not cached"""
+        state = current_request()
+        return not (state and state.timed_out)
+
+    @staticmethod
+    def _with_source(body: dict, fields: tuple[str, ...] | None) -> dict:
+        """Let Elastic return only the fields of a sparse fieldset"""
+        if fields:
+            body['_source'] = list(fields)
+        return body
+
+    async def _get_from_cache(self, cache_key: str) -> bytes | None:
+        """Read a cache entry from the host shared memory, then from Redis"""
+        if self.shm:
+            with span('shm'):
+                data = self.shm.get(cache_key)
+            if data is not None:
+                cache_stats.record(cache_key, True)
+                return data
+        with span('redis'):
+            data = await within_deadline(self.redis.get(cache_key))
+        cache_stats.record(cache_key, bool(data))
+        if data and self.shm:
+            self.shm.set(cache_key, data, shm_settings.expire)
+        return data
+
+    async def _set_to_cache(self, cache_key: str, data: bytes) -> bool:
+        """
+        Write a cache entry and its stale copy, kept for serving while Elastic is unavailable.
+
+        The TTL policy picks the lifetime of the entry and may decide not to cache it at all.
+        """
+        ttl = ttl_policy.ttl(cache_key)
+        if not ttl:
+            return False
+        cache_stats.record_write(cache_key, len(data))
+        with span('redis'):
+            pipeline = self.redis.pipeline()
+            pipeline.set(cache_key, data, expire=ttl)
+            pipeline.set(stale_key(cache_key), data, expire=ttl_policy.stale_ttl(ttl))
+            await pipeline.execute()
+        if self.shm:
+            self.shm.set(cache_key, data, shm_settings.expire)
+        return True
+
+    async def _from_stale_cache(self, cache_key: str, model_name: str, is_list: bool):
+        with span('redis'):
+            data = await within_deadline(self.redis.get(stale_key(cache_key)))
+        if data is None:
+            return None
+        state = current_request()
+        if state:
+            state.stale = True
+        model = getattr(sys.modules[__name__], model_name)
+        with span('parse'):
+            if is_list:
+                return [model.construct_trusted(item) for item in orjson.loads(data)]
+            return model.construct_trusted(orjson.loads(data))
+
     async def _object_from_cache(self, cache_key: str, model_name: str) -> Optional[Any]:
-        data = await self.redis.get(cache_key)
+        data = await self._get_from_cache(cache_key)
         if not data:
             return None
-        object_ = getattr(sys.modules[__name__], model_name).parse_raw(data)
+        with span('parse'):
+            object_ = getattr(sys.modules[__name__], model_name).construct_trusted(orjson.loads(data))
         return object_
 
     async def _list_from_cache(self, cache_key: str, model_name: str) -> list[Any]:
-        data = await self.redis.get(cache_key)
+        data = await self._get_from_cache(cache_key)
         if not data:
             return []
-        objects_ = parse_raw_as(list[getattr(sys.modules[__name__], model_name)], data)
+        model = getattr(sys.modules[__name__], model_name)
+        with span('parse'):
+            objects_ = [model.construct_trusted(item) for item in orjson.loads(data)]
         return objects_
 
     async def _put_object_to_cache(self, object_: Any, cache_key: str):
-        await self.redis.set(cache_key, object_.json(), expire=FILM_CACHE_EXPIRE_IN_SECONDS)
+        with span('serialize'):
+            payload = object_.dict(exclude_unset=True)
+            data = orjson.dumps(payload)
+        if await self._set_to_cache(cache_key, data):
+            await self._tag_cache_entry(cache_key, type(object_).__name__, [payload])
 
     async def _put_list_to_cache(self, object_: list, cache_key: str):
-        json_list = json.dumps(object_, default=pydantic_encoder)
-        await self.redis.set(cache_key, json_list, expire=FILM_CACHE_EXPIRE_IN_SECONDS)
+        with span('serialize'):
+            payload = [obj.dict(exclude_unset=True) for obj in object_]
+            data = orjson.dumps(payload)
+        if await self._set_to_cache(cache_key, data) and object_:
+            await self._tag_cache_entry(cache_key, type(object_[0]).__name__, payload)
+
+    async def _put_many_to_cache(self, objects: dict[str, Any], model_name: str):
+        """Cache objects under their get_by_id keys, with stale copies and tags, in one round trip"""
+        with span('serialize'):
+            payloads = {
+                object_key(model_name, object_id): object_.dict(exclude_unset=True)
+                for object_id, object_ in objects.items()
+            }
+            ttls = {key: ttl for key in payloads if (ttl := ttl_policy.ttl(key))}
+            entries = {key: orjson.dumps(payloads[key]) for key in ttls}
+        if not entries:
+            return
+        with span('redis'):
+            pipeline = self.redis.pipeline()
+            for key, data in entries.items():
+                cache_stats.record_write(key, len(data))
+                pipeline.set(key, data, expire=ttls[key])
+                pipeline.set(stale_key(key), data, expire=ttl_policy.stale_ttl(ttls[key]))
+                for surrogate_key in surrogate_keys(MODEL_KINDS.get(model_name), [payloads[key]]):
+                    pipeline.sadd(tag_key(surrogate_key), key)
+                    pipeline.expire(tag_key(surrogate_key), ttl_policy.tag_ttl)
+            await pipeline.execute()
+        if self.shm:
+            for key, data in entries.items():
+                self.shm.set(key, data, shm_settings.expire)
+
+    async def _tag_cache_entry(self, cache_key: str, model_name: str, payload: list[dict]):
+        """Tag a cache entry with surrogate keys of its objects, so the purge API can drop it"""
+        keys = surrogate_keys(MODEL_KINDS.get(model_name), payload)
+        # теги живут не меньше самой долгой записи и её устаревшей копии: иначе purge их не найдёт
+        await tag(self.redis, cache_key, keys, ttl_policy.tag_ttl)
 
 
 class FilmService(BaseService):
-    async def get_all_films(self, sort_by: Optional[str], filter_by: Optional[str], page: int, size: int) -> list[Film]:
+    async def get_all_films(
+        self,
+        sort_by: Optional[str],
+        filter_by: FilmFilter,
+        page: int,
+        size: int,
+        fields: tuple[str, ...] | None = None,
+    ) -> list[Film]:
         """Get all films from index"""
-        cache_key = f'Film__get_all__{sort_by}__{filter_by}__{page}__{size}'
-        films = await self._list_from_cache(cache_key, 'Film')
-        if not films:
-            films = await self._get_films_sort_filter(sort_by, filter_by, page, size)
-            await self._put_list_to_cache(films, cache_key)
-        return films
+        cache_key = f'Film__get_all__{hash_key(sort_by, filter_by.signature(), *(fields or ()))}__{page}__{size}'
+        return await self._get_list(
+            cache_key, 'Film', lambda: self._get_films_sort_filter(sort_by, filter_by, page, size, fields)
+        )
 
     async def _get_films_sort_filter(
-        self, sort_by: Optional[str], filter_by: Optional[str], page: int, size: int
+        self, sort_by: Optional[str], filter_by: FilmFilter, page: int, size: int, fields: tuple[str, ...] | None
     ) -> list[Film]:
         """Get all films with given sort and filter"""
         try:
-            body = {}
+            # total не нужен ручке: без подсчёта Elastic может закончить поиск раньше
+            body = self._with_source({'track_total_hits': False}, fields)
             if sort_by:
                 order = 'desc' if sort_by[0] == '-' else 'asc'
-                body['sort'] = [{sort_by: {'order': order}}]
+                body['sort'] = [{sort_by.lstrip('-'): {'order': order}}]
             if filter_by:
-                body['query'] = {
-                    'nested': {'path': 'genre', 'query': {'bool': {'must': [{'match': {'genre.name': filter_by}}]}}}
-                }
-            hits = await self.elastic.search(index='movies', body=body, from_=(page - 1) * size, size=size)
+                body['query'] = self._films_filter_query(filter_by)
+            hits = await self._search(index=MOVIES, body=body, from_=(page - 1) * size, size=size)
             docs = []
-            for hit in hits['hits']['hits']:
-                docs.append(Film(**hit['_source']))
+            with span('parse'):
+                for hit in hits['hits']['hits']:
+                    docs.append(Film.construct_trusted(hit['_source']))
         except NotFoundError:
             return []
         return docs
 
-    async def get_similar_films(self, film_id: str, page: int, size: int) -> list[Film]:
+    @staticmethod
+    def _films_filter_query(filter_by: FilmFilter) -> dict:
+        """
+        Build a filter context query: no scoring, and every clause is cacheable by Elastic.
+
+        Genres are matched by uuid or name in any case, persons by uuid in any role.
+        """
+        filters = []
+        if filter_by.genres:
+            genre_terms = [{'terms': {'genre.uuid': filter_by.genres}}]
+            # названия известных жанров уже заменены на uuid по снимку, по имени ищутся только остальные
+            names = [genre for genre in filter_by.genres if genre not in genre_snapshot]
+            if names:
+                genre_terms.append({'terms': {'genre.name.raw': names}})
+            filters.append({'nested': {'path': 'genre', 'query': {'bool': {'should': genre_terms}}}})
+        if filter_by.rating_gte is not None or filter_by.rating_lte is not None:
+            rating_range = {'gte': filter_by.rating_gte, 'lte': filter_by.rating_lte}
+            filters.append({'range': {'imdb_rating': {k: v for k, v in rating_range.items() if v is not None}}})
+        if filter_by.persons:
+            roles = [
+                {'nested': {'path': role, 'query': {'terms': {f'{role}.uuid': filter_by.persons}}}}
+                for role in ('actors', 'directors', 'writers')
+            ]
+            filters.append({'bool': {'should': roles}})
+        return {'bool': {'filter': filters}}
+
+    async def get_facets(self, filter_by: FilmFilter) -> FilmFacets:
+        """Get genre counts and imdb_rating histogram of films matching the filter"""
+        cache_key = f'Film__facets__{hash_key(filter_by.signature())}'
+        return await self._get_object(cache_key, 'FilmFacets', lambda: self._get_facets_from_elastic(filter_by))
+
+    async def _get_facets_from_elastic(self, filter_by: FilmFilter) -> FilmFacets:
+        body = {
+            'track_total_hits': True,
+            'aggs': {
+                'genres': {
+                    'nested': {'path': 'genre'},
+                    'aggs': {
+                        'ids': {
+                            'terms': {'field': 'genre.uuid', 'size': FACET_GENRES_SIZE},
+                            'aggs': {'films': {'reverse_nested': {}}, 'name': {'top_hits': {'size': 1}}},
+                        }
+                    },
+                },
+                'imdb_rating': {
+                    'histogram': {
+                        'field': 'imdb_rating',
+                        'interval': FACET_RATING_INTERVAL,
+                        'min_doc_count': 0,
+                        'extended_bounds': {'min': 0, 'max': 10 - FACET_RATING_INTERVAL},
+                    }
+                },
+            },
+        }
+        if filter_by:
+            body['query'] = self._films_filter_query(filter_by)
+        try:
+            result = await self._search(index=MOVIES, body=body, size=0, from_=0)
+        except NotFoundError:
+            return FilmFacets(total=0, genres=[], imdb_rating=[])
+        aggregations = result['aggregations']
+        genres = [
+            GenreFacet(
+                uuid=bucket['key'],
+                name=bucket['name']['hits']['hits'][0]['_source'].get('name'),
+                count=bucket['films']['doc_count'],
+            )
+            for bucket in aggregations['genres']['ids']['buckets']
+        ]
+        ratings = [
+            RatingBucket(
+                rating_from=bucket['key'], rating_to=bucket['key'] + FACET_RATING_INTERVAL, count=bucket['doc_count']
+            )
+            for bucket in aggregations['imdb_rating']['buckets']
+        ]
+        return FilmFacets(total=result['hits']['total']['value'], genres=genres, imdb_rating=ratings)
+
+    async def get_similar_films(
+        self, film_id: str, page: int, size: int, fields: tuple[str, ...] | None = None
+    ) -> list[Film]:
         """Get similar films with a given film"""
-        cache_key = 'Film__get_similar'
-        films = await self._list_from_cache(cache_key, 'Film')
-        if not films:
-            films = await self._get_films_of_same_genre(film_id, page, size)
-            await self._put_list_to_cache(films, cache_key)
-        return films
-
-    async def _get_films_of_same_genre(self, film_id, page: int, size: int) -> list[Film]:
-        """Get films having at least one common genre with a given film"""
+        cache_key = f'Film__get_similar__{film_id}__{page}__{size}'
+        if fields:
+            cache_key = f'{cache_key}__fields__{hash_key(*fields)}'
+        return await self._get_list(
+            cache_key, 'Film', lambda: self._get_films_of_same_genre(film_id, page, size, fields)
+        )
+
+    async def _get_films_of_same_genre(
+        self, film_id, page: int, size: int, fields: tuple[str, ...] | None = None
+    ) -> list[Film]:
+        """Get films having at least one common genre with a given film, most common genres first"""
         try:
-            film = await self._get_object_from_elastic(film_id, 'Film')
-            shoulds = [{'match': {'genre.name': g.name}} for g in film.genre]
+            film = await self._get_object_from_elastic(film_id, 'Film', ('genre', 'uuid'))
+            if not film or not film.genre:
+                return []
+            # по числу совпавших жанров: каждый жанр даёт постоянный вклад в score
+            shoulds = [{'constant_score': {'filter': {'term': {'genre.uuid': g.uuid}}}} for g in film.genre]
             search_body = {
+                'track_total_hits': False,
                 'query': {
-                    'nested': {'path': 'genre', 'query': {'bool': {'should': shoulds, 'minimum_should_match': 1}}}
-                }
+                    'bool': {
+                        'must': {
+                            'nested': {'path': 'genre', 'score_mode': 'sum', 'query': {'bool': {'should': shoulds}}}
+                        },
+                        'must_not': {'ids': {'values': [film_id]}},
+                    }
+                },
             }
-            hits = await self.elastic.search(index='movies', body=search_body, size=page, from_=size * (page - 1))
+            self._with_source(search_body, fields)
+            hits = await self._search(index=MOVIES, body=search_body, size=size, from_=size * (page - 1))
             docs = []
-            for hit in hits['hits']['hits']:
-                docs.append(Film(**hit['_source']))
+            with span('parse'):
+                for hit in hits['hits']['hits']:
+                    docs.append(Film.construct_trusted(hit['_source']))
         except NotFoundError:
             return []
         return docs
@@ -154,6 +539,10 @@ class FilmService(BaseService):
 
 @lru_cache()
 def get_film_service(
-    redis: Redis = Depends(get_redis), elastic: AsyncElasticsearch = Depends(get_elastic),
+    redis: Redis = Depends(get_redis),
+    elastic: AsyncElasticsearch = Depends(get_elastic),
+    batcher: MSearchBatcher | None = Depends(get_batcher),
+    shm: SharedMemoryCache | None = Depends(get_shm),
+    breaker: CircuitBreaker | None = Depends(get_breaker),
 ) -> FilmService:
-    return FilmService(redis, elastic)
+    return FilmService(redis, elastic, batcher, shm, breaker)
@@ -1,57 +1,93 @@
 from functools import lru_cache
 
 from aioredis import Redis
+from core.tracing import span
+from db.breaker import CircuitBreaker
+from db.elastic import get_batcher
+from db.elastic import get_breaker
 from db.elastic import get_elastic
+from db.indexes import GENRES
+from db.indexes import MOVIES
+from db.msearch import MSearchBatcher
 from db.redis import get_redis
+from db.shm import SharedMemoryCache
+from db.shm import get_shm
 from elasticsearch import AsyncElasticsearch
 from elasticsearch import NotFoundError
 from fastapi import Depends
 from models.genre import Genre
 from models.film import Film
+from services.cache_keys import hash_key
+from services.snapshot import snapshot
 from .film import BaseService
 
 
 class GenreService(BaseService):
-    async def get_genres(self, page: int, size: int) -> list[Genre]:
+    async def get_genres(self, page: int, size: int, sort_by: str | None = None) -> list[Genre]:
         """Get all genres from index"""
-        cache_key = f'get_all_genres_{page}_{size}'
-        genres = await self._list_from_cache(cache_key, 'Genre')
-        if not genres:
-            genres = await self._get_genres(page, size)
-            await self._put_list_to_cache(genres, cache_key)
-        return genres
+        if snapshot.ready:
+            return snapshot.page(page, size, sort_by)
+        cache_key = f'Genre__get_all__{page}__{size}'
+        if sort_by:
+            cache_key = f'{cache_key}__{sort_by}'
+        return await self._get_list(cache_key, 'Genre', lambda: self._get_genres(page, size, sort_by))
 
-    async def _get_genres(self, page: int, size: int) -> list[Genre]:
+    async def get_genre(self, genre_id: str) -> Genre | None:
+        """Get a genre from the snapshot; ones added after it was loaded are read as usual"""
+        genre = snapshot.get(genre_id)
+        if genre is None:
+            genre = await self.get_by_id(genre_id, 'Genre')
+        return genre
+
+    async def get_many_genres(self, genre_ids: list[str]) -> list[Genre | None]:
+        missing = [genre_id for genre_id in genre_ids if genre_id not in snapshot]
+        loaded = dict(zip(missing, await self.get_many(missing, 'Genre'))) if missing else {}
+        return [snapshot.get(genre_id) or loaded[genre_id] for genre_id in genre_ids]
+
+    async def _get_genres(self, page: int, size: int, sort_by: str | None) -> list[Genre]:
         try:
             body = {}
-            hits = await self.elastic.search(index='genres', body=body, size=size, from_=(page - 1) * size)
+            if sort_by:
+                # совпадает с сортировкой индекса (popularity desc): Elastic читает документы по порядку
+                # и останавливается на странице, ничего не сортируя
+                order = 'desc' if sort_by.startswith('-') else 'asc'
+                body = {'track_total_hits': False, 'sort': [{sort_by.lstrip('-'): {'order': order}}]}
+            hits = await self._search(index=GENRES, body=body, size=size, from_=(page - 1) * size)
             docs = []
-            for hit in hits['hits']['hits']:
-                docs.append(Genre(**hit['_source']))
+            with span('parse'):
+                for hit in hits['hits']['hits']:
+                    docs.append(Genre.construct_trusted(hit['_source']))
         except NotFoundError:
             return []
         return docs
 
-    async def get_films_by_id(self, genre_id: str, page: int, size: int) -> list[Film]:
+    async def get_films_by_id(
+        self, genre_id: str, page: int, size: int, fields: tuple[str, ...] | None = None
+    ) -> list[Film]:
         cache_key = f'Genre__get_films_by_genre_id__{genre_id}__{page}__{size}'
-        films = await self._list_from_cache(cache_key, 'Film')
-        if not films:
-            films = await self._get_films_from_elastic(genre_id, page, size)
-            await self._put_list_to_cache(films, cache_key)
-        if not films:
-            return []
-        return films
+        if fields:
+            cache_key = f'{cache_key}__fields__{hash_key(*fields)}'
+        return await self._get_list(
+            cache_key, 'Film', lambda: self._get_films_from_elastic(genre_id, page, size, fields)
+        )
 
-    async def _get_films_from_elastic(self, genre_id: str, page: int, size: int) -> list[Film]:
+    async def _get_films_from_elastic(
+        self, genre_id: str, page: int, size: int, fields: tuple[str, ...] | None
+    ) -> list[Film]:
         body = {
+            'track_total_hits': False,
             'sort': [{'imdb_rating': {'order': 'desc'}}],
-            'query': {'nested': {'path': 'genre', 'query': {'bool': {'must': [{'match': {'genre.uuid': genre_id}}]}}}},
+            'query': {
+                'bool': {'filter': {'nested': {'path': 'genre', 'query': {'term': {'genre.uuid': genre_id}}}}}
+            },
         }
+        self._with_source(body, fields)
         try:
-            hits = await self.elastic.search(index='movies', body=body, size=size, from_=(page - 1) * size)
+            hits = await self._search(index=MOVIES, body=body, size=size, from_=(page - 1) * size)
             docs = []
-            for hit in hits['hits']['hits']:
-                docs.append(Film(**hit['_source']))
+            with span('parse'):
+                for hit in hits['hits']['hits']:
+                    docs.append(Film.construct_trusted(hit['_source']))
         except NotFoundError:
             return []
         return docs
@@ -59,6 +95,10 @@ class GenreService(BaseService):
 
 @lru_cache()
 def get_genre_service(
-    redis: Redis = Depends(get_redis), elastic: AsyncElasticsearch = Depends(get_elastic),
+    redis: Redis = Depends(get_redis),
+    elastic: AsyncElasticsearch = Depends(get_elastic),
+    batcher: MSearchBatcher | None = Depends(get_batcher),
+    shm: SharedMemoryCache | None = Depends(get_shm),
+    breaker: CircuitBreaker | None = Depends(get_breaker),
 ) -> GenreService:
-    return GenreService(redis, elastic)
+    return GenreService(redis, elastic, batcher, shm, breaker)
@@ -0,0 +1,387 @@
+from dataclasses import dataclass
+from dataclasses import field
+from functools import lru_cache
+from inspect import isawaitable
+from typing import Any
+
+from core.config import GraphQLSettings
+from db.loader import DataLoader
+from fastapi import Depends
+from graphql import FieldNode
+from graphql import FragmentSpreadNode
+from graphql import GraphQLArgument
+from graphql import GraphQLEnumType
+from graphql import GraphQLError
+from graphql import GraphQLField
+from graphql import GraphQLFloat
+from graphql import GraphQLID
+from graphql import GraphQLInt
+from graphql import GraphQLList
+from graphql import GraphQLNonNull
+from graphql import GraphQLObjectType
+from graphql import GraphQLResolveInfo
+from graphql import GraphQLSchema
+from graphql import GraphQLString
+from graphql import InlineFragmentNode
+from graphql import IntValueNode
+from graphql import ListValueNode
+from graphql import OperationDefinitionNode
+from graphql import SelectionSetNode
+from graphql import VariableNode
+from graphql import execute
+from graphql import get_named_type
+from graphql import get_nullable_type
+from graphql import parse
+from graphql import validate
+from graphql.execution.values import get_variable_values
+from messages.error import QueryError
+from models.person import PersonType
+
+from .film import FilmService
+from .film import get_film_service
+from .genre import GenreService
+from .genre import get_genre_service
+from .person import PersonService
+from .person import get_person_service
+
+settings = GraphQLSettings()
+
+# Поля вложенных объектов, которые уже есть в документе фильма: за ними не нужно ходить в хранилище
+EMBEDDED_GENRE_FIELDS = {'uuid', 'name'}
+EMBEDDED_PERSON_FIELDS = {'uuid', 'full_name'}
+PAGE_SIZE = 50
+
+
+@dataclass
+class Context:
+    """Services and the request's loaders: an object is fetched once per request, in batches"""
+
+    film_service: FilmService
+    genre_service: GenreService
+    person_service: PersonService
+    films: DataLoader = field(init=False)
+    genres: DataLoader = field(init=False)
+    persons: DataLoader = field(init=False)
+
+    def __post_init__(self):
+        self.films = DataLoader(lambda ids: self.film_service.get_many(ids, 'Film'))
+        self.genres = DataLoader(self.genre_service.get_many_genres)
+        self.persons = DataLoader(lambda ids: self.person_service.get_many(ids, 'Person'))
+
+    def close(self):
+        for loader in (self.films, self.genres, self.persons):
+            loader.close()
+
+
+def selected_fields(info: GraphQLResolveInfo) -> set[str]:
+    """Names of the fields requested from the object being resolved"""
+    names = set()
+
+    def collect(selection_set: SelectionSetNode | None):
+        for selection in selection_set.selections if selection_set else ():
+            if isinstance(selection, FieldNode):
+                names.add(selection.name.value)
+            elif isinstance(selection, InlineFragmentNode):
+                collect(selection.selection_set)
+            elif isinstance(selection, FragmentSpreadNode):
+                collect(info.fragments[selection.name.value].selection_set)
+
+    for node in info.field_nodes:
+        collect(node.selection_set)
+    return names
+
+
+def embedded(loader_name: str, embedded_fields: set[str]):
+    """Resolver of film genres and persons: as they are in the film document, or the whole objects when needed"""
+
+    async def resolve(source: Any, info: GraphQLResolveInfo) -> list:
+        items = getattr(source, info.field_name) or []
+        if selected_fields(info) - {'__typename'} <= embedded_fields:
+            return items
+        objects = await getattr(info.context, loader_name).load_many([item.uuid for item in items])
+        return [object_ for object_ in objects if object_ is not None]
+
+    return resolve
+
+
+def page_arguments() -> dict[str, GraphQLArgument]:
+    return {
+        'page': GraphQLArgument(GraphQLInt, default_value=1),
+        'size': GraphQLArgument(GraphQLInt, default_value=PAGE_SIZE),
+    }
+
+
+def non_null_list(type_) -> GraphQLNonNull:
+    return GraphQLNonNull(GraphQLList(GraphQLNonNull(type_)))
+
+
+person_role = GraphQLEnumType('PersonRole', {role.value: role.value for role in PersonType})
+
+genre_type = GraphQLObjectType(
+    'Genre',
+    lambda: {
+        'uuid': GraphQLField(GraphQLNonNull(GraphQLID)),
+        'name': GraphQLField(GraphQLString),
+        'description': GraphQLField(GraphQLString),
+        'popularity': GraphQLField(GraphQLInt),
+        'films': GraphQLField(
+            non_null_list(film_type),
+            args=page_arguments(),
+            description='Most popular films of the genre',
+            resolve=lambda genre, info, page, size: info.context.genre_service.get_films_by_id(genre.uuid, page, size),
+        ),
+    },
+)
+
+person_film_type = GraphQLObjectType(
+    'PersonFilm',
+    lambda: {
+        'uuid': GraphQLField(GraphQLNonNull(GraphQLID)),
+        'title': GraphQLField(GraphQLString),
+        'imdb_rating': GraphQLField(GraphQLFloat),
+        'role': GraphQLField(person_role),
+        'film': GraphQLField(film_type, resolve=lambda film, info: info.context.films.load(film.uuid)),
+    },
+)
+
+person_type = GraphQLObjectType(
+    'Person',
+    lambda: {
+        'uuid': GraphQLField(GraphQLNonNull(GraphQLID)),
+        'full_name': GraphQLField(GraphQLString),
+        'role': GraphQLField(person_role),
+        'film_ids': GraphQLField(GraphQLList(GraphQLNonNull(GraphQLID))),
+        'films': GraphQLField(non_null_list(person_film_type), description='Filmography, one record per role'),
+    },
+)
+
+film_type = GraphQLObjectType(
+    'Film',
+    lambda: {
+        'uuid': GraphQLField(GraphQLNonNull(GraphQLID)),
+        'title': GraphQLField(GraphQLString),
+        'imdb_rating': GraphQLField(GraphQLFloat),
+        'description': GraphQLField(GraphQLString),
+        'genre': GraphQLField(non_null_list(genre_type), resolve=embedded('genres', EMBEDDED_GENRE_FIELDS)),
+        'directors': GraphQLField(non_null_list(person_type), resolve=embedded('persons', EMBEDDED_PERSON_FIELDS)),
+        'actors': GraphQLField(non_null_list(person_type), resolve=embedded('persons', EMBEDDED_PERSON_FIELDS)),
+        'writers': GraphQLField(non_null_list(person_type), resolve=embedded('persons', EMBEDDED_PERSON_FIELDS)),
+        'similar': GraphQLField(
+            non_null_list(film_type),
+            args=page_arguments(),
+            resolve=lambda film, info, page, size: info.context.film_service.get_similar_films(film.uuid, page, size),
+        ),
+    },
+)
+
+
+query_type = GraphQLObjectType(
+    'Query',
+    {
+        'film': GraphQLField(
+            film_type,
+            args={'id': GraphQLArgument(GraphQLNonNull(GraphQLID))},
+            resolve=lambda _, info, id: info.context.films.load(id),
+        ),
+        'films': GraphQLField(
+            GraphQLNonNull(GraphQLList(film_type)),
+            args={'ids': GraphQLArgument(non_null_list(GraphQLID))},
+            resolve=lambda _, info, ids: info.context.films.load_many(ids),
+        ),
+        'search_films': GraphQLField(
+            non_null_list(film_type),
+            args={'query': GraphQLArgument(GraphQLNonNull(GraphQLString)), **page_arguments()},
+            resolve=lambda _, info, query, page, size: info.context.film_service.search_objects(
+                query, 'Film', page, size
+            ),
+        ),
+        'genre': GraphQLField(
+            genre_type,
+            args={'id': GraphQLArgument(GraphQLNonNull(GraphQLID))},
+            resolve=lambda _, info, id: info.context.genres.load(id),
+        ),
+        'genres': GraphQLField(
+            non_null_list(genre_type),
+            args=page_arguments(),
+            resolve=lambda _, info, page, size: info.context.genre_service.get_genres(page, size),
+        ),
+        'person': GraphQLField(
+            person_type,
+            args={'id': GraphQLArgument(GraphQLNonNull(GraphQLID))},
+            resolve=lambda _, info, id: info.context.persons.load(id),
+        ),
+        'persons': GraphQLField(
+            GraphQLNonNull(GraphQLList(person_type)),
+            args={'ids': GraphQLArgument(non_null_list(GraphQLID))},
+            resolve=lambda _, info, ids: info.context.persons.load_many(ids),
+        ),
+        'search_persons': GraphQLField(
+            non_null_list(person_type),
+            args={'query': GraphQLArgument(GraphQLNonNull(GraphQLString)), **page_arguments()},
+            resolve=lambda _, info, query, page, size: info.context.person_service.search_objects(
+                query, 'Person', page, size
+            ),
+        ),
+    },
+)
+
+schema = GraphQLSchema(query_type)
+
+
+@lru_cache(maxsize=256)
+def parse_query(query: str) -> tuple[Any, list[GraphQLError]]:
+    """Parsed and validated document; clients send the same few queries, so both are done once per query"""
+    try:
+        document = parse(query)
+    except GraphQLError as error:
+        return None, [error]
+    return document, validate(schema, document)
+
+
+class QueryLimits:
+    """
+    Depth and cost of an operation, checked before anything is fetched.
+
+    Depth counts nested levels of fields. Cost estimates the number of objects in the
+    response: every field costs one, and a list multiplies the cost of its items by its
+    `size` argument, the number of `ids`, or the default list size for embedded lists.
+    Introspection fields are not counted. `page` below 1 and `size` outside 1..max_page_size
+    are rejected: a negative size would make the cost of a field negative. Variables are
+    coerced as execution does it, with the defaults of the operation.
+    """
+
+    def __init__(self, document, operation_name: str | None, variables: dict | None):
+        self.fragments = {}
+        self.operation = None
+        for definition in document.definitions:
+            if isinstance(definition, OperationDefinitionNode):
+                if operation_name is None or definition.name and definition.name.value == operation_name:
+                    self.operation = self.operation or definition
+            else:
+                self.fragments[definition.name.value] = definition
+        self.variables = variables or {}
+
+    def check(self) -> GraphQLError | None:
+        if self.operation is None:
+            return None
+        # значения по умолчанию из объявления переменных тоже проверяются: '$size: Int = 100000'
+        variables = get_variable_values(schema, self.operation.variable_definitions, self.variables)
+        if isinstance(variables, list):
+            return variables[0]
+        self.variables = variables
+        try:
+            depth, cost = self._measure(self.operation.selection_set, query_type, 1)
+        except GraphQLError as error:
+            return error
+        if depth > settings.max_depth:
+            return GraphQLError(
+                QueryError.TOO_DEEP.value, extensions={'depth': depth, 'max_depth': settings.max_depth}
+            )
+        if cost > settings.max_cost:
+            return GraphQLError(
+                QueryError.TOO_EXPENSIVE.value, extensions={'cost': cost, 'max_cost': settings.max_cost}
+            )
+        return None
+
+    def _measure(self, selection_set: SelectionSetNode, parent_type: GraphQLObjectType, depth: int) -> tuple[int, int]:
+        max_depth, cost = depth - 1, 0
+        for selection in selection_set.selections:
+            if isinstance(selection, FieldNode):
+                if selection.name.value.startswith('__'):
+                    continue
+                field_ = parent_type.fields[selection.name.value]
+                self._check_page(selection, field_)
+                field_type = field_.type
+                child_depth, child_cost = depth, 0
+                if selection.selection_set:
+                    child_depth, child_cost = self._measure(
+                        selection.selection_set, get_named_type(field_type), depth + 1
+                    )
+                size = 1
+                if isinstance(get_nullable_type(field_type), GraphQLList):
+                    size = self._list_size(selection, field_)
+                max_depth, cost = max(max_depth, child_depth), cost + size * (1 + child_cost)
+            else:
+                if isinstance(selection, InlineFragmentNode):
+                    fragment = selection
+                else:
+                    fragment = self.fragments[selection.name.value]
+                child_depth, child_cost = self._measure(fragment.selection_set, parent_type, depth)
+                max_depth, cost = max(max_depth, child_depth), cost + child_cost
+        return max_depth, cost
+
+    def _check_page(self, node: FieldNode, field_: GraphQLField):
+        arguments = {argument.name.value: argument.value for argument in node.arguments}
+        for name, maximum in (('page', None), ('size', settings.max_page_size)):
+            if name not in field_.args or name not in arguments:
+                continue
+            value = self._value(arguments[name])
+            if isinstance(value, int) and (value < 1 or maximum is not None and value > maximum):
+                raise GraphQLError(
+                    QueryError.WRONG_PAGE.value,
+                    extensions={
+                        'field': node.name.value,
+                        'argument': name,
+                        'value': value,
+                        'max_page_size': settings.max_page_size,
+                    },
+                )
+
+    def _list_size(self, node: FieldNode, field_: GraphQLField) -> int:
+        arguments = {argument.name.value: argument.value for argument in node.arguments}
+        if 'size' in field_.args:
+            size = self._value(arguments['size']) if 'size' in arguments else None
+            # проверка в _check_page; здесь - чтобы стоимость ни при каком size не стала отрицательной
+            return max(size, 1) if isinstance(size, int) else field_.args['size'].default_value
+        if 'ids' in arguments:
+            ids = self._value(arguments['ids'])
+            return len(ids) if isinstance(ids, list) else settings.default_list_size
+        return settings.default_list_size
+
+    def _value(self, node):
+        if isinstance(node, VariableNode):
+            return self.variables.get(node.name.value)
+        if isinstance(node, IntValueNode):
+            return int(node.value)
+        if isinstance(node, ListValueNode):
+            return list(node.values)
+        return None
+
+
+class GraphQLService:
+    def __init__(self, film_service: FilmService, genre_service: GenreService, person_service: PersonService):
+        self.film_service = film_service
+        self.genre_service = genre_service
+        self.person_service = person_service
+
+    async def execute(self, query: str, variables: dict | None, operation_name: str | None) -> dict:
+        """Result in the GraphQL response format; without 'data' when the query was not executed"""
+        document, errors = parse_query(query)
+        if not errors:
+            error = QueryLimits(document, operation_name, variables).check()
+            errors = [error] if error else []
+        if errors:
+            return {'errors': [error.formatted for error in errors]}
+        context = Context(self.film_service, self.genre_service, self.person_service)
+        try:
+            result = execute(
+                schema, document, variable_values=variables, operation_name=operation_name, context_value=context
+            )
+            if isawaitable(result):
+                result = await result
+        finally:
+            # при отмене запроса (клиент ушёл) пакетные загрузки не должны работать дальше
+            context.close()
+        response = {'data': result.data}
+        if result.errors:
+            response['errors'] = [error.formatted for error in result.errors]
+        return response
+
+
+@lru_cache()
+def get_graphql_service(
+    film_service: FilmService = Depends(get_film_service),
+    genre_service: GenreService = Depends(get_genre_service),
+    person_service: PersonService = Depends(get_person_service),
+) -> GraphQLService:
+    return GraphQLService(film_service, genre_service, person_service)
@@ -0,0 +1,57 @@
+import asyncio
+import time
+from functools import lru_cache
+from typing import Awaitable
+from typing import Callable
+
+from aioredis import Redis
+from core.config import HealthSettings
+from db import warmup
+from db.elastic import get_elastic
+from db.redis import get_redis
+from elasticsearch import AsyncElasticsearch
+from fastapi import Depends
+from models.health import DependencyHealth
+from models.health import Health
+
+settings = HealthSettings()
+
+
+class HealthService:
+    def __init__(self, redis: Redis, elastic: AsyncElasticsearch):
+        self.redis = redis
+        self.elastic = elastic
+
+    @staticmethod
+    def live() -> Health:
+        return Health(status='ok', warm=warmup.warm)
+
+    async def ready(self) -> Health:
+        """Ping the storages concurrently; the worker is ready when it is warm and both answer"""
+        dependencies = await asyncio.gather(
+            self._probe('redis', self.redis.ping),
+            self._probe('elastic', self._ping_elastic),
+        )
+        ok = warmup.warm and all(dependency.ok for dependency in dependencies)
+        return Health(status='ok' if ok else 'unavailable', warm=warmup.warm, dependencies=list(dependencies))
+
+    async def _ping_elastic(self):
+        if not await self.elastic.ping():
+            raise ConnectionError('Elastic does not answer')
+
+    @staticmethod
+    async def _probe(name: str, ping: Callable[[], Awaitable]) -> DependencyHealth:
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(ping(), settings.probe_timeout)
+        except Exception as exc:
+            return DependencyHealth(name=name, ok=False, error=repr(exc))
+        return DependencyHealth(name=name, ok=True, latency_ms=round((time.monotonic() - started) * 1000, 3))
+
+
+@lru_cache()
+def get_health_service(
+    redis: Redis = Depends(get_redis),
+    elastic: AsyncElasticsearch = Depends(get_elastic),
+) -> HealthService:
+    return HealthService(redis, elastic)
@@ -1,46 +1,66 @@
 from functools import lru_cache
 
 from aioredis import Redis
+from core.tracing import span
+from db.breaker import CircuitBreaker
+from db.elastic import get_batcher
+from db.elastic import get_breaker
 from db.elastic import get_elastic
+from db.indexes import MOVIES
+from db.indexes import PERSONS
+from db.msearch import MSearchBatcher
 from db.redis import get_redis
+from db.shm import SharedMemoryCache
+from db.shm import get_shm
 from elasticsearch import AsyncElasticsearch
 from elasticsearch import NotFoundError
 from fastapi import Depends
-from models.film import Film
-from models.person import Person
+from models.person import PersonFilm
+from services.cache_keys import object_key
+from services.cache_keys import person_films_key
 
 from .film import BaseService
 
 
 class PersonService(BaseService):
-    async def get_films_by_id(self, person_id: str) -> list[Film]:
-        cache_key = f'Person__get_films_by_person__{person_id}'
-        films = await self._list_from_cache(cache_key, 'Film')
-        if not films:
-            films = await self._get_person_films_from_elastic(person_id)
-            await self._put_list_to_cache(films, cache_key)
-        if not films:
-            return []
-        return films
+    async def get_films_by_id(self, person_id: str) -> list[PersonFilm]:
+        """Get the person's films, one record per role, from the person document"""
+        # карточка персоны, если она уже в кеше, содержит всю фильмографию
+        person = await self._object_from_cache(object_key('Person', person_id), 'Person')
+        if person and person.films:
+            return person.films
+        cache_key = person_films_key(person_id)
+        return await self._get_list(
+            cache_key, 'PersonFilm', lambda: self._get_person_films_from_elastic(person_id)
+        )
 
-    async def _get_person_films_from_elastic(self, person_id: str) -> list[Film]:
+    async def _get_person_films_from_elastic(self, person_id: str) -> list[PersonFilm]:
         try:
-            # get the persons' film_ids
-            doc = await self.elastic.get('persons', person_id)
-            person = Person(**doc['_source'])
-
-            # get films by ids from 'movies' index
-            films = await self.elastic.mget(index='movies', body={'ids': person.film_ids})
-            docs = []
-            for film in films['docs']:
-                docs.append(Film(**film['_source']))
+            doc = await self._get(PERSONS, person_id, _source_includes=['films', 'film_ids', 'role'])
+            source = doc['_source']
+            if 'films' in source:
+                with span('parse'):
+                    return [PersonFilm.construct_trusted(film) for film in source['films']]
+            if not source.get('film_ids'):
+                return []
+            # документ ещё не пересобран etl.persons: фильмы берутся из индекса фильмов
+            films = await self._mget(MOVIES, source['film_ids'], _source_includes=['uuid', 'title', 'imdb_rating'])
         except NotFoundError:
             return []
-        return docs
+        with span('parse'):
+            return [
+                PersonFilm.construct_trusted({**film['_source'], 'role': source.get('role')})
+                for film in films['docs']
+                if film.get('found')
+            ]
 
 
 @lru_cache()
 def get_person_service(
-    redis: Redis = Depends(get_redis), elastic: AsyncElasticsearch = Depends(get_elastic),
+    redis: Redis = Depends(get_redis),
+    elastic: AsyncElasticsearch = Depends(get_elastic),
+    batcher: MSearchBatcher | None = Depends(get_batcher),
+    shm: SharedMemoryCache | None = Depends(get_shm),
+    breaker: CircuitBreaker | None = Depends(get_breaker),
 ) -> PersonService:
-    return PersonService(redis, elastic)
+    return PersonService(redis, elastic, batcher, shm, breaker)
@@ -0,0 +1,48 @@
+import asyncio
+from functools import lru_cache
+
+import aiohttp
+from aioredis import Redis
+from core.config import AdminSettings
+from db.redis import get_redis
+from fastapi import Depends
+from models.admin import EdgePurgeResult
+from models.admin import PurgeResult
+from services import surrogate
+from services.snapshot import GENERATION_KEY
+
+settings = AdminSettings()
+
+
+class PurgeService:
+    def __init__(self, redis: Redis):
+        self.redis = redis
+
+    async def purge(self, keys: list[str]) -> PurgeResult:
+        """
+        Drop local cache entries tagged with the surrogate keys and fan the purge out to edge caches.
+
+        Purging a 'genre:' key also bumps the genre generation, so workers reload their genre
+        snapshots, which serve genres without the cache. Purging a 'film:' key also drops
+        entries tagged with the catch-all 'films' key, like facet counts.
+        """
+        keys = surrogate.with_catch_all(keys)
+        purged = await surrogate.purge(self.redis, keys)
+        if any(key.startswith('genre:') for key in keys):
+            await self.redis.incr(GENERATION_KEY)
+        edges = await asyncio.gather(*(self._purge_edge(url, keys) for url in settings.edge_purge_urls))
+        return PurgeResult(purged_entries=purged, edges=list(edges))
+
+    async def _purge_edge(self, url: str, keys: list[str]) -> EdgePurgeResult:
+        timeout = aiohttp.ClientTimeout(total=settings.edge_purge_timeout)
+        try:
+            async with aiohttp.ClientSession(timeout=timeout) as session:
+                async with session.request('PURGE', url, headers={'Surrogate-Key': ' '.join(keys)}) as response:
+                    return EdgePurgeResult(url=url, status=response.status)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as exc:
+            return EdgePurgeResult(url=url, error=repr(exc))
+
+
+@lru_cache()
+def get_purge_service(redis: Redis = Depends(get_redis)) -> PurgeService:
+    return PurgeService(redis)
@@ -0,0 +1,99 @@
+import asyncio
+import logging
+import time
+
+from aioredis import Redis
+from core.config import GenreSnapshotSettings
+from db.indexes import GENRES
+from elasticsearch import AsyncElasticsearch
+from models.genre import Genre
+
+logger = logging.getLogger(__name__)
+
+settings = GenreSnapshotSettings()
+
+# Увеличивается всеми, кто меняет жанры (python -m etl.genres), воркеры по нему перечитывают снимок
+GENERATION_KEY = 'Genre__generation'
+
+
+class GenreSnapshot:
+    """
+    All genres in the worker memory.
+
+    The genre set is small and rarely changes, so every worker loads the whole index
+    at startup and serves the genre list, genre details and genre names of film filters
+    without I/O. The snapshot is reloaded when the generation in Redis changes and every
+    `refresh_interval` seconds anyway. Until it is loaded, or when there are more genres
+    than `max_size`, callers go to the cache and Elastic as before.
+    """
+
+    def __init__(self):
+        self.by_id: dict[str, Genre] = {}
+        # название в нижнем регистре -> uuid, как нормализатор lowercase у genre.name.raw в фильтрах фильмов
+        self.by_name: dict[str, str] = {}
+        # порядок сортировки -> жанры в этом порядке
+        self.ordered: dict[str | None, list[Genre]] = {}
+        self.generation: bytes | None = None
+        self.loaded_at = 0.0
+
+    @property
+    def ready(self) -> bool:
+        return bool(self.by_id)
+
+    def __contains__(self, genre_id: str) -> bool:
+        return genre_id in self.by_id
+
+    def get(self, genre_id: str) -> Genre | None:
+        return self.by_id.get(genre_id)
+
+    def page(self, page: int, size: int, sort_by: str | None = None) -> list[Genre]:
+        if page < 1 or size < 1:
+            return []
+        return self.ordered.get(sort_by, [])[(page - 1) * size:page * size]
+
+    def resolve(self, values: list[str]) -> list[str]:
+        """Genre filter values with known names replaced by uuids, so equal filters get one cache key"""
+        return list(dict.fromkeys(self.by_name.get(value.lower(), value) for value in values))
+
+    async def load(self, elastic: AsyncElasticsearch):
+        body = {'track_total_hits': True, 'sort': [{'popularity': {'order': 'desc'}}]}
+        hits = await elastic.search(index=GENRES, body=body, size=settings.max_size)
+        total = hits['hits']['total']['value']
+        if total > settings.max_size:
+            logger.warning('Genre snapshot is off: %s genres, the limit is %s', total, settings.max_size)
+            self.by_id, self.by_name, self.ordered = {}, {}, {}
+            return
+        genres = [Genre.construct_trusted(hit['_source']) for hit in hits['hits']['hits']]
+        # как в Elastic: жанры без популярности в конце при любом порядке
+        ascending = sorted(genres, key=lambda genre: (genre.popularity is None, genre.popularity or 0))
+        # все поля заменяются разом, между await запросы видят либо старый, либо новый снимок
+        self.by_id = {genre.uuid: genre for genre in genres}
+        self.by_name = {genre.name.lower(): genre.uuid for genre in genres}
+        self.ordered = {None: genres, '-popularity': genres, 'popularity': ascending}
+        self.loaded_at = time.monotonic()
+
+    async def refresh(self, elastic: AsyncElasticsearch, redis: Redis, force: bool = False):
+        """Reload the snapshot if the generation changed or it is older than `refresh_interval`"""
+        try:
+            generation = await redis.get(GENERATION_KEY)
+        except Exception:
+            logger.exception('Failed to read the genre generation')
+            generation = self.generation
+        expired = time.monotonic() - self.loaded_at >= settings.refresh_interval
+        if not (force or expired or generation != self.generation):
+            return
+        try:
+            await self.load(elastic)
+        except Exception:
+            logger.exception('Failed to load the genre snapshot')
+            return
+        self.generation = generation
+        logger.info('Loaded %s genres into the snapshot', len(self.by_id))
+
+    async def refresh_periodically(self, elastic: AsyncElasticsearch, redis: Redis):
+        while True:
+            await asyncio.sleep(settings.check_interval)
+            await self.refresh(elastic, redis)
+
+
+snapshot = GenreSnapshot()
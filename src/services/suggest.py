@@ -0,0 +1,129 @@
+import asyncio
+import logging
+from functools import lru_cache
+
+from core.config import SuggestSettings
+from core.deadline import within_deadline
+from core.tracing import span
+from db.elastic import get_elastic
+from db.indexes import MOVIES
+from db.indexes import PERSONS
+from elasticsearch import AsyncElasticsearch
+from elasticsearch import NotFoundError
+from fastapi import Depends
+from models.response_models import Suggestion
+
+logger = logging.getLogger(__name__)
+
+settings = SuggestSettings()
+
+
+def normalize_prefix(text: str) -> str:
+    return ' '.join(text.casefold().split())
+
+
+class PrefixTrie:
+    """
+    Prefix tree with precomputed completions.
+
+    Every node keeps the best `node_size` completions of its prefix, so a lookup
+    costs one dict access per character of the prefix and nothing else.
+    Items are indexed from the start of every word, so 'wars' finds 'Star Wars'.
+    """
+
+    def __init__(self, node_size: int):
+        self.node_size = node_size
+        self.root: dict = {'': []}
+
+    @classmethod
+    def build(cls, items: list[tuple[str, str]], node_size: int) -> 'PrefixTrie':
+        """Build a trie from (uuid, text) pairs ordered by popularity, most popular first"""
+        trie = cls(node_size)
+        for uuid, text in items:
+            words = normalize_prefix(text).split(' ')
+            for i in range(len(words)):
+                trie._insert(' '.join(words[i:]), uuid, text)
+        return trie
+
+    def _insert(self, key: str, uuid: str, text: str):
+        node = self.root
+        for char in key:
+            node = node.setdefault(char, {'': []})
+            top = node['']
+            if len(top) < self.node_size and all(item[0] != uuid for item in top):
+                top.append((uuid, text))
+
+    def search(self, prefix: str, limit: int) -> list[tuple[str, str]]:
+        node = self.root
+        for char in normalize_prefix(prefix):
+            node = node.get(char)
+            if node is None:
+                return []
+        return node[''][:limit]
+
+
+class SuggestService:
+    # model name -> (Elastic index name, text field)
+    sources = {
+        'Film': (MOVIES, 'title'),
+        'Person': (PERSONS, 'full_name'),
+    }
+
+    def __init__(self, elastic: AsyncElasticsearch):
+        self.elastic = elastic
+        self.tries: dict[str, PrefixTrie] = {}
+
+    async def suggest(self, prefix: str, model_name: str, limit: int) -> list[Suggestion]:
+        """Get completions for a prefix: popular ones from memory, the rest from Elastic"""
+        trie = self.tries.get(model_name)
+        items = trie.search(prefix, limit) if trie else []
+        if len(items) < limit:
+            items = await self._suggest_from_elastic(prefix, model_name, limit)
+        return [Suggestion(uuid=uuid, text=text) for uuid, text in items]
+
+    async def _suggest_from_elastic(self, prefix: str, model_name: str, limit: int) -> list[tuple[str, str]]:
+        index, field = SuggestService.sources[model_name]
+        body = {
+            'query': {
+                'multi_match': {
+                    'query': prefix,
+                    'type': 'bool_prefix',
+                    'fields': [f'{field}.suggest', f'{field}.suggest._2gram', f'{field}.suggest._3gram'],
+                }
+            },
+            '_source': ['uuid', field],
+        }
+        try:
+            with span('es'):
+                hits = await within_deadline(self.elastic.search(index=index, body=body, size=limit))
+        except NotFoundError:
+            return []
+        return [(hit['_source']['uuid'], hit['_source'][field]) for hit in hits['hits']['hits']]
+
+    async def refresh(self):
+        """Rebuild prefix tries from the most popular titles and names"""
+        loop = asyncio.get_running_loop()
+        for model_name, (index, field) in SuggestService.sources.items():
+            body = {'_source': ['uuid', field]}
+            if model_name == 'Film':
+                body['sort'] = [{'imdb_rating': {'order': 'desc'}}]
+            try:
+                hits = await self.elastic.search(index=index, body=body, size=settings.trie_size)
+            except NotFoundError:
+                continue
+            items = [(hit['_source']['uuid'], hit['_source'][field]) for hit in hits['hits']['hits']]
+            # строим дерево вне event loop, чтобы не задерживать запросы
+            self.tries[model_name] = await loop.run_in_executor(None, PrefixTrie.build, items, settings.node_size)
+
+    async def refresh_periodically(self):
+        while True:
+            try:
+                await self.refresh()
+            except Exception:
+                logger.exception('Failed to refresh suggestions')
+            await asyncio.sleep(settings.refresh_interval)
+
+
+@lru_cache()
+def get_suggest_service(elastic: AsyncElasticsearch = Depends(get_elastic)) -> SuggestService:
+    return SuggestService(elastic)
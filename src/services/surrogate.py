@@ -0,0 +1,82 @@
+from aioredis import Redis
+from services.cache_keys import stale_key
+
+# Вложенные поля документов и тип объектов в них
+NESTED_KINDS = {
+    'genre': 'genre',
+    'directors': 'person',
+    'actors': 'person',
+    'writers': 'person',
+    'films': 'film',
+    'genres': 'genre',
+}
+# model name <-> surrogate key kind
+MODEL_KINDS = {
+    'Film': 'film',
+    'Genre': 'genre',
+    'Person': 'person',
+    'PersonFilm': 'film',
+    'FilmFacets': 'facets',
+}
+# Фасеты зависят от всех фильмов сразу: их записи помечаются этим ключом, purge любого фильма сбрасывает и его
+ALL_FILMS_KEY = 'films'
+
+
+def surrogate_keys(kind: str | None, payload) -> set[str]:
+    """Collect 'film:<uuid>', 'genre:<uuid>' and 'person:<uuid>' tags of everything in a payload"""
+    keys = set()
+    _collect(kind, payload, keys)
+    if kind == 'facets':
+        keys.add(ALL_FILMS_KEY)
+    return keys
+
+
+def with_catch_all(keys: list[str]) -> list[str]:
+    """Purge keys plus the key of entries that depend on every film, when any film is purged"""
+    if ALL_FILMS_KEY not in keys and any(key.startswith('film:') for key in keys):
+        return [*keys, ALL_FILMS_KEY]
+    return keys
+
+
+def _collect(kind: str | None, payload, keys: set[str]):
+    if isinstance(payload, list):
+        for item in payload:
+            _collect(kind, item, keys)
+    elif isinstance(payload, dict):
+        if kind and 'uuid' in payload:
+            keys.add(f'{kind}:{payload["uuid"]}')
+        for field, nested_kind in NESTED_KINDS.items():
+            if field in payload:
+                _collect(nested_kind, payload[field], keys)
+        for film_id in payload.get('film_ids') or []:
+            keys.add(f'film:{film_id}')
+
+
+def tag_key(surrogate_key: str) -> str:
+    return f'surrogate__{surrogate_key}'
+
+
+async def tag(redis: Redis, cache_key: str, keys: set[str], expire: int):
+    """Remember that a cache entry holds the given objects, so it can be purged by them"""
+    if not keys:
+        return
+    pipeline = redis.pipeline()
+    for key in keys:
+        pipeline.sadd(tag_key(key), cache_key)
+        pipeline.expire(tag_key(key), expire)
+    await pipeline.execute()
+
+
+async def purge(redis: Redis, keys: list[str]) -> int:
+    """
+    Delete every cache entry tagged with any of the keys, return the number of entries.
+
+    Stale copies of the entries go too, otherwise an Elastic outage would bring purged data back.
+    """
+    cache_keys = set()
+    for key in keys:
+        cache_keys.update(await redis.smembers(tag_key(key), encoding='utf-8'))
+    await redis.delete(
+        *cache_keys, *(stale_key(cache_key) for cache_key in cache_keys), *(tag_key(key) for key in keys)
+    )
+    return len(cache_keys)
@@ -0,0 +1,76 @@
+from core.config import BreakerSettings
+from core.config import CacheTTLSettings
+
+from .cache_keys import key_family
+from .cache_stats import CacheStats
+from .cache_stats import stats
+
+settings = CacheTTLSettings()
+breaker_settings = BreakerSettings()
+
+
+class TTLPolicy:
+    """
+    Time to live of Redis cache entries chosen per key.
+
+    The base comes from the key family: whole objects live longer than lists, search
+    pages the shortest, and settings can override it per family or model. Accesses of
+    every key are counted in the sketch of the cache stats; hot keys get their
+    base multiplied by hits / hot_hits, up to max_ttl. Keys of the admission kinds
+    (searches, filtered lists) are not cached until they are requested again, so
+    one-off pages do not push useful entries out of Redis.
+    """
+
+    def __init__(self, stats: CacheStats):
+        self.stats = stats
+
+    def ttl(self, cache_key: str, family: str | None = None, base: int | None = None) -> int:
+        """
+        Seconds to keep the entry for, 0 to not cache it.
+
+        Keys not built by the services (whole responses) pass their family and base TTL.
+        """
+        family = family or key_family(cache_key)
+        model, _, kind = family.partition('__')
+        base = self._base(family, model, kind, base)
+        if not base or not settings.adaptive:
+            return base
+        hits = self.stats.sketch.estimate(cache_key)
+        if kind in settings.admission_kinds and hits < settings.admission_hits:
+            return 0
+        if hits <= settings.hot_hits:
+            return base
+        return max(base, min(settings.max_ttl, base * hits // settings.hot_hits))
+
+    @property
+    def longest(self) -> int:
+        """Upper bound of every TTL the policy gives, for data that must outlive the entries"""
+        ttls = (settings.object_ttl, settings.list_ttl, settings.search_ttl, settings.max_ttl)
+        return max(*ttls, *settings.overrides.values())
+
+    @property
+    def tag_ttl(self) -> int:
+        """Lifetime of surrogate key tags: purge finds entries and their stale copies only while the tags live"""
+        return max(self.longest, self.stale_ttl(self.longest))
+
+    @staticmethod
+    def stale_ttl(ttl: int) -> int:
+        """Stale copies of short-lived entries, like search results, are not worth keeping for a day"""
+        return min(breaker_settings.stale_expire, ttl * breaker_settings.stale_ttl_multiplier)
+
+    @staticmethod
+    def _base(family: str, model: str, kind: str, base: int | None) -> int:
+        if family in settings.overrides:
+            return settings.overrides[family]
+        if model in settings.overrides:
+            return settings.overrides[model]
+        if base is not None:
+            return base
+        if not kind:
+            return settings.object_ttl
+        if kind == 'search':
+            return settings.search_ttl
+        return settings.list_ttl
+
+
+policy = TTLPolicy(stats)